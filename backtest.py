@@ -0,0 +1,66 @@
+import argparse
+import logging
+import time
+
+from tinkoff.invest import CandleInterval
+
+from backtesting.candle_arrays import CandleArrays
+from backtesting.change_and_volume_backtest import ChangeAndVolumeBacktest, ChangeAndVolumeParams
+from configuration.configuration import ProgramConfiguration
+from invest_api.client_pool import InvestClientPool
+from invest_api.services.client_service import ClientService
+from storage.candle_store import CandleStore
+
+# the configuration file name
+CONFIG_FILE = "settings.ini"
+
+logger = logging.getLogger(__name__)
+
+
+def backtest(config: ProgramConfiguration, days: int, store_path: str) -> None:
+    client_pool = InvestClientPool(config.tinkoff_token, config.tinkoff_app_name)
+    client_service = ClientService(client_pool)
+    candle_store = CandleStore(store_path) if store_path else None
+
+    try:
+        for strategy_settings in config.trade_strategy_settings:
+            if strategy_settings.name != "ChangeAndVolumeStrategy":
+                print(f"{strategy_settings.ticker}: strategy {strategy_settings.name} isn't supported by backtest")
+                continue
+
+            if candle_store:
+                # only missing candles are downloaded
+                candle_store.update(client_service, strategy_settings.figi, CandleInterval.CANDLE_INTERVAL_1_MIN, days)
+                candles = candle_store.read(strategy_settings.figi, CandleInterval.CANDLE_INTERVAL_1_MIN) \
+                    .to_candle_arrays()
+            else:
+                candles = CandleArrays.from_historic_candles(
+                    client_service.download_historic_candle(
+                        strategy_settings.figi, days, CandleInterval.CANDLE_INTERVAL_1_MIN
+                    )
+                )
+
+            start = time.perf_counter()
+            result = ChangeAndVolumeBacktest(
+                ChangeAndVolumeParams.from_settings(strategy_settings.settings),
+                short_enabled=strategy_settings.short_enabled_flag,
+                stop_signals_before_close_minutes=config.trading_settings.stop_signals_before_close
+            ).run(candles)
+            elapsed = time.perf_counter() - start
+
+            print(f"{strategy_settings.ticker}: candles {len(candles)}, trades {result.trades_count}, "
+                  f"total return {result.total_return * 100:.2f} %, hit rate {result.hit_rate * 100:.2f} %, "
+                  f"max drawdown {result.max_drawdown * 100:.2f} % ({elapsed:.3f} s)")
+    finally:
+        client_pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest of strategies from settings.ini on historic candles")
+    parser.add_argument("--days", type=int, default=30, help="count of days of 1-minute candles")
+    parser.add_argument("--store", default="", help="path to local candle store (candles are kept between runs)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    backtest(ProgramConfiguration(CONFIG_FILE), args.days, args.store)
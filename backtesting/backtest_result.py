@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+__all__ = ("BacktestResult")
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class BacktestResult:
+    """
+    Trades of one backtest run. Every array has one item per trade.
+    direction: 1 - long, -1 - short. Returns are relative (0.01 is 1%) without commissions.
+    """
+    open_index: np.ndarray
+    close_index: np.ndarray
+    direction: np.ndarray
+    open_price: np.ndarray
+    close_price: np.ndarray
+
+    @property
+    def returns(self) -> np.ndarray:
+        return self.direction * (self.close_price - self.open_price) / self.open_price
+
+    @property
+    def trades_count(self) -> int:
+        return len(self.open_index)
+
+    @property
+    def total_return(self) -> float:
+        return float(self.returns.sum())
+
+    @property
+    def hit_rate(self) -> float:
+        if not self.trades_count:
+            return 0.0
+
+        return float((self.returns > 0).sum() / self.trades_count)
+
+    @property
+    def max_drawdown(self) -> float:
+        """
+        Maximum drop of cumulative return from its previous peak
+        """
+        if not self.trades_count:
+            return 0.0
+
+        equity = np.concatenate(([0.0], np.cumsum(self.returns)))
+        return float((np.maximum.accumulate(equity) - equity).max())
+
+    def __repr__(self) -> str:
+        return f"BacktestResult(trades={self.trades_count}, total_return={self.total_return:.4f}, " \
+               f"hit_rate={self.hit_rate:.4f}, max_drawdown={self.max_drawdown:.4f})"
@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+
+import numpy as np
+from tinkoff.invest import HistoricCandle
+
+__all__ = ("CandleArrays")
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class CandleArrays:
+    """
+    Candles as columns (numpy arrays). All arrays have the same length and are sorted by time.
+    time - unix time in seconds (int64), volume is int64.
+    Prices are float64 or fixed-point int64 (CandleStore), backtest works with both of them.
+    """
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __repr__(self) -> str:
+        return f"CandleArrays(len={len(self)})"
+
+    @staticmethod
+    def from_historic_candles(candles: list[HistoricCandle]) -> "CandleArrays":
+        """
+        Converts candles from api (for example, ClientService.download_historic_candle) to arrays.
+        Incomplete candles are skipped.
+        """
+        candles = sorted((x for x in candles if x.is_complete), key=lambda x: x.time)
+        count = len(candles)
+
+        def prices(name: str) -> np.ndarray:
+            return np.fromiter(
+                (getattr(x, name).units + getattr(x, name).nano / 1_000_000_000 for x in candles),
+                dtype=np.float64,
+                count=count
+            )
+
+        return CandleArrays(
+            time=np.fromiter((int(x.time.timestamp()) for x in candles), dtype=np.int64, count=count),
+            open=prices("open"),
+            high=prices("high"),
+            low=prices("low"),
+            close=prices("close"),
+            volume=np.fromiter((x.volume for x in candles), dtype=np.int64, count=count)
+        )
@@ -0,0 +1,182 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from backtesting.backtest_result import BacktestResult
+from backtesting.candle_arrays import CandleArrays
+
+__all__ = ("ChangeAndVolumeParams", "ChangeAndVolumeBacktest")
+
+logger = logging.getLogger(__name__)
+
+SECONDS_IN_DAY = 86400
+
+
+@dataclass(frozen=True, eq=True, repr=True)
+class ChangeAndVolumeParams:
+    """
+    ChangeAndVolumeStrategy settings (section STRATEGY_*_SETTINGS) as numbers
+    """
+    signal_volume: int
+    signal_min_candles: int
+    signal_min_tail: float
+    long_take: float
+    long_stop: float
+    short_take: float
+    short_stop: float
+
+    @staticmethod
+    def from_settings(settings: dict) -> "ChangeAndVolumeParams":
+        return ChangeAndVolumeParams(
+            signal_volume=int(settings["SIGNAL_VOLUME"]),
+            signal_min_candles=int(settings["SIGNAL_MIN_CANDLES"]),
+            signal_min_tail=float(settings["SIGNAL_MIN_TAIL"]),
+            long_take=float(settings["LONG_TAKE"]),
+            long_stop=float(settings["LONG_STOP"]),
+            short_take=float(settings["SHORT_TAKE"]),
+            short_stop=float(settings["SHORT_STOP"])
+        )
+
+    def to_settings(self) -> dict[str, str]:
+        return {
+            "SIGNAL_VOLUME": str(self.signal_volume),
+            "SIGNAL_MIN_CANDLES": str(self.signal_min_candles),
+            "SIGNAL_MIN_TAIL": f"{self.signal_min_tail:g}",
+            "LONG_TAKE": f"{self.long_take:g}",
+            "LONG_STOP": f"{self.long_stop:g}",
+            "SHORT_TAKE": f"{self.short_take:g}",
+            "SHORT_STOP": f"{self.short_stop:g}",
+        }
+
+
+class ChangeAndVolumeBacktest:
+    """
+    Vectorized backtest of ChangeAndVolumeStrategy with the same trade logic as Trader:
+    - a signal is calculated by completed candle and position is opened by open price of the next candle
+    - take and stop levels are set by close price of the signal candle
+    - stop or take is executed if its level is between low and high of a candle (stop is checked first)
+    - a new signal is skipped while a position is open
+    - open position is closed by the last candle of the day
+    """
+    def __init__(
+            self,
+            params: ChangeAndVolumeParams,
+            short_enabled: bool = True,
+            stop_signals_before_close_minutes: int = 0
+    ) -> None:
+        self.__params = params
+        self.__short_enabled = short_enabled
+        self.__stop_signals_before_close_seconds = stop_signals_before_close_minutes * 60
+
+    def signals(self, candles: CandleArrays) -> (np.ndarray, np.ndarray):
+        """
+        :return: Two bool arrays (long, short): signal by the candle with the index
+        """
+        price_range = candles.high - candles.low
+        is_volume = candles.volume >= self.__params.signal_volume
+
+        # (high - close) / (high - low) <= tail without division: green or red candle has high > low
+        long_candles = (candles.open < candles.close) \
+            & ((candles.high - candles.close) <= self.__params.signal_min_tail * price_range) \
+            & is_volume
+        short_candles = (candles.open > candles.close) \
+            & ((candles.close - candles.low) <= self.__params.signal_min_tail * price_range) \
+            & is_volume
+
+        long_signals = self.__all_in_window(long_candles)
+        short_signals = self.__all_in_window(short_candles) & ~long_signals if self.__short_enabled \
+            else np.zeros(len(candles), dtype=bool)
+
+        return long_signals, short_signals
+
+    def run(self, candles: CandleArrays) -> BacktestResult:
+        count = len(candles)
+        long_signals, short_signals = self.signals(candles)
+
+        day = candles.time // SECONDS_IN_DAY
+        # index of the last candle of the day for every candle
+        day_last_index = np.searchsorted(day, day, side="right") - 1
+
+        signal_indexes = np.flatnonzero(long_signals | short_signals)
+        # the next candle (to open position) has to be in the same day
+        signal_indexes = signal_indexes[signal_indexes < day_last_index[signal_indexes]]
+
+        if self.__stop_signals_before_close_seconds:
+            signals_before_time = candles.time[day_last_index] - self.__stop_signals_before_close_seconds
+            signal_indexes = signal_indexes[candles.time[signal_indexes] <= signals_before_time[signal_indexes]]
+
+        open_indexes, close_indexes, directions, open_prices, close_prices = [], [], [], [], []
+        free_from_index = 0
+
+        # Only signals are iterated in python, every position is simulated by vectorized search
+        for signal_index in signal_indexes:
+            if signal_index < free_from_index:
+                continue
+
+            is_long = bool(long_signals[signal_index])
+            signal_close = candles.close[signal_index]
+            take = signal_close * (self.__params.long_take if is_long else self.__params.short_take)
+            stop = signal_close * (self.__params.long_stop if is_long else self.__params.short_stop)
+
+            open_index = signal_index + 1
+            last_index = day_last_index[signal_index]
+
+            close_index, close_price = self.__find_close(candles, open_index, last_index, take, stop)
+
+            open_indexes.append(open_index)
+            close_indexes.append(close_index)
+            directions.append(1 if is_long else -1)
+            open_prices.append(candles.open[open_index])
+            close_prices.append(close_price)
+
+            # the next signal can be found only by a candle after close
+            free_from_index = close_index
+
+        logger.debug(f"Backtest: candles {count}, signals {len(signal_indexes)}, trades {len(open_indexes)}")
+
+        return BacktestResult(
+            open_index=np.asarray(open_indexes, dtype=np.int64),
+            close_index=np.asarray(close_indexes, dtype=np.int64),
+            direction=np.asarray(directions, dtype=np.int8),
+            open_price=np.asarray(open_prices, dtype=np.float64),
+            close_price=np.asarray(close_prices, dtype=np.float64)
+        )
+
+    def __all_in_window(self, matches: np.ndarray) -> np.ndarray:
+        """
+        True for index i if all values [i - signal_min_candles + 1, i] are True
+        """
+        window = self.__params.signal_min_candles
+        result = np.zeros(len(matches), dtype=bool)
+
+        if window <= 0 or len(matches) < window:
+            return result
+
+        matches_sum = np.cumsum(matches, dtype=np.int64)
+        window_sum = matches_sum[window - 1:].copy()
+        window_sum[1:] -= matches_sum[:-window]
+        result[window - 1:] = window_sum == window
+
+        return result
+
+    @staticmethod
+    def __find_close(
+            candles: CandleArrays,
+            open_index: int,
+            last_index: int,
+            take: float,
+            stop: float
+    ) -> (int, float):
+        low = candles.low[open_index:last_index + 1]
+        high = candles.high[open_index:last_index + 1]
+
+        stop_hits = (low <= stop) & (stop <= high)
+        take_hits = (low <= take) & (take <= high)
+        hits = np.flatnonzero(stop_hits | take_hits)
+
+        if not len(hits):
+            return last_index, candles.close[last_index]
+
+        first_hit = hits[0]
+        return open_index + first_hit, stop if stop_hits[first_hit] else take
@@ -0,0 +1,163 @@
+import itertools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
+
+from backtesting.candle_arrays import CandleArrays
+from backtesting.change_and_volume_backtest import ChangeAndVolumeBacktest, ChangeAndVolumeParams
+from backtesting.shared_candle_arrays import SharedCandleArrays, SharedCandleArraysDescriptor
+
+__all__ = ("SweepResult", "ParameterSweep")
+
+logger = logging.getLogger(__name__)
+
+# Candles of worker process: attached once by initializer and used by all tasks
+_worker_shared_candles: dict[str, SharedCandleArrays] = dict()
+_worker_candles: dict[str, CandleArrays] = dict()
+
+
+@dataclass(frozen=True, eq=False, repr=True)
+class SweepResult:
+    figi: str
+    params: ChangeAndVolumeParams
+    trades_count: int
+    total_return: float
+    hit_rate: float
+    max_drawdown: float
+
+
+def _init_worker(descriptors: dict[str, SharedCandleArraysDescriptor]) -> None:
+    for figi, descriptor in descriptors.items():
+        _worker_shared_candles[figi] = SharedCandleArrays.attach(descriptor)
+        _worker_candles[figi] = _worker_shared_candles[figi].candles()
+
+
+def _run_backtests(
+        figi: str,
+        short_enabled: bool,
+        stop_signals_before_close_minutes: int,
+        candidates: list[ChangeAndVolumeParams]
+) -> list[SweepResult]:
+    candles = _worker_candles[figi]
+    results = []
+
+    for params in candidates:
+        result = ChangeAndVolumeBacktest(params, short_enabled, stop_signals_before_close_minutes).run(candles)
+        results.append(
+            SweepResult(
+                figi=figi,
+                params=params,
+                trades_count=result.trades_count,
+                total_return=result.total_return,
+                hit_rate=result.hit_rate,
+                max_drawdown=result.max_drawdown
+            )
+        )
+
+    return results
+
+
+class ParameterSweep:
+    """
+    Grid or random search of ChangeAndVolumeStrategy parameters on all CPU cores.
+    Candles are put to shared memory once, tasks carry only parameters.
+    """
+    def __init__(
+            self,
+            workers: Optional[int] = None,
+            chunk_size: int = 50,
+            min_trades: int = 10
+    ) -> None:
+        self.__workers = workers or os.cpu_count()
+        self.__chunk_size = chunk_size
+        self.__min_trades = min_trades
+
+    @staticmethod
+    def grid(base: ChangeAndVolumeParams) -> list[ChangeAndVolumeParams]:
+        """
+        Default grid around current settings. Short take and stop are mirrored long ones.
+        """
+        volumes = sorted({max(1, round(base.signal_volume * x)) for x in (0.5, 0.75, 1, 1.5, 2)})
+        min_candles = (1, 2, 3)
+        tails = (0.1, 0.15, 0.2, 0.25, 0.3)
+        take_distances = (0.005, 0.01, 0.015, 0.02)
+        stop_distances = (0.005, 0.01, 0.015, 0.02)
+
+        return [
+            ChangeAndVolumeParams(
+                signal_volume=volume,
+                signal_min_candles=candles,
+                signal_min_tail=tail,
+                long_take=round(1 + take, 6),
+                long_stop=round(1 - stop, 6),
+                short_take=round(1 - take, 6),
+                short_stop=round(1 + stop, 6)
+            )
+            for volume, candles, tail, take, stop in itertools.product(
+                volumes, min_candles, tails, take_distances, stop_distances
+            )
+        ]
+
+    @staticmethod
+    def random_sample(
+            candidates: list[ChangeAndVolumeParams],
+            count: int,
+            seed: Optional[int] = None
+    ) -> list[ChangeAndVolumeParams]:
+        if count >= len(candidates):
+            return candidates
+
+        return random.Random(seed).sample(candidates, count)
+
+    def run(
+            self,
+            candles: dict[str, CandleArrays],
+            candidates: dict[str, list[ChangeAndVolumeParams]],
+            short_enabled: dict[str, bool],
+            stop_signals_before_close_minutes: int = 0
+    ) -> dict[str, list[SweepResult]]:
+        """
+        :return: Results by figi, the best is the first
+        """
+        shared_candles = {figi: SharedCandleArrays.create(figi_candles) for figi, figi_candles in candles.items()}
+        results: dict[str, list[SweepResult]] = {figi: [] for figi in candidates.keys()}
+
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=self.__workers,
+                    initializer=_init_worker,
+                    initargs=({figi: x.descriptor for figi, x in shared_candles.items()}, )
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _run_backtests,
+                        figi,
+                        short_enabled.get(figi, True),
+                        stop_signals_before_close_minutes,
+                        figi_candidates[i:i + self.__chunk_size]
+                    )
+                    for figi, figi_candidates in candidates.items()
+                    for i in range(0, len(figi_candidates), self.__chunk_size)
+                ]
+                logger.info(f"Parameter sweep: {len(futures)} tasks on {self.__workers} workers")
+
+                for future in as_completed(futures):
+                    for result in future.result():
+                        results[result.figi].append(result)
+        finally:
+            for x in shared_candles.values():
+                x.unlink()
+
+        for figi_results in results.values():
+            figi_results.sort(key=self.__score, reverse=True)
+
+        return results
+
+    def __score(self, result: SweepResult) -> float:
+        if result.trades_count < self.__min_trades:
+            return float("-inf")
+
+        return result.total_return
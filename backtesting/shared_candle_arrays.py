@@ -0,0 +1,78 @@
+import logging
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from backtesting.candle_arrays import CandleArrays
+
+__all__ = ("SharedCandleArrays")
+
+logger = logging.getLogger(__name__)
+
+# (shared memory name, [(column name, dtype, offset in bytes, length)])
+SharedCandleArraysDescriptor = tuple[str, list[tuple[str, str, int, int]]]
+
+
+class SharedCandleArrays:
+    """
+    Candle columns in one block of shared memory.
+    The owner process creates the block, worker processes attach it by small descriptor without pickling arrays.
+    """
+    __COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, shared_block: shared_memory.SharedMemory, descriptor: SharedCandleArraysDescriptor) -> None:
+        self.__shared_block = shared_block
+        self.__descriptor = descriptor
+
+    @property
+    def descriptor(self) -> SharedCandleArraysDescriptor:
+        return self.__descriptor
+
+    @staticmethod
+    def create(candles: CandleArrays) -> "SharedCandleArrays":
+        columns = [np.ascontiguousarray(getattr(candles, column)) for column in SharedCandleArrays.__COLUMNS]
+        # shared memory can't have zero size
+        shared_block = shared_memory.SharedMemory(create=True, size=max(1, sum(x.nbytes for x in columns)))
+
+        layout = []
+        offset = 0
+        for name, column in zip(SharedCandleArrays.__COLUMNS, columns):
+            np.ndarray(column.shape, dtype=column.dtype, buffer=shared_block.buf, offset=offset)[:] = column
+            layout.append((name, column.dtype.str, offset, len(column)))
+            offset += column.nbytes
+
+        return SharedCandleArrays(shared_block, (shared_block.name, layout))
+
+    @staticmethod
+    def attach(descriptor: SharedCandleArraysDescriptor) -> "SharedCandleArrays":
+        shared_block = shared_memory.SharedMemory(name=descriptor[0])
+
+        # The block is owned by the creator. A spawned worker has own resource tracker,
+        # without unregister the tracker removes the block when the worker exits.
+        if multiprocessing.get_start_method() == "spawn":
+            try:
+                resource_tracker.unregister(shared_block._name, "shared_memory")
+            except Exception as ex:
+                logger.debug(f"Unregister shared memory error: {repr(ex)}")
+
+        return SharedCandleArrays(shared_block, descriptor)
+
+    def candles(self) -> CandleArrays:
+        """
+        Arrays are views of shared memory (without copy)
+        """
+        return CandleArrays(**{
+            name: np.ndarray((length,), dtype=np.dtype(dtype), buffer=self.__shared_block.buf, offset=offset)
+            for name, dtype, offset, length in self.__descriptor[1]
+        })
+
+    def close(self) -> None:
+        self.__shared_block.close()
+
+    def unlink(self) -> None:
+        """
+        Only the creator has to call it, after all workers have finished
+        """
+        self.__shared_block.close()
+        self.__shared_block.unlink()
@@ -0,0 +1,131 @@
+"""
+Per-call latency of OrderService.post_market_order and MarketDataService.is_stock_ready_for_trading
+with and without the shared channel pool.
+
+The stand-in is a local plaintext gRPC server, so the numbers are a lower bound:
+against the real API every new channel also pays a TLS handshake.
+
+Run from the project root:
+    python -m benchmarks.client_pool_benchmark
+"""
+import argparse
+import statistics
+import time
+from concurrent import futures
+from contextlib import contextmanager
+from typing import Callable
+
+import grpc
+from tinkoff.invest.grpc import marketdata_pb2, marketdata_pb2_grpc, orders_pb2, orders_pb2_grpc
+
+from invest_api.client_pool import InvestClientPool
+from invest_api.services.market_data_service import MarketDataService
+from invest_api.services.orders_service import OrderService
+
+# SECURITY_TRADING_STATUS_NORMAL_TRADING
+NORMAL_TRADING_STATUS = 5
+TEST_FIGI = "BBG004730N88"
+
+
+class _OrdersServicer(orders_pb2_grpc.OrdersServiceServicer):
+    def PostOrder(self, request, context):
+        return orders_pb2.PostOrderResponse(
+            order_id=request.order_id,
+            figi=request.figi,
+            lots_requested=request.quantity,
+            lots_executed=request.quantity,
+            execution_report_status=orders_pb2.EXECUTION_REPORT_STATUS_FILL
+        )
+
+
+class _MarketDataServicer(marketdata_pb2_grpc.MarketDataServiceServicer):
+    def GetTradingStatus(self, request, context):
+        return marketdata_pb2.GetTradingStatusResponse(
+            figi=request.figi,
+            trading_status=NORMAL_TRADING_STATUS,
+            limit_order_available_flag=True,
+            market_order_available_flag=True,
+            api_trade_available_flag=True
+        )
+
+
+class _PerCallClientPool:
+    """
+    Old behaviour: new channel for every request.
+    """
+    def __init__(self, target: str) -> None:
+        self.__target = target
+
+    @contextmanager
+    def client(self):
+        pool = InvestClientPool("token", "benchmark", target=self.__target, secure=False)
+        try:
+            with pool.client() as client:
+                yield client
+        finally:
+            pool.close()
+
+
+def start_stand_in_server() -> (grpc.Server, str):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    orders_pb2_grpc.add_OrdersServiceServicer_to_server(_OrdersServicer(), server)
+    marketdata_pb2_grpc.add_MarketDataServiceServicer_to_server(_MarketDataServicer(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+
+    return server, f"localhost:{port}"
+
+
+def measure(call: Callable[[], object], count: int) -> dict[str, float]:
+    # warm up
+    call()
+
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def run(count: int) -> None:
+    server, target = start_stand_in_server()
+
+    pooled = InvestClientPool("token", "benchmark", target=target, secure=False)
+    per_call = _PerCallClientPool(target)
+
+    try:
+        for name, pool in (("per-call channel", per_call), ("shared channel", pooled)):
+            order_service = OrderService(pool)
+            market_data_service = MarketDataService(pool)
+
+            results = {
+                "post_market_order": measure(
+                    lambda: order_service.post_market_order("account", TEST_FIGI, 1, True),
+                    count
+                ),
+                "is_stock_ready_for_trading": measure(
+                    lambda: market_data_service.is_stock_ready_for_trading(TEST_FIGI),
+                    count
+                ),
+            }
+
+            for method, stats in results.items():
+                print(f"{name:>16} {method:>28}: "
+                      f"mean {stats['mean_ms']:.3f} ms, p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms")
+    finally:
+        pooled.close()
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="requests per method")
+
+    run(parser.parse_args().count)
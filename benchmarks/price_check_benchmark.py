@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the stop loss and take profit check of Trader:
+Decimal levels with quotation_to_decimal against fixed-point nanos levels with quotation_to_fixed.
+
+Run from the project root:
+    python -m benchmarks.price_check_benchmark
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from tinkoff.invest import HistoricCandle
+from tinkoff.invest.utils import quotation_to_decimal
+
+from benchmarks.strategy_window_benchmark import make_candles
+from invest_api.utils import decimal_to_fixed, quotation_to_fixed
+
+
+def decimal_check(candles: list[HistoricCandle], stop: Decimal, take: Decimal) -> int:
+    hits = 0
+
+    for candle in candles:
+        high, low = quotation_to_decimal(candle.high), quotation_to_decimal(candle.low)
+
+        if low <= stop <= high:
+            hits += 1
+        elif low <= take <= high:
+            hits += 1
+
+    return hits
+
+
+def fixed_check(candles: list[HistoricCandle], stop: int, take: int) -> int:
+    hits = 0
+
+    for candle in candles:
+        high, low = quotation_to_fixed(candle.high), quotation_to_fixed(candle.low)
+
+        if low <= stop <= high:
+            hits += 1
+        elif low <= take <= high:
+            hits += 1
+
+    return hits
+
+
+def run(count: int) -> None:
+    candles = make_candles(count)
+    stop, take = Decimal("249.5"), Decimal("250.75")
+
+    checks = {
+        "Decimal": lambda: decimal_check(candles, stop, take),
+        "fixed nanos": lambda: fixed_check(candles, decimal_to_fixed(stop), decimal_to_fixed(take)),
+    }
+
+    hits = dict()
+    for name, check in checks.items():
+        start = time.perf_counter()
+        hits[name] = check()
+        elapsed = time.perf_counter() - start
+
+        print(f"{name:>12}: {count / elapsed:,.0f} candles/s, hits: {hits[name]}")
+
+    if len(set(hits.values())) != 1:
+        print(f"WARNING: different count of hits {hits}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500000, help="count of candles")
+    args = parser.parse_args()
+
+    run(args.count)
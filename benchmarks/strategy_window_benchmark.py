@@ -0,0 +1,125 @@
+"""
+Micro-benchmark of ChangeAndVolumeStrategy.analyze_candles:
+the previous list window (re-slicing and re-converting every candle on every call) against the ring buffer.
+
+Run from the project root:
+    python -m benchmarks.strategy_window_benchmark
+"""
+import argparse
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from tinkoff.invest import HistoricCandle
+from tinkoff.invest.utils import quotation_to_decimal, decimal_to_quotation
+
+from configuration.settings import StrategySettings
+from trade_system.strategies.change_and_volume_strategy import ChangeAndVolumeStrategy
+
+
+class _ListWindowStrategy:
+    """
+    Signal detection of ChangeAndVolumeStrategy before the ring buffer (reference copy)
+    """
+    def __init__(self, settings: dict) -> None:
+        self.__signal_volume = int(settings["SIGNAL_VOLUME"])
+        self.__signal_min_candles = int(settings["SIGNAL_MIN_CANDLES"])
+        self.__signal_min_tail = Decimal(settings["SIGNAL_MIN_TAIL"])
+        self.__recent_candles = []
+
+    def analyze_candles(self, candles: list[HistoricCandle]) -> bool:
+        self.__recent_candles.extend(candles)
+
+        if len(self.__recent_candles) < self.__signal_min_candles:
+            return False
+
+        sorted(self.__recent_candles, key=lambda x: x.time)
+
+        if len(self.__recent_candles) > self.__signal_min_candles:
+            self.__recent_candles = self.__recent_candles[len(self.__recent_candles) - self.__signal_min_candles:]
+
+        return self.__is_match(True) or self.__is_match(False)
+
+    def __is_match(self, is_long: bool) -> bool:
+        for candle in self.__recent_candles:
+            open_, high, close, low = quotation_to_decimal(candle.open), quotation_to_decimal(candle.high), \
+                                      quotation_to_decimal(candle.close), quotation_to_decimal(candle.low)
+            tail = (high - close) if is_long else (close - low)
+            is_color = open_ < close if is_long else open_ > close
+
+            if is_color and (tail / (high - low)) <= self.__signal_min_tail \
+                    and candle.volume >= self.__signal_volume:
+                continue
+            break
+        else:
+            return True
+
+        return False
+
+
+def make_candles(count: int, seed: int = 1) -> list[HistoricCandle]:
+    rnd = random.Random(seed)
+    price = 250.0
+    time_ = datetime.datetime(2024, 1, 1, 7, tzinfo=datetime.timezone.utc)
+    candles = []
+
+    for _ in range(count):
+        open_ = price
+        close = max(1.0, open_ + rnd.gauss(0, 0.3))
+        high = max(open_, close) + abs(rnd.gauss(0, 0.1))
+        low = min(open_, close) - abs(rnd.gauss(0, 0.1))
+        candles.append(
+            HistoricCandle(
+                open=decimal_to_quotation(Decimal(f"{open_:.2f}")),
+                high=decimal_to_quotation(Decimal(f"{high:.2f}")),
+                low=decimal_to_quotation(Decimal(f"{low:.2f}")),
+                close=decimal_to_quotation(Decimal(f"{close:.2f}")),
+                volume=rnd.randint(0, 40000),
+                time=time_,
+                is_complete=True
+            )
+        )
+        price = close
+        time_ += datetime.timedelta(minutes=1)
+
+    return candles
+
+
+def run(count: int, min_candles: int) -> None:
+    settings = {
+        "SIGNAL_VOLUME": "21000",
+        "SIGNAL_MIN_CANDLES": str(min_candles),
+        "SIGNAL_MIN_TAIL": "0.2",
+        "LONG_TAKE": "1.01",
+        "LONG_STOP": "0.985",
+        "SHORT_TAKE": "0.99",
+        "SHORT_STOP": "1.015",
+    }
+    candles = make_candles(count)
+
+    strategies = {
+        "list window": _ListWindowStrategy(settings),
+        "ring buffer": ChangeAndVolumeStrategy(StrategySettings(figi="BENCHMARK", settings=settings)),
+    }
+
+    signals = dict()
+    for name, strategy in strategies.items():
+        start = time.perf_counter()
+        signals[name] = sum(1 for candle in candles if strategy.analyze_candles([candle]))
+        elapsed = time.perf_counter() - start
+
+        print(f"{name:>12} (SIGNAL_MIN_CANDLES={min_candles}): {count / elapsed:,.0f} candles/s, "
+              f"signals: {signals[name]}")
+
+    if len(set(signals.values())) != 1:
+        print(f"WARNING: different count of signals {signals}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200000, help="count of candles")
+    args = parser.parse_args()
+
+    for window in (2, 5, 20):
+        run(args.count, window)
@@ -0,0 +1,284 @@
+"""
+End-to-end benchmark of Trader.trade_day with in-process fakes of api services
+and synthetic candles replayed as fast as possible (ReplayStreamService + SimulatedClock).
+
+Measured for every count of figies:
+- candles/s: candle updates from the stream processed by Trader per second
+- p50/p99 candle-to-order latency: from the stream update to the order post (only orders during trading)
+- memory growth: traced memory after trade_day minus before, and peak (separate run with tracemalloc)
+
+Results are written as JSON to compare versions.
+
+Run from the project root:
+    python -m benchmarks.trader_benchmark --output trader_benchmark.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from decimal import Decimal
+from typing import AsyncGenerator, Optional
+
+from tinkoff.invest import Candle, MoneyValue, OrderDirection, OrderExecutionReportStatus, OrderState, \
+    PositionsResponse, PositionsSecurities, PostOrderResponse, Quotation
+
+from benchmarks.strategy_window_benchmark import make_candles
+from blog.blogger import Blogger
+from blog.messages_queue import BlogMessagesQueue
+from configuration.settings import BlogSettings, ShareSettings, StrategySettings, TradingSettings
+from invest_api.utils import NANOS_IN_UNIT, decimal_to_moneyvalue, generate_order_id, rub_currency_name
+from replay.replay_stream_service import ReplayStreamService
+from trade_system.strategies.change_and_volume_strategy import ChangeAndVolumeStrategy
+from trading.clock import SimulatedClock
+from trading.trader import Trader
+
+ACCOUNT_ID = "BENCHMARK"
+START_TIME = datetime.datetime(2024, 1, 1, 7, tzinfo=datetime.timezone.utc)
+STRATEGY_SETTINGS = {
+    "SIGNAL_VOLUME": "15000",
+    "SIGNAL_MIN_CANDLES": "2",
+    "SIGNAL_MIN_TAIL": "0.3",
+    "LONG_TAKE": "1.004",
+    "LONG_STOP": "0.996",
+    "SHORT_TAKE": "0.996",
+    "SHORT_STOP": "1.004",
+}
+
+
+class _TimedStream:
+    """
+    Replay stream which remembers when the latest update of every figi has been given to Trader
+    """
+    def __init__(self, replay: ReplayStreamService) -> None:
+        self.__replay = replay
+        self.received_at: dict[str, float] = dict()
+        self.last_close: dict[str, Quotation] = dict()
+        self.updates_count = 0
+        self.is_active = False
+
+    async def start_async_candles_stream(
+            self,
+            figies: list[str],
+            trade_before_time: datetime
+    ) -> AsyncGenerator[Candle, None]:
+        self.is_active = True
+
+        try:
+            async for candle in self.__replay.start_async_candles_stream(figies, trade_before_time):
+                self.updates_count += 1
+                self.last_close[candle.figi] = candle.close
+                self.received_at[candle.figi] = time.perf_counter()
+                yield candle
+        finally:
+            self.is_active = False
+
+
+class _FakeClientService:
+    async def cancel_all_orders_async(self, account_id: str) -> None:
+        return None
+
+
+class _FakeInstrumentService:
+    async def share_by_figi_async(self, figi: str) -> ShareSettings:
+        return ShareSettings(
+            ticker=figi,
+            lot=1,
+            short_enabled_flag=True,
+            otc_flag=False,
+            buy_available_flag=True,
+            sell_available_flag=True,
+            api_trade_available_flag=True
+        )
+
+    async def shares_by_figies_async(self, figies: list[str]) -> dict[str, ShareSettings]:
+        return {figi: await self.share_by_figi_async(figi) for figi in figies}
+
+
+class _FakeOperationService:
+    def __init__(self, rub: int) -> None:
+        self.__rub = rub
+
+    async def positions_async(self, account_id: str) -> PositionsResponse:
+        return PositionsResponse(money=[decimal_to_moneyvalue(Decimal(self.__rub))])
+
+    async def positions_securities_async(self, account_id: str) -> list[PositionsSecurities]:
+        return []
+
+    async def available_rub_on_account_async(self, account_id: str) -> int:
+        return self.__rub * NANOS_IN_UNIT
+
+
+class _FakeOperationsStreamService:
+    async def start_async_positions_stream(self, account_id: str) -> AsyncGenerator:
+        # nothing is changed outside of the benchmark: the ledger is updated by order fills only
+        await asyncio.Event().wait()
+        yield
+
+
+class _FakeMarketDataService:
+    async def is_stock_ready_for_trading_async(self, figi: str) -> bool:
+        return True
+
+    async def get_last_prices_async(self, figies: list[str]) -> dict[str, Quotation]:
+        return dict()
+
+
+class _FakeOrderService:
+    def __init__(self, stream: _TimedStream) -> None:
+        self.__stream = stream
+        self.latencies: list[float] = []
+
+    async def post_market_order_async(
+            self,
+            account_id: str,
+            figi: str,
+            count_lots: int,
+            is_buy: bool
+    ) -> PostOrderResponse:
+        if self.__stream.is_active and figi in self.__stream.received_at:
+            self.latencies.append(time.perf_counter() - self.__stream.received_at[figi])
+
+        price = self.__stream.last_close.get(figi, Quotation(units=100, nano=0))
+
+        return PostOrderResponse(
+            order_id=generate_order_id(),
+            figi=figi,
+            direction=OrderDirection.ORDER_DIRECTION_BUY if is_buy else OrderDirection.ORDER_DIRECTION_SELL,
+            lots_requested=count_lots,
+            lots_executed=count_lots,
+            execution_report_status=OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL,
+            executed_order_price=MoneyValue(currency=rub_currency_name(), units=price.units, nano=price.nano),
+            executed_commission=MoneyValue(currency=rub_currency_name(), units=0, nano=0)
+        )
+
+    async def get_order_state_async(self, account_id: str, order_id: str) -> OrderState:
+        return OrderState(order_id=order_id)
+
+    async def get_order_states_async(self, account_id: str, order_ids: list[str]) -> dict[str, OrderState]:
+        return {x: OrderState(order_id=x) for x in order_ids}
+
+
+def figies_candles(figies_count: int, candles_count: int) -> dict:
+    return {f"FIGI{i:04}": make_candles(candles_count, seed=i) for i in range(figies_count)}
+
+
+async def trade_day(candles: dict, candles_count: int) -> (_TimedStream, _FakeOrderService):
+    clock = SimulatedClock(START_TIME)
+    stream = _TimedStream(ReplayStreamService(candles, clock))
+    order_service = _FakeOrderService(stream)
+    trading_settings = TradingSettings(delay_start_after_open=0, stop_trade_before_close=60,
+                                       stop_signals_before_close=5)
+    strategies_settings = [
+        StrategySettings(name="ChangeAndVolumeStrategy", figi=figi, ticker=figi, max_lots_per_order=1,
+                         settings=STRATEGY_SETTINGS)
+        for figi in candles.keys()
+    ]
+
+    trader = Trader(
+        client_service=_FakeClientService(),
+        instrument_service=_FakeInstrumentService(),
+        operation_service=_FakeOperationService(rub=10_000_000),
+        operations_stream_service=_FakeOperationsStreamService(),
+        order_service=order_service,
+        stream_service=stream,
+        market_data_service=_FakeMarketDataService(),
+        blogger=Blogger(BlogSettings(blog_status=False, bot_token="", chat_id=""), strategies_settings,
+                        BlogMessagesQueue()),
+        clock=clock
+    )
+
+    await trader.trade_day(
+        ACCOUNT_ID,
+        trading_settings,
+        [ChangeAndVolumeStrategy(x) for x in strategies_settings],
+        START_TIME + datetime.timedelta(minutes=candles_count, seconds=trading_settings.stop_trade_before_close),
+        min_rub=0
+    )
+
+    return stream, order_service
+
+
+def percentile(values: list[float], percent: int) -> Optional[float]:
+    if len(values) < 2:
+        return values[0] if values else None
+
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def run(figies_count: int, candles_count: int) -> dict:
+    candles = figies_candles(figies_count, candles_count)
+
+    start = time.perf_counter()
+    stream, order_service = asyncio.run(trade_day(candles, candles_count))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    asyncio.run(trade_day(candles, candles_count))
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies_us = [x * 1e6 for x in order_service.latencies]
+    result = {
+        "figies": figies_count,
+        "candles_per_figi": candles_count,
+        "candle_updates": stream.updates_count,
+        "seconds": round(elapsed, 3),
+        "candles_per_second": round(stream.updates_count / elapsed, 1),
+        "orders": len(latencies_us),
+        "latency_p50_us": percentile(latencies_us, 50),
+        "latency_p99_us": percentile(latencies_us, 99),
+        "memory_growth_bytes": after - before,
+        "memory_peak_bytes": peak - before,
+    }
+
+    print(f"figies {figies_count:>4}: {result['candles_per_second']:>12,.0f} candles/s, "
+          f"orders {result['orders']:>6}, p50 {result['latency_p50_us'] or 0:>8.1f} us, "
+          f"p99 {result['latency_p99_us'] or 0:>8.1f} us, "
+          f"memory growth {result['memory_growth_bytes'] / 1024:>10,.0f} KiB, "
+          f"peak {result['memory_peak_bytes'] / 1024:>10,.0f} KiB")
+
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--figies", type=int, nargs="+", default=[4, 50, 200, 500], help="counts of figies")
+    parser.add_argument("--candles", type=int, default=500, help="count of 1-minute candles per figi")
+    parser.add_argument("--output", default="trader_benchmark.json", help="file for JSON results")
+    args = parser.parse_args()
+
+    # trading logs are not a part of the measurement
+    logging.disable(logging.CRITICAL)
+
+    results = [run(figies_count, args.candles) for figies_count in args.figies]
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "benchmark": "trader",
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "created": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+                "results": results,
+            },
+            file,
+            indent=2
+        )
+
+    print(f"Results have been written to {args.output}")
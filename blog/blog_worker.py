@@ -1,27 +1,45 @@
 import asyncio
 import logging
+import time
 
+from blog.messages_queue import BlogMessagesQueue, MessagePriority
 from configuration.settings import BlogSettings
+from metrics.latency_metrics import span
 from tg_api.telegram_service import TelegramService
 
 __all__ = ("BlogWorker")
 
 logger = logging.getLogger(__name__)
 
+# Telegram limit of text message length
+MAX_MESSAGE_LENGTH = 4096
+# Backoff after failed sends: 2, 4, 8... seconds up to the max
+SEND_BACKOFF_BASE_SECONDS = 2.0
+SEND_BACKOFF_MAX_SECONDS = 300.0
+
 
 class BlogWorker:
     """
     Class is represent worker (coroutine) for asyncio task.
     Checks available messages in queue and sends they asynchronously.
     Telegram API works pretty long to use it synchronously.
+    Pending messages are joined into as few telegram messages as the length limit allows,
+    sends are limited by token bucket (telegram flood limits).
+    Messages of a failed send are put back to the queue, the next send waits for backoff.
     """
     def __init__(
             self,
             blog_settings: BlogSettings,
-            messages_queue: asyncio.Queue
+            messages_queue: BlogMessagesQueue
     ) -> None:
         self.__messages_queue = messages_queue
         self.__tg_status = False
+        self.__messages_per_second = blog_settings.messages_per_minute / 60
+        self.__burst = max(1, blog_settings.messages_burst)
+        self.__tokens = float(self.__burst)
+        self.__tokens_updated = time.monotonic()
+        # failed sends in a row
+        self.__failed_sends = 0
 
         self.__init_tg(blog_settings.bot_token, blog_settings.chat_id)
 
@@ -44,11 +62,60 @@ class BlogWorker:
     async def worker(self) -> None:
         while True:
             try:
-                message = await self.__messages_queue.get()
+                await self.__messages_queue.wait()
+                # messages are coming while the worker waits for the token: all of them go in one send
+                await self.__wait_token()
+
+                messages = self.__next_messages()
+                message = "\n".join(text for _, text in messages)[:MAX_MESSAGE_LENGTH]
                 logger.debug(f"Get message form queue (size: {self.__messages_queue.qsize()}): {message}")
 
                 if self.__tg_status:
-                    await self.__telegram_service.send_text_message(message)
+                    await self.__send(message, messages)
 
             except Exception as ex:
                 logger.error(f"TG messages worker error: {repr(ex)}")
+
+    async def __send(self, message: str, messages: list[tuple[MessagePriority, str]]) -> None:
+        try:
+            with span("blog_send_seconds"):
+                await self.__telegram_service.send_text_message(message)
+        except Exception as ex:
+            # the queue decides what to drop if it is full
+            self.__messages_queue.put_back_nowait(messages)
+            self.__failed_sends += 1
+
+            delay = min(SEND_BACKOFF_MAX_SECONDS, SEND_BACKOFF_BASE_SECONDS * 2 ** (self.__failed_sends - 1))
+            logger.error(f"TG send error, {len(messages)} messages have been put back, "
+                         f"next send in {delay:.0f} s: {repr(ex)}")
+            await asyncio.sleep(delay)
+        else:
+            self.__failed_sends = 0
+
+    def __next_messages(self) -> list[tuple[MessagePriority, str]]:
+        dropped_count = self.__messages_queue.pop_dropped_count()
+        dropped_text = f"({dropped_count} messages have been dropped)" if dropped_count else ""
+
+        messages = self.__messages_queue.get_batch_nowait(MAX_MESSAGE_LENGTH - len(dropped_text) - 1)
+        if dropped_text:
+            messages.append((MessagePriority.INFO, dropped_text))
+
+        return messages
+
+    async def __wait_token(self) -> None:
+        if self.__messages_per_second <= 0:
+            return None
+
+        while True:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.__burst,
+                self.__tokens + (now - self.__tokens_updated) * self.__messages_per_second
+            )
+            self.__tokens_updated = now
+
+            if self.__tokens >= 1:
+                self.__tokens -= 1
+                return None
+
+            await asyncio.sleep((1 - self.__tokens) / self.__messages_per_second)
@@ -1,11 +1,10 @@
-import asyncio
 import logging
-from decimal import Decimal
 
 from tinkoff.invest import OrderState
 
+from blog.messages_queue import BlogMessagesQueue, MessagePriority
 from configuration.settings import BlogSettings, StrategySettings
-from invest_api.utils import moneyvalue_to_decimal
+from invest_api.utils import FixedPrice, fixed_to_decimal, moneyvalue_to_decimal
 from trade_system.signal import SignalType
 from trade_system.strategies.base_strategy import IStrategy
 from trading.trade_results import TradeOrder
@@ -18,36 +17,52 @@ logger = logging.getLogger(__name__)
 class Blogger:
     """
     Class formats and sends messages to telegram chat.
+    Messages are labeled with account name (if it's given): several accounts write to the same chat.
     """
     def __init__(
             self,
             blog_settings: BlogSettings,
             trade_strategies: list[StrategySettings],
-            messages_queue: asyncio.Queue
+            messages_queue: BlogMessagesQueue,
+            account_name: str = ""
     ) -> None:
+        self.__blog_settings = blog_settings
         self.__blog_status = blog_settings.blog_status
         self.__trade_strategies: dict[str, StrategySettings] = {x.figi: x for x in trade_strategies}
         self.__messages_queue = messages_queue
+        self.__account_prefix = f"[{account_name}] " if account_name else ""
 
-    def __send_text_message(self, text: str) -> None:
+    def for_account(self, account_name: str) -> "Blogger":
+        """
+        Blogger with the same chat and settings for messages of the account
+        """
+        return Blogger(
+            self.__blog_settings,
+            list(self.__trade_strategies.values()),
+            self.__messages_queue,
+            account_name
+        )
+
+    def __send_text_message(self, text: str, priority: MessagePriority = MessagePriority.INFO) -> None:
         try:
+            text = self.__account_prefix + text
             logger.debug(f"Put message to telegram messages queue: {text}")
 
-            self.__messages_queue.put_nowait(text)
+            self.__messages_queue.put_nowait(text, priority)
         except Exception as ex:
             logger.error(f"Error put message to telegram messages queue: {repr(ex)}")
 
     def start_trading_message(
             self,
             today_trade_strategy: dict[str, IStrategy],
-            rub_before_trade_day: Decimal
+            rub_before_trade_day: FixedPrice
     ) -> None:
         """
         The method sends message about depo size, list of stocks for today trading and greetings also.
         """
         if self.__blog_status:
             self.__send_text_message("Greetings! We are starting.")
-            self.__send_text_message(f"Depo size: {rub_before_trade_day:.2f} rub")
+            self.__send_text_message(f"Depo size: {fixed_to_decimal(rub_before_trade_day):.2f} rub")
             self.__send_text_message("Stocks list:")
             for figi_key, strategy_value in today_trade_strategy.items():
                 self.__send_text_message(
@@ -69,7 +84,8 @@ class Blogger:
         if self.__blog_status and trade_order:
             signal_type = Blogger.__signal_type_to_message_test(trade_order.signal.signal_type)
             self.__send_text_message(
-                f"{self.__trade_strategies[trade_order.signal.figi].ticker} position {signal_type} has been closed."
+                f"{self.__trade_strategies[trade_order.signal.figi].ticker} position {signal_type} has been closed.",
+                MessagePriority.POSITION
             )
 
     def open_position_message(self, trade_order: TradeOrder) -> None:
@@ -80,19 +96,23 @@ class Blogger:
             signal_type = Blogger.__signal_type_to_message_test(trade_order.signal.signal_type)
             self.__send_text_message(
                 f"{self.__trade_strategies[trade_order.signal.figi].ticker} position {signal_type} has been opened. "
-                f"Take profit level: {trade_order.signal.take_profit_level:.2f}. "
-                f"Stop loss level: {trade_order.signal.stop_loss_level:.2f}."
+                f"Take profit level: {fixed_to_decimal(trade_order.signal.take_profit_level):.2f}. "
+                f"Stop loss level: {fixed_to_decimal(trade_order.signal.stop_loss_level):.2f}.",
+                MessagePriority.POSITION
             )
 
     def trading_depo_summary_message(
             self,
-            rub_before_trade_day: Decimal,
-            current_rub_on_depo: Decimal
+            rub_before_trade_day: FixedPrice,
+            current_rub_on_depo: FixedPrice
     ) -> None:
         """
         The method sends information about trading day summary.
         """
         if self.__blog_status:
+            rub_before_trade_day = fixed_to_decimal(rub_before_trade_day)
+            current_rub_on_depo = fixed_to_decimal(current_rub_on_depo)
+
             self.__send_text_message(
                 f"Start depo: {rub_before_trade_day:.2f} close depo:{current_rub_on_depo:.2f}."
             )
@@ -108,7 +128,8 @@ class Blogger:
         if self.__blog_status:
             self.__send_text_message(
                 f"Something went wrong. We are trying to close all positions. "
-                f"If we fail, please try to do it himself."
+                f"If we fail, please try to do it himself.",
+                MessagePriority.CRITICAL
             )
 
     def summary_message(self):
@@ -142,7 +163,8 @@ class Blogger:
                 f"{moneyvalue_to_decimal(open_order_state.total_order_amount):.2f}. "
                 f"Total commissions: "
                 f"{summary_commission:.2f}. "
-                f"You have to close position manually."
+                f"You have to close position manually.",
+                MessagePriority.CRITICAL
             )
 
     def summary_closed_signal_message(self,
@@ -172,6 +194,26 @@ class Blogger:
                 f"{summary_commission:.2f}."
             )
 
+    def summary_closed_by_exit_order_message(self, trade_order: TradeOrder, open_order_state: OrderState) -> None:
+        """
+        The method sends summary information about positions closed by exchange take profit or stop loss
+        """
+        if self.__blog_status:
+            signal_type = Blogger.__signal_type_to_message_test(trade_order.signal.signal_type)
+            summary_commission = moneyvalue_to_decimal(open_order_state.executed_commission) + \
+                                 moneyvalue_to_decimal(open_order_state.service_commission)
+            self.__send_text_message(
+                f"Close {signal_type} position for {self.__trade_strategies[trade_order.signal.figi].ticker} "
+                f"by exchange stop order {trade_order.close_stop_order_id}. "
+                f"Lots executed: {open_order_state.lots_executed}. "
+                f"Average open price: "
+                f"{moneyvalue_to_decimal(open_order_state.average_position_price):.2f}. "
+                f"Take profit level: {fixed_to_decimal(trade_order.signal.take_profit_level):.2f}. "
+                f"Stop loss level: {fixed_to_decimal(trade_order.signal.stop_loss_level):.2f}. "
+                f"Open commissions: "
+                f"{summary_commission:.2f}."
+            )
+
     @staticmethod
     def __signal_type_to_message_test(signal_type: SignalType) -> str:
         return "long" if signal_type == SignalType.LONG else "short"
@@ -0,0 +1,105 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from enum import IntEnum
+
+__all__ = ("MessagePriority", "BlogMessagesQueue")
+
+logger = logging.getLogger(__name__)
+
+
+class MessagePriority(IntEnum):
+    """
+    Less value - more important message
+    """
+    CRITICAL = 0
+    POSITION = 1
+    INFO = 2
+
+
+class BlogMessagesQueue:
+    """
+    Bounded priority queue of telegram messages. Blogger produces, BlogWorker consumes.
+    Messages are taken by priority and in order of putting within the same priority.
+    If the queue is full, the newest message of the least important priority is dropped
+    (or the new one if it is less important than all in the queue). Dropped messages are counted.
+    Messages of a failed send are put back ahead of newer messages of the same priority.
+    """
+    def __init__(self, max_size: int = 200) -> None:
+        self.__max_size = max_size
+        # (priority, sequence number, text)
+        self.__heap: list[tuple[int, int, str]] = []
+        self.__sequence = itertools.count()
+        # put back messages go before all queued ones of the same priority
+        self.__put_back_sequence = itertools.count(-1, -1)
+        self.__not_empty = asyncio.Event()
+        self.__dropped_count = 0
+
+    def qsize(self) -> int:
+        return len(self.__heap)
+
+    def put_nowait(self, text: str, priority: MessagePriority = MessagePriority.INFO) -> None:
+        self.__put((int(priority), next(self.__sequence), text))
+
+    def put_back_nowait(self, messages: list[tuple[MessagePriority, str]]) -> None:
+        """
+        Returns messages taken by get_batch_nowait (the send has failed). The drop policy is applied as for new ones.
+        """
+        for priority, text in reversed(messages):
+            self.__put((int(priority), next(self.__put_back_sequence), text))
+
+    def __put(self, item: tuple[int, int, str]) -> None:
+        if len(self.__heap) >= self.__max_size:
+            least_item = max(self.__heap)
+            if least_item[0] < item[0]:
+                self.__drop(item)
+                return None
+
+            self.__heap.remove(least_item)
+            heapq.heapify(self.__heap)
+            self.__drop(least_item)
+
+        heapq.heappush(self.__heap, item)
+        self.__not_empty.set()
+
+    async def wait(self) -> None:
+        """
+        Waits for at least one message in the queue
+        """
+        await self.__not_empty.wait()
+
+    def get_batch_nowait(self, max_length: int, separator: str = "\n") -> list[tuple[MessagePriority, str]]:
+        """
+        Takes messages by priority while their texts joined with separator fit max_length.
+        The first message is always taken.
+        :return: (priority, text) of taken messages
+        """
+        batch = []
+        length = 0
+
+        while self.__heap:
+            priority, _, text = self.__heap[0]
+            new_length = length + len(text) + (len(separator) if batch else 0)
+            if batch and new_length > max_length:
+                break
+
+            heapq.heappop(self.__heap)
+            batch.append((MessagePriority(priority), text))
+            length = new_length
+
+        if not self.__heap:
+            self.__not_empty.clear()
+
+        return batch
+
+    def pop_dropped_count(self) -> int:
+        """
+        Count of dropped messages since the last call
+        """
+        dropped_count, self.__dropped_count = self.__dropped_count, 0
+        return dropped_count
+
+    def __drop(self, item: tuple[int, int, str]) -> None:
+        self.__dropped_count += 1
+        logger.warning(f"Telegram messages queue is full. Message has been dropped: {item[2]}")
@@ -1,6 +1,7 @@
 from configparser import ConfigParser
 
-from configuration.settings import StrategySettings, AccountSettings, TradingSettings, BlogSettings
+from configuration.settings import StrategySettings, AccountSettings, TradingSettings, BlogSettings, \
+    MetricsSettings, LoggingSettings
 
 __all__ = ("ProgramConfiguration")
 
@@ -16,22 +17,59 @@ class ProgramConfiguration:
 
         self.__tinkoff_token = config["INVEST_API"]["TOKEN"]
         self.__tinkoff_app_name = config["INVEST_API"]["APP_NAME"]
+        self.__last_price_ttl_seconds = config["INVEST_API"].getfloat("LAST_PRICE_TTL_SECONDS", fallback=5)
+        self.__market_data_record_path = config["INVEST_API"].get("MARKET_DATA_RECORD_PATH", fallback="")
+        self.__instrument_cache_file = config["INVEST_API"].get("INSTRUMENT_CACHE_FILE", fallback="")
+        self.__instrument_cache_ttl_seconds = \
+            config["INVEST_API"].getfloat("INSTRUMENT_CACHE_TTL_SECONDS", fallback=259200)
+        self.__schedule_cache_file = config["INVEST_API"].get("SCHEDULE_CACHE_FILE", fallback="")
 
         self.__blog_settings = BlogSettings(
             blog_status=bool(int(config["BLOG"]["STATUS"])),
             bot_token=config["BLOG"]["TELEGRAM_BOT_TOKEN"],
-            chat_id=config["BLOG"]["TELEGRAM_CHAT_ID"]
+            chat_id=config["BLOG"]["TELEGRAM_CHAT_ID"],
+            messages_per_minute=float(config["BLOG"].get("MESSAGES_PER_MINUTE", 20)),
+            messages_burst=int(config["BLOG"].get("MESSAGES_BURST", 3)),
+            queue_size=int(config["BLOG"].get("QUEUE_SIZE", 200))
         )
 
-        self.__account_settings = AccountSettings(
-            min_liquid_portfolio=int(config["TRADING_ACCOUNT"]["MIN_LIQUID_PORTFOLIO"]),
-            min_rub_on_account=int(config["TRADING_ACCOUNT"]["MIN_RUB_ON_ACCOUNT"])
-        )
+        # Sections TRADING_ACCOUNT and TRADING_ACCOUNT_*: every account trades concurrently with own strategies
+        self.__accounts_settings = [
+            AccountSettings(
+                min_liquid_portfolio=int(config[account_section]["MIN_LIQUID_PORTFOLIO"]),
+                min_rub_on_account=int(config[account_section]["MIN_RUB_ON_ACCOUNT"]),
+                name=account_section,
+                account_id=config[account_section].get("ACCOUNT_ID", ""),
+                tickers=[x.strip() for x in config[account_section].get("TICKERS", "").split(",") if x.strip()]
+            )
+            for account_section in config.sections()
+            if account_section == "TRADING_ACCOUNT" or account_section.startswith("TRADING_ACCOUNT_")
+        ]
 
         self.__trading_settings = TradingSettings(
             delay_start_after_open=int(config["TRADING_SETTINGS"]["DELAY_START_AFTER_EXCHANGE_OPEN_SECONDS"]),
             stop_trade_before_close=int(config["TRADING_SETTINGS"]["STOP_TRADE_BEFORE_EXCHANGE_CLOSE_SECONDS"]),
-            stop_signals_before_close=int(config["TRADING_SETTINGS"]["STOP_SIGNALS_BEFORE_EXCHANGE_CLOSE_MINUTES"])
+            stop_signals_before_close=int(config["TRADING_SETTINGS"]["STOP_SIGNALS_BEFORE_EXCHANGE_CLOSE_MINUTES"]),
+            exchange_exit_orders=bool(int(config["TRADING_SETTINGS"].get("EXCHANGE_EXIT_ORDERS", 0))),
+            exit_orders_check_seconds=int(config["TRADING_SETTINGS"].get("EXIT_ORDERS_CHECK_SECONDS", 5))
+        )
+
+        # The section is optional: default logging without it
+        logging_config = config["LOGGING"] if config.has_section("LOGGING") else {}
+        self.__logging_settings = LoggingSettings(
+            level=logging_config.get("LEVEL", "DEBUG"),
+            queue_status=bool(int(logging_config.get("QUEUE", 1))),
+            json_lines=bool(int(logging_config.get("JSON", 0))),
+            stream_debug_records_per_second=float(logging_config.get("STREAM_DEBUG_RECORDS_PER_SECOND", 5))
+        )
+
+        # The section is optional: metrics are off without it
+        metrics_config = config["METRICS"] if config.has_section("METRICS") else {}
+        self.__metrics_settings = MetricsSettings(
+            metrics_status=bool(int(metrics_config.get("STATUS", 0))),
+            http_port=int(metrics_config.get("HTTP_PORT", 0)),
+            dump_file=metrics_config.get("DUMP_FILE", ""),
+            dump_interval_seconds=float(metrics_config.get("DUMP_INTERVAL_SECONDS", 60))
         )
 
         self.__trade_strategy_settings = []
@@ -55,13 +93,45 @@ class ProgramConfiguration:
     def tinkoff_app_name(self) -> str:
         return self.__tinkoff_app_name
 
+    @property
+    def last_price_ttl_seconds(self) -> float:
+        return self.__last_price_ttl_seconds
+
+    @property
+    def market_data_record_path(self) -> str:
+        return self.__market_data_record_path
+
+    @property
+    def instrument_cache_file(self) -> str:
+        return self.__instrument_cache_file
+
+    @property
+    def instrument_cache_ttl_seconds(self) -> float:
+        return self.__instrument_cache_ttl_seconds
+
+    @property
+    def schedule_cache_file(self) -> str:
+        return self.__schedule_cache_file
+
     @property
     def blog_settings(self) -> BlogSettings:
         return self.__blog_settings
 
     @property
     def account_settings(self) -> AccountSettings:
-        return self.__account_settings
+        return self.__accounts_settings[0]
+
+    @property
+    def accounts_settings(self) -> list[AccountSettings]:
+        return self.__accounts_settings
+
+    @property
+    def logging_settings(self) -> LoggingSettings:
+        return self.__logging_settings
+
+    @property
+    def metrics_settings(self) -> MetricsSettings:
+        return self.__metrics_settings
 
     @property
     def trade_strategy_settings(self) -> list[StrategySettings]:
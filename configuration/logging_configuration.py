@@ -0,0 +1,142 @@
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+__all__ = ("RateLimitFilter", "JsonLinesFormatter", "LazyQueueHandler", "configure_logging")
+
+TEXT_LOG_FORMAT = "%(asctime)s - %(module)s - %(levelname)s - %(funcName)s: %(lineno)d - %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket for high-volume records (for example, every market data message at DEBUG).
+    Records of the loggers with level <= max_level are limited per logger and message template,
+    count of dropped records is added to the next passed one.
+    """
+    def __init__(
+            self,
+            logger_names: tuple[str, ...],
+            records_per_second: float,
+            burst: int = 10,
+            max_level: int = logging.DEBUG
+    ) -> None:
+        super().__init__()
+        self.__logger_names = logger_names
+        self.__records_per_second = records_per_second
+        self.__burst = burst
+        self.__max_level = max_level
+        # (logger name, message template) -> [tokens, last update time, dropped records]
+        self.__buckets: dict[tuple[str, str], list] = dict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.__max_level or not record.name.startswith(self.__logger_names):
+            return True
+
+        now = time.monotonic()
+        key = (record.name, str(record.msg))
+        bucket = self.__buckets.get(key)
+        if not bucket:
+            bucket = self.__buckets[key] = [float(self.__burst), now, 0]
+
+        bucket[0] = min(self.__burst, bucket[0] + (now - bucket[1]) * self.__records_per_second)
+        bucket[1] = now
+
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+
+        bucket[0] -= 1
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    One compact JSON object per record
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            data["suppressed"] = suppressed
+
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        elif record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} similar records suppressed)" if suppressed else text
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records to the queue without formatting: messages are formatted by the writer thread.
+    Only exception text is prepared here (traceback objects can't wait).
+    Arguments of log calls have to be immutable after the call (api responses are).
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+def configure_logging(
+        file_name: str,
+        level: int = logging.DEBUG,
+        use_queue: bool = True,
+        json_lines: bool = False,
+        sampled_loggers: tuple[str, ...] = (),
+        sampled_records_per_second: float = 0,
+        max_bytes: int = 100000000,
+        backup_count: int = 10
+) -> Optional[QueueListener]:
+    """
+    Configure root logger with the rotating file handler.
+    With use_queue records go through a queue to a background thread: callers (event loop) never wait for disk.
+    :return: Listener (use_queue only), it has to be stopped at exit (all queued records are written)
+    """
+    file_handler = RotatingFileHandler(file_name, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else _TextFormatter(TEXT_LOG_FORMAT))
+
+    # records are filtered before the queue: dropped records cost nothing for the writer
+    root_handler = LazyQueueHandler(queue.SimpleQueue()) if use_queue else file_handler
+    if sampled_loggers and sampled_records_per_second > 0:
+        root_handler.addFilter(RateLimitFilter(sampled_loggers, sampled_records_per_second))
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(root_handler)
+
+    if not use_queue:
+        return None
+
+    listener = QueueListener(root_handler.queue, file_handler, respect_handler_level=True)
+    listener.start()
+
+    return listener
@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
 
-__all__ = ("StrategySettings", "AccountSettings", "ShareSettings", "TradingSettings", "BlogSettings")
+__all__ = ("StrategySettings", "AccountSettings", "ShareSettings", "TradingSettings", "BlogSettings", "MetricsSettings",
+           "LoggingSettings")
 
 
 @dataclass(eq=False, repr=True)
@@ -20,6 +21,12 @@ class StrategySettings:
 class AccountSettings:
     min_liquid_portfolio: int = 10000
     min_rub_on_account: int = 5000
+    # name of configuration section
+    name: str = ""
+    # empty - the account is selected automatically
+    account_id: str = ""
+    # tickers of strategies for the account (empty - all strategies)
+    tickers: list[str] = field(default_factory=list)
 
 
 @dataclass(eq=False, repr=True)
@@ -31,6 +38,8 @@ class ShareSettings:
     buy_available_flag: bool = False
     sell_available_flag: bool = False
     api_trade_available_flag: bool = False
+    # fixed-point nanos (FixedPrice)
+    min_price_increment: int = 0
 
 
 @dataclass(eq=False, repr=True)
@@ -38,6 +47,9 @@ class TradingSettings:
     delay_start_after_open: int = 10
     stop_trade_before_close: int = 300
     stop_signals_before_close: int = 60
+    # take profit and stop loss are exchange stop orders instead of checks by candles
+    exchange_exit_orders: bool = False
+    exit_orders_check_seconds: int = 5
 
 
 @dataclass(eq=False, repr=True)
@@ -45,3 +57,26 @@ class BlogSettings:
     blog_status: bool
     bot_token: str
     chat_id: str
+    # rate limit of telegram sends (0 - no limit)
+    messages_per_minute: float = 20
+    messages_burst: int = 3
+    # messages over the size are dropped (the least important ones)
+    queue_size: int = 200
+
+
+@dataclass(eq=False, repr=True)
+class LoggingSettings:
+    level: str = "DEBUG"
+    # records are written by a background thread
+    queue_status: bool = True
+    json_lines: bool = False
+    # rate limit of debug records of stream messages (0 - no limit)
+    stream_debug_records_per_second: float = 5
+
+
+@dataclass(eq=False, repr=True)
+class MetricsSettings:
+    metrics_status: bool = False
+    http_port: int = 0
+    dump_file: str = ""
+    dump_interval_seconds: float = 60
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from typing import Generator, Optional, AsyncGenerator
+
+import grpc
+from tinkoff.invest import RequestError, AioRequestError
+from tinkoff.invest.async_services import AsyncServices
+from tinkoff.invest.constants import INVEST_GRPC_API
+from tinkoff.invest.services import Services
+
+from invest_api.unary_rate_limiter import UnaryRateLimiter
+
+__all__ = ("InvestClientPool")
+
+logger = logging.getLogger(__name__)
+
+
+class InvestClientPool:
+    """
+    The class keeps long-lived gRPC channels shared by all tinkoff api services:
+    one for sync requests and one (asyncio) for async requests.
+    Every request reuses the warm connection instead of paying TLS + HTTP/2 handshake per call.
+    Broken channel (shutdown or too long in transient failure) is recreated on next request.
+    Unary requests of both channels go through the rate limiter (if it is given).
+    """
+    def __init__(
+            self,
+            token: str,
+            app_name: str,
+            target: str = INVEST_GRPC_API,
+            secure: bool = True,
+            keepalive_seconds: int = 30,
+            reconnect_after_seconds: int = 10,
+            rate_limiter: Optional[UnaryRateLimiter] = None
+    ) -> None:
+        self.__token = token
+        self.__app_name = app_name
+        self.__target = target
+        self.__secure = secure
+        self.__keepalive_seconds = keepalive_seconds
+        self.__reconnect_after_seconds = reconnect_after_seconds
+        self.__rate_limiter = rate_limiter
+
+        self.__lock = threading.Lock()
+        self.__channel: Optional[grpc.Channel] = None
+        self.__services: Optional[Services] = None
+        self.__state: grpc.ChannelConnectivity = grpc.ChannelConnectivity.IDLE
+        self.__state_since = time.monotonic()
+
+        self.__async_channel: Optional[grpc.aio.Channel] = None
+        self.__async_services: Optional[AsyncServices] = None
+        self.__async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__async_failure_since: Optional[float] = None
+
+    @property
+    def token(self) -> str:
+        return self.__token
+
+    @property
+    def app_name(self) -> str:
+        return self.__app_name
+
+    @contextmanager
+    def client(self) -> Generator[Services, None, None]:
+        """
+        Returns services bound to the shared channel. Usage is the same as `with Client(...) as client`.
+        """
+        services = self.__get_services()
+
+        try:
+            yield services
+        except RequestError as ex:
+            if ex.code == grpc.StatusCode.UNAVAILABLE:
+                logger.info("Channel is unavailable. It will be recreated on next request")
+                self.__reset(services)
+            raise
+
+    @asynccontextmanager
+    async def async_client(self) -> AsyncGenerator[AsyncServices, None]:
+        """
+        Returns async services bound to the shared asyncio channel.
+        Usage is the same as `async with AsyncClient(...) as client`.
+        """
+        services = await self.__get_async_services()
+
+        try:
+            yield services
+        except AioRequestError as ex:
+            if ex.code == grpc.StatusCode.UNAVAILABLE:
+                logger.info("Async channel is unavailable. It will be recreated on next request")
+                if self.__async_services is services:
+                    await self.__close_async_channel()
+            raise
+
+    def health_check(self, timeout: float = 5) -> bool:
+        """
+        Wait until the shared channel is connected.
+        :return: True - channel is ready, False - connection hasn't been established in time.
+        """
+        self.__get_services()
+
+        try:
+            grpc.channel_ready_future(self.__channel).result(timeout=timeout)
+            return True
+        except grpc.FutureTimeoutError:
+            logger.error(f"Channel isn't ready after {timeout} seconds")
+            return False
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__close_channel()
+
+    async def close_async(self) -> None:
+        await self.__close_async_channel()
+
+    def __get_services(self) -> Services:
+        with self.__lock:
+            if self.__services is None or self.__is_channel_broken():
+                self.__close_channel()
+                self.__open_channel()
+
+            return self.__services
+
+    def __reset(self, services: Services) -> None:
+        with self.__lock:
+            # somebody else may have already recreated the channel
+            if self.__services is services:
+                self.__close_channel()
+
+    def __channel_options(self) -> list[tuple[str, int]]:
+        return [
+            ("grpc.keepalive_time_ms", self.__keepalive_seconds * 1000),
+            ("grpc.keepalive_timeout_ms", 10000),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            ("grpc.max_receive_message_length", 32 * 1024 * 1024),
+        ]
+
+    def __open_channel(self) -> None:
+        logger.info(f"Open shared channel to {self.__target}")
+
+        if self.__secure:
+            self.__channel = grpc.secure_channel(
+                self.__target, grpc.ssl_channel_credentials(), self.__channel_options()
+            )
+        else:
+            self.__channel = grpc.insecure_channel(self.__target, self.__channel_options())
+
+        self.__update_state(grpc.ChannelConnectivity.IDLE)
+        self.__channel.subscribe(self.__update_state, try_to_connect=True)
+
+        services_channel = grpc.intercept_channel(self.__channel, self.__rate_limiter.interceptor()) \
+            if self.__rate_limiter else self.__channel
+        self.__services = Services(services_channel, token=self.__token, app_name=self.__app_name)
+
+    def __close_channel(self) -> None:
+        if self.__channel:
+            logger.info("Close shared channel")
+
+            self.__channel.unsubscribe(self.__update_state)
+            self.__channel.close()
+
+        self.__channel = None
+        self.__services = None
+
+    def __update_state(self, state: grpc.ChannelConnectivity) -> None:
+        # gRPC calls it from its own thread
+        if state != self.__state:
+            logger.debug(f"Shared channel state: {state}")
+            self.__state = state
+            self.__state_since = time.monotonic()
+
+    def __is_channel_broken(self) -> bool:
+        if self.__state == grpc.ChannelConnectivity.SHUTDOWN:
+            return True
+
+        return self.__state == grpc.ChannelConnectivity.TRANSIENT_FAILURE \
+            and time.monotonic() - self.__state_since >= self.__reconnect_after_seconds
+
+    async def __get_async_services(self) -> AsyncServices:
+        # asyncio channel is bound to the event loop where it has been created
+        if self.__async_services is None \
+                or self.__async_loop is not asyncio.get_running_loop() \
+                or self.__is_async_channel_broken():
+            await self.__close_async_channel()
+
+            # another coroutine may have opened the channel while this one was awaiting
+            if self.__async_services is None:
+                self.__open_async_channel()
+
+        return self.__async_services
+
+    def __open_async_channel(self) -> None:
+        logger.info(f"Open shared async channel to {self.__target}")
+
+        interceptors = [self.__rate_limiter.async_interceptor()] if self.__rate_limiter else None
+
+        if self.__secure:
+            self.__async_channel = grpc.aio.secure_channel(
+                self.__target, grpc.ssl_channel_credentials(), self.__channel_options(), interceptors=interceptors
+            )
+        else:
+            self.__async_channel = grpc.aio.insecure_channel(
+                self.__target, self.__channel_options(), interceptors=interceptors
+            )
+
+        self.__async_loop = asyncio.get_running_loop()
+        self.__async_failure_since = None
+        self.__async_services = AsyncServices(self.__async_channel, token=self.__token, app_name=self.__app_name)
+
+    async def __close_async_channel(self) -> None:
+        channel = self.__async_channel
+
+        self.__async_channel = None
+        self.__async_services = None
+        self.__async_loop = None
+
+        if channel:
+            logger.info("Close shared async channel")
+
+            try:
+                await channel.close()
+            except Exception as ex:
+                # the channel may belong to already closed event loop
+                logger.debug(f"Close async channel error: {repr(ex)}")
+
+    def __is_async_channel_broken(self) -> bool:
+        state = self.__async_channel.get_state(try_to_connect=False)
+
+        if state == grpc.ChannelConnectivity.SHUTDOWN:
+            return True
+
+        if state != grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+            self.__async_failure_since = None
+            return False
+
+        if self.__async_failure_since is None:
+            self.__async_failure_since = time.monotonic()
+
+        return time.monotonic() - self.__async_failure_since >= self.__reconnect_after_seconds
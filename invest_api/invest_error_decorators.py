@@ -1,17 +1,26 @@
+import asyncio
 import logging
+import time
 
 from tinkoff.invest import InvestError, RequestError, AioRequestError
 
+from invest_api.retry_policy import DEFAULT_RETRY_POLICY, RetryPolicy
+from metrics.latency_metrics import span
+
 __all__ = ()
 
 logger = logging.getLogger(__name__)
 
 
-# Method extends logging for Tinkoff api request if it has been failed
+# Method extends logging for Tinkoff api request if it has been failed.
+# Time of every call is put to api_call_seconds histogram (if metrics are enabled).
 def invest_error_logging(func):
+    metric_labels = (("method", func.__qualname__), )
+
     def log_wrapper(*args, **kwargs):
         try:
-            return func(*args, **kwargs)
+            with span("api_call_seconds", metric_labels):
+                return func(*args, **kwargs)
         except RequestError as ex:
             tracking_id = ex.metadata.tracking_id if ex.metadata else ""
             logger.error("RequestError tracking_id=%s code=%s repr=%s details=%s",
@@ -29,22 +38,76 @@ def invest_error_logging(func):
     return log_wrapper
 
 
-# Decorator retries api requests for some kind of exceptions
-def invest_api_retry(retry_count: int = 5, exceptions: tuple = ( RequestError )):
+# Decorator retries api requests for some kind of exceptions by the retry policy (status code, backoff, rate limit).
+# Non-idempotent requests (without idempotency key) are retried only if they haven't been processed.
+def invest_api_retry(
+        idempotent: bool = True,
+        policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        exceptions: tuple = (RequestError, )
+):
     def errors_retry(func):
 
         def errors_wrapper(*args, **kwargs):
-            attempts = 0
-
-            while attempts < retry_count - 1:
-                attempts += 1
+            attempt = 0
 
+            while True:
                 try:
                     return func(*args, **kwargs)
-                except exceptions:
-                    logger.error(f"Retry exception attempt: {attempts}")
+                except exceptions as ex:
+                    attempt += 1
+                    delay = policy.delay(attempt, ex, idempotent)
+                    if delay is None:
+                        raise
+
+                    logger.error(f"Retry exception attempt: {attempt}, delay: {delay:.3f} s")
+                    time.sleep(delay)
+
+        return errors_wrapper
+
+    return errors_retry
+
+
+# Async variant of invest_error_logging for coroutines
+def async_invest_error_logging(func):
+    metric_labels = (("method", func.__qualname__), )
+
+    async def log_wrapper(*args, **kwargs):
+        try:
+            with span("api_call_seconds", metric_labels):
+                return await func(*args, **kwargs)
+        except AioRequestError as ex:
+            logger.error("AioRequestError code=%s repr=%s details=%s",
+                         str(ex.code), repr(ex), ex.details)
+            raise
+        except InvestError as ex:
+            logger.error("InvestError repr=%s", repr(ex))
+            raise
+
+    return log_wrapper
+
+
+# Async variant of invest_api_retry for coroutines (the event loop isn't blocked by delays)
+def async_invest_api_retry(
+        idempotent: bool = True,
+        policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        exceptions: tuple = (AioRequestError, )
+):
+    def errors_retry(func):
+
+        async def errors_wrapper(*args, **kwargs):
+            attempt = 0
+
+            while True:
+                try:
+                    return await func(*args, **kwargs)
+                except exceptions as ex:
+                    attempt += 1
+                    delay = policy.delay(attempt, ex, idempotent)
+                    if delay is None:
+                        raise
 
-            return func(*args, **kwargs)
+                    logger.error(f"Retry exception attempt: {attempt}, delay: {delay:.3f} s")
+                    await asyncio.sleep(delay)
 
         return errors_wrapper
 
@@ -0,0 +1,65 @@
+import logging
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from grpc import StatusCode
+
+from invest_api.utils import invest_api_retry_status_codes
+
+__all__ = ("RetryPolicy", "DEFAULT_RETRY_POLICY", "STREAM_RETRY_POLICY")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, eq=False, repr=True)
+class RetryPolicy:
+    """
+    Decides whether a failed api call is retried and how long to wait before the next attempt:
+    exponential backoff with full jitter, limited by max_delay_seconds.
+    RESOURCE_EXHAUSTED waits for reset of the unary limit (ratelimit-reset from response metadata).
+    Non-idempotent calls are retried only for RESOURCE_EXHAUSTED: the request has been rejected before processing.
+    """
+    # 0 - no limit (streams)
+    retry_count: int = 5
+    base_delay_seconds: float = 0.2
+    max_delay_seconds: float = 30.0
+
+    def delay(self, attempt: int, ex: Exception, idempotent: bool = True) -> Optional[float]:
+        """
+        :param attempt: number of the failed attempt (from 1)
+        :return: Seconds before the next attempt or None if the call mustn't be retried
+        """
+        if self.retry_count and attempt >= self.retry_count:
+            return None
+
+        code = getattr(ex, "code", None)
+        if code not in invest_api_retry_status_codes():
+            return None
+
+        if not idempotent and code != StatusCode.RESOURCE_EXHAUSTED:
+            return None
+
+        backoff = random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1)))
+
+        if code == StatusCode.RESOURCE_EXHAUSTED:
+            ratelimit_reset = RetryPolicy.__ratelimit_reset(ex)
+            if ratelimit_reset:
+                # clients shouldn't come back all together right at the reset
+                return ratelimit_reset + backoff
+
+        return backoff
+
+    @staticmethod
+    def __ratelimit_reset(ex: Exception) -> float:
+        metadata = getattr(ex, "metadata", None)
+
+        try:
+            return max(0.0, float(getattr(metadata, "ratelimit_reset", 0) or 0))
+        except (TypeError, ValueError):
+            return 0.0
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+# Streams reconnect while a consumer reads them
+STREAM_RETRY_POLICY = RetryPolicy(retry_count=0, base_delay_seconds=1.0, max_delay_seconds=60.0)
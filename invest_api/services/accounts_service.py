@@ -1,8 +1,10 @@
 import logging
+from typing import Iterable, Optional
 
-from tinkoff.invest import Client, AccessLevel, AccountType, AccountStatus
+from tinkoff.invest import AccessLevel, AccountType, AccountStatus
 
 from configuration.settings import AccountSettings
+from invest_api.client_pool import InvestClientPool
 from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
 
 __all__ = ("AccountService")
@@ -14,15 +16,37 @@ class AccountService:
     """
     The class encapsulate tinkoff account api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    # stream name in tariff stream limits
+    __MARKET_DATA_STREAM_NAME = "tinkoff.public.invest.api.contract.v1.MarketDataStreamService/MarketDataStream"
+
+    def __init__(self, client_pool: InvestClientPool) -> None:
+        self.__client_pool = client_pool
+        self.__market_data_stream_limit: Optional[int] = None
+        self.__unary_limits: list[tuple[int, list[str]]] = []
+
+    @property
+    def market_data_stream_limit(self) -> Optional[int]:
+        """
+        Maximum count of market data stream connections by the tariff (known after verify_token)
+        """
+        return self.__market_data_stream_limit
+
+    @property
+    def unary_limits(self) -> list[tuple[int, list[str]]]:
+        """
+        Limits of unary requests by the tariff: (limit per minute, methods) of every group (known after verify_token)
+        """
+        return self.__unary_limits
 
     @invest_api_retry()
     @invest_error_logging
-    def trading_account_id(self, account_settings: AccountSettings) -> str:
+    def trading_account_id(
+            self,
+            account_settings: AccountSettings,
+            excluded_account_ids: Iterable[str] = ()
+    ) -> str:
         """
-        Method returns appropriate account id for trading:
+        Method returns appropriate account id for trading (except excluded accounts):
         Full rights, common type (avoid IIS etc), account is open and ready,
         liquid_portfolio more that configured,
         green margin status (liquid > starting_margin)
@@ -31,12 +55,16 @@ class AccountService:
         result = None
         max_liquid_portfolio = -1
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.info("List of client accounts:")
 
             for account in client.users.get_accounts().accounts:
                 logger.info(f"Account settings: {account}")
 
+                if account.id in excluded_account_ids:
+                    logger.info(f"Account is used for another trading settings")
+                    continue
+
                 if account.access_level == AccessLevel.ACCOUNT_ACCESS_LEVEL_FULL_ACCESS \
                         and account.type == AccountType.ACCOUNT_TYPE_TINKOFF \
                         and account.status == AccountStatus.ACCOUNT_STATUS_OPEN:
@@ -60,9 +88,9 @@ class AccountService:
         """
         Verification method. Just connect and read some settings.
         """
-        logger.info(f"Start client verification. App name: {self.__app_name}")
+        logger.info(f"Start client verification. App name: {self.__client_pool.app_name}")
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             accounts = client.users.get_accounts()
 
             logger.info("List of client accounts:")
@@ -76,11 +104,16 @@ class AccountService:
                 logger.info(f"Request per minutes: {unary_limit.limit_per_minute}")
                 logger.info("\t" + "\n\t".join(unary_limit.methods))
 
+            self.__unary_limits = [(x.limit_per_minute, list(x.methods)) for x in tariff.unary_limits]
+
             logger.info("Current stream limits:")
             for stream_limit in tariff.stream_limits:
                 logger.info(f"Connections {stream_limit.limit}:")
                 logger.info("\t" + "\n\t".join(stream_limit.streams))
 
+                if self.__MARKET_DATA_STREAM_NAME in stream_limit.streams:
+                    self.__market_data_stream_limit = stream_limit.limit
+
             logger.info("Client information:")
             logger.info(client.users.get_info())
 
@@ -1,10 +1,12 @@
 import logging
-from datetime import timedelta
+from datetime import timedelta, datetime
 
-from tinkoff.invest import CandleInterval, Client, HistoricCandle
+from tinkoff.invest import CandleInterval, HistoricCandle
 from tinkoff.invest.utils import now
 
-from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
+from invest_api.client_pool import InvestClientPool
+from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry, async_invest_error_logging, \
+    async_invest_api_retry
 
 __all__ = ("ClientService")
 
@@ -15,12 +17,9 @@ class ClientService:
     """
     The class encapsulate tinkoff client api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    def __init__(self, client_pool: InvestClientPool) -> None:
+        self.__client_pool = client_pool
 
-    @invest_api_retry()
-    @invest_error_logging
     def download_historic_candle(
             self,
             figi: str,
@@ -28,12 +27,22 @@ class ClientService:
             interval: CandleInterval
     ) -> list[HistoricCandle]:
         """Download and return all requested historical candles"""
+        return self.download_historic_candle_from(figi, now() - timedelta(days=from_days), interval)
+
+    @invest_api_retry()
+    @invest_error_logging
+    def download_historic_candle_from(
+            self,
+            figi: str,
+            from_: datetime,
+            interval: CandleInterval
+    ) -> list[HistoricCandle]:
+        """Download and return all historical candles from the time till now"""
         result: list[HistoricCandle] = []
 
-        from_ = now() - timedelta(days=from_days)
         logger.info(f"Start download recent candles. Figi: {figi}, from days: {from_}, interval: {interval.name}")
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             for candle in client.get_all_candles(
                     figi=figi,
                     from_=from_,
@@ -53,7 +62,18 @@ class ClientService:
         """ Cancel all open orders. """
         logger.info(f"Cancel all orders for account id: {account_id}")
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             client.cancel_all_orders(account_id=account_id)
 
         logger.info(f"Cancellation all orders complete.")
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def cancel_all_orders_async(self, account_id: str) -> None:
+        """ Cancel all open orders without blocking event loop. """
+        logger.info(f"Cancel all orders for account id: {account_id}")
+
+        async with self.__client_pool.async_client() as client:
+            await client.cancel_all_orders(account_id=account_id)
+
+        logger.info(f"Cancellation all orders complete.")
@@ -1,42 +1,88 @@
+import asyncio
 import datetime
 import logging
+from typing import Optional
 
-from tinkoff.invest import Client, TradingSchedule, InstrumentIdType, InstrumentStatus
+from tinkoff.invest import TradingSchedule, InstrumentIdType, InstrumentStatus, Share
 
 from configuration.settings import ShareSettings
-from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
-from invest_api.utils import moex_exchange_name
+from invest_api.client_pool import InvestClientPool
+from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry, async_invest_error_logging, \
+    async_invest_api_retry
+from invest_api.utils import moex_exchange_name, quotation_to_fixed
+from storage.instrument_cache import InstrumentCache
+from storage.trading_schedule_cache import TradingScheduleCache
 
 __all__ = ("InstrumentService")
 
 logger = logging.getLogger(__name__)
 
+# One request for all shares is cheaper than requests for every share from the count
+BULK_SHARES_MIN_COUNT = 20
+# Days of trading schedule by one request
+SCHEDULE_DAYS = 7
+
 
 class InstrumentService:
     """
     The class encapsulate tinkoff instruments api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    def __init__(
+            self,
+            client_pool: InvestClientPool,
+            instrument_cache: Optional[InstrumentCache] = None,
+            schedule_cache: Optional[TradingScheduleCache] = None
+    ) -> None:
+        self.__client_pool = client_pool
+        self.__instrument_cache = instrument_cache
+        # in-memory only if a persistent cache isn't given
+        self.__schedule_cache = schedule_cache or TradingScheduleCache()
 
     def moex_today_trading_schedule(self) -> (bool, datetime, datetime):
         """
         :return: Information about trading day status, datetime trading day start, datetime trading day end
         (both on today)
         """
-        for schedule in self.__trading_schedules(
-                exchange=moex_exchange_name(),
-                _from=datetime.datetime.utcnow(),
-                _to=datetime.datetime.utcnow() + datetime.timedelta(days=1)
-        ):
-            for day in schedule.days:
-                if day.date.date() == datetime.date.today():
-                    logger.info(f"MOEX today schedule: {day}")
-                    return day.is_trading_day, day.start_time, day.end_time
+        today = datetime.date.today()
+
+        day = self.__schedule_cache.day(today)
+        if not day:
+            self.__update_moex_schedule(datetime.datetime.utcnow())
+            day = self.__schedule_cache.day(today)
+
+        if day:
+            logger.info(f"MOEX today schedule: {day}")
+            return day
 
         return False, datetime.datetime.utcnow(), datetime.datetime.utcnow()
 
+    def moex_next_trading_session_start(self, after: datetime) -> Optional[datetime]:
+        """
+        :return: Start of the next MOEX trading session after the time (None if it isn't in the nearest days)
+        """
+        start_time = self.__schedule_cache.next_session_start(after)
+        if not start_time:
+            self.__update_moex_schedule(after)
+            start_time = self.__schedule_cache.next_session_start(after)
+
+        logger.info(f"MOEX next trading session start: {start_time}")
+
+        return start_time
+
+    def __update_moex_schedule(self, _from: datetime) -> None:
+        """
+        Cache schedule of several days by one request
+        """
+        self.__schedule_cache.update([
+            (day.date.date(), day.is_trading_day, day.start_time, day.end_time)
+            for schedule in self.__trading_schedules(
+                exchange=moex_exchange_name(),
+                _from=_from,
+                _to=_from + datetime.timedelta(days=SCHEDULE_DAYS)
+            )
+            for day in schedule.days
+        ])
+
     @invest_api_retry()
     @invest_error_logging
     def __trading_schedules(
@@ -47,7 +93,7 @@ class InstrumentService:
     ) -> list[TradingSchedule]:
         result = []
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.debug(f"Trading Schedules for exchange: {exchange}, from: {_from}, to: {_to}")
 
             for schedule in client.instruments.trading_schedules(
@@ -55,7 +101,7 @@ class InstrumentService:
                     from_=_from,
                     to=_to
             ).exchanges:
-                logger.debug(f"{schedule}")
+                logger.debug("%s", schedule)
                 result.append(schedule)
 
         return result
@@ -66,41 +112,137 @@ class InstrumentService:
         """
         :return: Information about share settings by it figi
         """
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.debug(f"ShareBy figi: {figi}:")
 
             share = client.instruments.share_by(
                 id_type=InstrumentIdType.INSTRUMENT_ID_TYPE_FIGI,
                 id=figi
             ).instrument
-            logger.debug(f"{share}")
-
-            return ShareSettings(
-                ticker=share.ticker,
-                lot=share.lot,
-                short_enabled_flag=share.short_enabled_flag,
-                otc_flag=share.otc_flag,
-                buy_available_flag=share.buy_available_flag,
-                sell_available_flag=share.sell_available_flag,
-                api_trade_available_flag=share.api_trade_available_flag
-            )
+            logger.debug("%s", share)
+
+            return InstrumentService.__share_settings(share)
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def share_by_figi_async(self, figi: str) -> ShareSettings:
+        """
+        The same as share_by_figi without blocking event loop
+        """
+        async with self.__client_pool.async_client() as client:
+            logger.debug(f"ShareBy figi: {figi}:")
+
+            share = (await client.instruments.share_by(
+                id_type=InstrumentIdType.INSTRUMENT_ID_TYPE_FIGI,
+                id=figi
+            )).instrument
+            logger.debug("%s", share)
+
+            return InstrumentService.__share_settings(share)
+
+    async def shares_by_figies_async(self, figies: list[str], max_concurrency: int = 10) -> dict[str, ShareSettings]:
+        """
+        Settings of many shares: not expired ones are taken from the instrument cache,
+        others are requested by one request for all shares (many figies) or concurrently.
+        Figies with errors are absent in the result.
+        """
+        result: dict[str, ShareSettings] = dict()
+        missed_figies = []
+
+        for figi in dict.fromkeys(figies):
+            share_settings = self.__instrument_cache.get(figi) if self.__instrument_cache else None
+            if share_settings:
+                result[figi] = share_settings
+            else:
+                missed_figies.append(figi)
+
+        logger.debug(f"Shares from instrument cache: {len(result)}, to request: {len(missed_figies)}")
+
+        if not missed_figies:
+            return result
+
+        if len(missed_figies) >= BULK_SHARES_MIN_COUNT:
+            requested = await self.__shares_async()
+        else:
+            requested = await self.__shares_by_figies_concurrently(missed_figies, max_concurrency)
+
+        for figi in missed_figies:
+            if figi in requested:
+                result[figi] = requested[figi]
+            else:
+                logger.error(f"Share settings haven't been received: {figi}")
+
+        if self.__instrument_cache:
+            for figi, share_settings in requested.items():
+                self.__instrument_cache.update(figi, share_settings)
+
+            try:
+                self.__instrument_cache.save()
+            except Exception as ex:
+                logger.error(f"Instrument cache save error: {repr(ex)}")
+
+        return result
+
+    async def __shares_by_figies_concurrently(
+            self,
+            figies: list[str],
+            max_concurrency: int
+    ) -> dict[str, ShareSettings]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def share_by_figi(figi: str) -> ShareSettings:
+            async with semaphore:
+                return await self.share_by_figi_async(figi)
+
+        shares = await asyncio.gather(*[share_by_figi(x) for x in figies], return_exceptions=True)
+
+        return {figi: share for figi, share in zip(figies, shares) if not isinstance(share, BaseException)}
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def __shares_async(self) -> dict[str, ShareSettings]:
+        """
+        Settings of all shares by one request
+        """
+        async with self.__client_pool.async_client() as client:
+            logger.debug(f"All shares")
+
+            shares = (await client.instruments.shares(
+                instrument_status=InstrumentStatus.INSTRUMENT_STATUS_ALL
+            )).instruments
+            logger.debug(f"Shares count: {len(shares)}")
+
+            return {share.figi: InstrumentService.__share_settings(share) for share in shares}
+
+    @staticmethod
+    def __share_settings(share: Share) -> ShareSettings:
+        return ShareSettings(
+            ticker=share.ticker,
+            lot=share.lot,
+            short_enabled_flag=share.short_enabled_flag,
+            otc_flag=share.otc_flag,
+            buy_available_flag=share.buy_available_flag,
+            sell_available_flag=share.sell_available_flag,
+            api_trade_available_flag=share.api_trade_available_flag,
+            min_price_increment=quotation_to_fixed(share.min_price_increment)
+        )
 
     @invest_api_retry()
     @invest_error_logging
     def __currencies(self) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             for cur in client.instruments.currencies(
                     instrument_status=InstrumentStatus.INSTRUMENT_STATUS_BASE
             ).instruments:
-                logger.debug(f"{cur}")
+                logger.debug("%s", cur)
 
     @invest_api_retry()
     @invest_error_logging
     def __instrument_by_figi(self, figi: str) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.debug(f"InstrumentBy figi: {figi}:")
 
             instrument = client.instruments.get_instrument_by(id_type=InstrumentIdType.INSTRUMENT_ID_TYPE_FIGI,
                                                               id=figi).instrument
 
-            logger.debug(f"{instrument}")
+            logger.debug("%s", instrument)
@@ -1,9 +1,13 @@
 import logging
+import time
 from typing import Optional
 
-from tinkoff.invest import Client, GetTradingStatusResponse, SecurityTradingStatus, Quotation
+from tinkoff.invest import GetTradingStatusResponse, SecurityTradingStatus, Quotation
 
-from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
+from invest_api.client_pool import InvestClientPool
+from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry, async_invest_error_logging, \
+    async_invest_api_retry
+from invest_api.trading_status_cache import TradingStatusCache
 
 __all__ = ("MarketDataService")
 
@@ -14,17 +18,35 @@ class MarketDataService:
     """
     The class encapsulate tinkoff market data service api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    def __init__(
+            self,
+            client_pool: InvestClientPool,
+            trading_status_cache: Optional[TradingStatusCache] = None,
+            last_price_ttl_seconds: float = 5
+    ) -> None:
+        self.__client_pool = client_pool
+        self.__trading_status_cache = trading_status_cache
+        self.__last_price_ttl_seconds = last_price_ttl_seconds
+        # figi: (price, monotonic time of receiving)
+        self.__last_prices: dict[str, tuple[Quotation, float]] = dict()
 
     @invest_api_retry()
     @invest_error_logging
     def __get_trading_status(self, figi: str) -> GetTradingStatusResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             status = client.market_data.get_trading_status(figi=figi)
 
-            logger.debug(f"Trading Status {figi}: {status}")
+            logger.debug("Trading Status %s: %s", figi, status)
+
+            return status
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def __get_trading_status_async(self, figi: str) -> GetTradingStatusResponse:
+        async with self.__client_pool.async_client() as client:
+            status = await client.market_data.get_trading_status(figi=figi)
+
+            logger.debug("Trading Status %s: %s", figi, status)
 
             return status
 
@@ -35,28 +57,117 @@ class MarketDataService:
         Market orders are allowed
         Trading by API are allowed
         Status is NORMAL_TRADING (bot is skipping other statuses)
+        The cache of trading statuses is used if it's warm.
         """
-        status = self.__get_trading_status(figi)
+        is_ready = self.__cached_readiness(figi)
+        if is_ready is not None:
+            return is_ready
+
+        return self.__status_readiness(self.__get_trading_status(figi))
+
+    async def is_stock_ready_for_trading_async(self, figi: str) -> bool:
+        """
+        The same as is_stock_ready_for_trading without blocking event loop
+        """
+        is_ready = self.__cached_readiness(figi)
+        if is_ready is not None:
+            return is_ready
+
+        return self.__status_readiness(await self.__get_trading_status_async(figi))
+
+    def __cached_readiness(self, figi: str) -> Optional[bool]:
+        if self.__trading_status_cache:
+            return self.__trading_status_cache.is_ready_for_trading(figi)
+
+        return None
 
+    def __status_readiness(self, status: GetTradingStatusResponse) -> bool:
+        if self.__trading_status_cache:
+            self.__trading_status_cache.update_from_response(status)
+
+        return MarketDataService.__is_status_ready_for_trading(status)
+
+    @staticmethod
+    def __is_status_ready_for_trading(status: GetTradingStatusResponse) -> bool:
         return status.limit_order_available_flag and \
                status.market_order_available_flag and \
                status.api_trade_available_flag and \
                status.trading_status == SecurityTradingStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING
 
-    @invest_api_retry()
-    @invest_error_logging
     def get_last_price(self, figi: str) -> Optional[Quotation]:
         """
         Request last price for instrument by figi.
         Main reason is for order purposes (more close to current price).
         """
-        with Client(self.__token, app_name=self.__app_name) as client:
-            prices = client.market_data.get_last_prices(figi=[figi])
+        return self.get_last_prices([figi]).get(figi, None)
+
+    async def get_last_price_async(self, figi: str) -> Optional[Quotation]:
+        """
+        The same as get_last_price without blocking event loop
+        """
+        return (await self.get_last_prices_async([figi])).get(figi, None)
+
+    def get_last_prices(self, figies: list[str]) -> dict[str, Quotation]:
+        """
+        Last prices for all figies by one request. Prices younger than ttl are returned from the cache.
+        """
+        prices, missed_figies = self.__cached_last_prices(figies)
 
-            logger.debug(f"Last prices for {figi}: {prices}")
+        if missed_figies:
+            prices.update(self.__cache_last_prices(self.__get_last_prices(missed_figies)))
 
-            for price in prices.last_prices:
-                if price.figi == figi:
-                    return price.price
+        return prices
+
+    async def get_last_prices_async(self, figies: list[str]) -> dict[str, Quotation]:
+        """
+        The same as get_last_prices without blocking event loop
+        """
+        prices, missed_figies = self.__cached_last_prices(figies)
+
+        if missed_figies:
+            prices.update(self.__cache_last_prices(await self.__get_last_prices_async(missed_figies)))
+
+        return prices
+
+    def __cached_last_prices(self, figies: list[str]) -> (dict[str, Quotation], list[str]):
+        prices: dict[str, Quotation] = dict()
+        missed_figies: list[str] = []
+        expired_before = time.monotonic() - self.__last_price_ttl_seconds
+
+        for figi in figies:
+            price, received_at = self.__last_prices.get(figi, (None, 0))
+
+            if price and received_at > expired_before:
+                prices[figi] = price
             else:
-                return None
+                missed_figies.append(figi)
+
+        return prices, missed_figies
+
+    def __cache_last_prices(self, prices: dict[str, Quotation]) -> dict[str, Quotation]:
+        received_at = time.monotonic()
+
+        for figi, price in prices.items():
+            self.__last_prices[figi] = (price, received_at)
+
+        return prices
+
+    @invest_api_retry()
+    @invest_error_logging
+    def __get_last_prices(self, figies: list[str]) -> dict[str, Quotation]:
+        with self.__client_pool.client() as client:
+            prices = client.market_data.get_last_prices(figi=figies)
+
+            logger.debug("Last prices for %s: %s", figies, prices)
+
+            return {price.figi: price.price for price in prices.last_prices if price.figi in figies}
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def __get_last_prices_async(self, figies: list[str]) -> dict[str, Quotation]:
+        async with self.__client_pool.async_client() as client:
+            prices = await client.market_data.get_last_prices(figi=figies)
+
+            logger.debug("Last prices for %s: %s", figies, prices)
+
+            return {price.figi: price.price for price in prices.last_prices if price.figi in figies}
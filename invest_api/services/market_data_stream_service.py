@@ -1,15 +1,18 @@
 import asyncio
 import datetime
 import logging
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 
-from tinkoff.invest import Client, CandleInstrument, SubscriptionInterval, InfoInstrument, TradeInstrument, \
-    MarketDataResponse, Candle, AsyncClient, AioRequestError
+from tinkoff.invest import CandleInstrument, SubscriptionInterval, InfoInstrument, TradeInstrument, \
+    MarketDataResponse, Candle, AioRequestError, SubscriptionStatus
 from tinkoff.invest.market_data_stream.async_market_data_stream_manager import AsyncMarketDataStreamManager
 from tinkoff.invest.market_data_stream.market_data_stream_interface import IMarketDataStreamManager
 from tinkoff.invest.market_data_stream.market_data_stream_manager import MarketDataStreamManager
 
-from invest_api.utils import invest_api_retry_status_codes
+from invest_api.client_pool import InvestClientPool
+from invest_api.trading_status_cache import TradingStatusCache
+from invest_api.retry_policy import STREAM_RETRY_POLICY
+from storage.market_data_recorder import MarketDataRecorder
 
 __all__ = ("MarketDataStreamService")
 
@@ -20,9 +23,20 @@ class MarketDataStreamService:
     """
     The class encapsulate tinkoff market data stream (gRPC) service api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    def __init__(
+            self,
+            client_pool: InvestClientPool,
+            trading_status_cache: Optional[TradingStatusCache] = None,
+            recorder: Optional[MarketDataRecorder] = None,
+            max_subscriptions_per_stream: int = 300,
+            max_streams: Optional[int] = None
+    ) -> None:
+        self.__client_pool = client_pool
+        self.__trading_status_cache = trading_status_cache
+        self.__recorder = recorder
+        # api limit of subscriptions per one stream connection and tariff limit of connections
+        self.__max_subscriptions_per_stream = max_subscriptions_per_stream
+        self.__max_streams = max_streams
 
     def start_candles_stream(
             self,
@@ -34,7 +48,7 @@ class MarketDataStreamService:
         """
         logger.debug(f"Starting candles stream")
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             market_data_candles_stream: MarketDataStreamManager = client.create_market_data_stream()
 
             logger.info(f"Subscribe candles: {figies}")
@@ -49,7 +63,7 @@ class MarketDataStreamService:
             )
 
             for market_data in market_data_candles_stream:
-                logger.debug(f"market_data: {market_data}")
+                logger.debug("market_data: %s", market_data)
 
                 # trading will stop at trade_before_time
                 if datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) >= trade_before_time:
@@ -66,20 +80,111 @@ class MarketDataStreamService:
             self,
             figies: list[str],
             trade_before_time: datetime
-    ) -> Generator[Candle, None, None]:
+    ) -> AsyncGenerator[Candle, None]:
         """
-        The method starts async gRPC stream and return candles
+        The method starts async gRPC stream and return candles.
+        Trading statuses of the same figies are put to the trading status cache (if it's specified).
+        All received messages are written by the recorder (if it's specified).
+        Figies are sharded across several streams if one stream can't subscribe all of them.
+        All streams are calls on the shared asyncio channel of the client pool (keepalive and health tracking).
+        Every shard reconnects independently, candles of all shards are merged into one iterator.
+        Figies over the tariff limit of connections aren't subscribed (error is logged).
         """
-        logger.debug(f"Starting async candles stream loop")
+        shards = self.__shards(figies)
+
+        if len(shards) == 1:
+            async for candle in self.__shard_candles_stream(0, shards[0], trade_before_time):
+                yield candle
+            return
+
+        logger.info(f"Candles stream is sharded: {len(shards)} connections")
+
+        # (candle, None) from shards; (None, exception) if a shard has failed; (None, None) if a shard is over
+        merged_queue: asyncio.Queue = asyncio.Queue()
+        shard_tasks = [
+            asyncio.create_task(self.__shard_worker(shard_id, shard_figies, trade_before_time, merged_queue))
+            for shard_id, shard_figies in enumerate(shards)
+        ]
+        active_shards = len(shard_tasks)
+
+        try:
+            while active_shards:
+                candle, error = await merged_queue.get()
+
+                if candle:
+                    yield candle
+                elif error:
+                    raise error
+                else:
+                    active_shards -= 1
+        finally:
+            for shard_task in shard_tasks:
+                shard_task.cancel()
+            await asyncio.gather(*shard_tasks, return_exceptions=True)
+
+    def update_stream_limit(self, max_streams: Optional[int]) -> None:
+        """
+        Set maximum count of market data stream connections (from the user tariff)
+        """
+        self.__max_streams = max_streams
+
+    def __shards(self, figies: list[str]) -> list[list[str]]:
+        # every figi has candle subscription and info subscription (if statuses are cached)
+        subscriptions_per_figi = 2 if self.__trading_status_cache else 1
+        figies_per_stream = max(1, self.__max_subscriptions_per_stream // subscriptions_per_figi)
+        shards_count = max(1, -(-len(figies) // figies_per_stream))
+
+        if self.__max_streams and shards_count > self.__max_streams:
+            # the api rejects subscriptions over the limit of a connection: the surplus figies would get no candles
+            shards_count = self.__max_streams
+            max_figies = shards_count * figies_per_stream
+            logger.error(f"Figies ({len(figies)}) need more stream connections than tariff limit "
+                         f"{self.__max_streams}. Figies without candles: {figies[max_figies:]}")
+            figies = figies[:max_figies]
+
+        # round-robin: shards have the same size
+        return [figies[i::shards_count] for i in range(shards_count) if figies[i::shards_count]] or [[]]
+
+    async def __shard_worker(
+            self,
+            shard_id: int,
+            figies: list[str],
+            trade_before_time: datetime,
+            merged_queue: asyncio.Queue
+    ) -> None:
+        try:
+            async for candle in self.__shard_candles_stream(shard_id, figies, trade_before_time):
+                merged_queue.put_nowait((candle, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            merged_queue.put_nowait((None, ex))
+        else:
+            merged_queue.put_nowait((None, None))
+
+    async def __shard_candles_stream(
+            self,
+            shard_id: int,
+            figies: list[str],
+            trade_before_time: datetime
+    ) -> AsyncGenerator[Candle, None]:
+        """
+        One stream connection with reconnect loop
+        """
+        logger.debug(f"Starting async candles stream loop (shard {shard_id})")
+        # failed reconnects in a row
+        attempt = 0
 
         while datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) < trade_before_time:
+            async_market_data_candles_stream: Optional[AsyncMarketDataStreamManager] = None
+
             try:
-                logger.debug(f"Starting async candles stream")
+                logger.debug(f"Starting async candles stream (shard {shard_id})")
 
-                async with AsyncClient(self.__token, app_name=self.__app_name) as client:
-                    async_market_data_candles_stream: AsyncMarketDataStreamManager = client.create_market_data_stream()
+                async with self.__client_pool.async_client() as client:
+                    async_market_data_candles_stream = client.create_market_data_stream()
 
-                    logger.info(f"Subscribe candles: {figies}")
+                    logger.info(f"Subscribe candles (shard {shard_id}): {figies}")
                     async_market_data_candles_stream.candles.subscribe(
                         [
                             CandleInstrument(
@@ -90,30 +195,68 @@ class MarketDataStreamService:
                         ]
                     )
 
+                    if self.__trading_status_cache:
+                        # the stream could be disconnected and statuses are out of date
+                        self.__trading_status_cache.clear(figies)
+
+                        logger.info(f"Subscribe trading statuses (shard {shard_id}): {figies}")
+                        async_market_data_candles_stream.info.subscribe(
+                            [InfoInstrument(figi=figi) for figi in figies]
+                        )
+
                     async for market_data in async_market_data_candles_stream:
-                        logger.debug(f"market_data: {market_data}")
+                        attempt = 0
+
+                        if self.__recorder:
+                            self.__recorder.record(market_data)
+                        else:
+                            logger.debug("market_data: %s", market_data)
 
                         # trading will stop at trade_before_time
                         if datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) >= trade_before_time:
-                            logger.debug(f"Time to stop candle stream")
+                            logger.debug(f"Time to stop candle stream (shard {shard_id})")
                             self.__stop_candles_stream(async_market_data_candles_stream)
                             break
 
+                        if market_data.subscribe_candles_response:
+                            self.__check_subscriptions(
+                                shard_id, "candles", market_data.subscribe_candles_response.candles_subscriptions
+                            )
+
+                        if market_data.subscribe_info_response:
+                            self.__check_subscriptions(
+                                shard_id, "trading statuses", market_data.subscribe_info_response.info_subscriptions
+                            )
+
+                        if market_data.trading_status and self.__trading_status_cache:
+                            self.__trading_status_cache.update_from_stream(market_data.trading_status)
+
                         if market_data.candle:
                             yield market_data.candle
 
             except AioRequestError as ex:
-                logger.error("AioRequestError code=%s repr=%s details=%s", str(ex.code), repr(ex), ex.details)
+                logger.error("AioRequestError shard=%s code=%s repr=%s details=%s",
+                             shard_id, str(ex.code), repr(ex), ex.details)
 
-                if ex.code in invest_api_retry_status_codes():
-                    logger.debug(f"Status code available for reconnect")
-                    await asyncio.sleep(1)
-                else:
+                attempt += 1
+                delay = STREAM_RETRY_POLICY.delay(attempt, ex)
+                if delay is None:
                     raise
 
+                logger.debug(f"Status code available for reconnect (shard {shard_id}) in {delay:.3f} s")
+                await asyncio.sleep(delay)
+
             finally:
                 self.__stop_candles_stream(async_market_data_candles_stream)
 
+    @staticmethod
+    def __check_subscriptions(shard_id: int, subscription_name: str, subscriptions: list) -> None:
+        rejected = {x.figi: x.subscription_status.name for x in subscriptions
+                    if x.subscription_status != SubscriptionStatus.SUBSCRIPTION_STATUS_SUCCESS}
+
+        if rejected:
+            logger.error(f"Subscriptions of {subscription_name} have been rejected (shard {shard_id}): {rejected}")
+
     @staticmethod
     def __stop_candles_stream(stream: IMarketDataStreamManager) -> None:
         if stream:
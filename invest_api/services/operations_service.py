@@ -1,14 +1,15 @@
 import datetime
 import logging
-from decimal import Decimal
 from typing import Optional
 
-from tinkoff.invest import Client, PositionsResponse, PositionsSecurities, OperationState, Operation, PortfolioResponse
-from tinkoff.invest.utils import quotation_to_decimal
+from tinkoff.invest import PositionsResponse, PositionsSecurities, OperationState, Operation, PortfolioResponse, \
+    Quotation
 
-from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
+from invest_api.client_pool import InvestClientPool
+from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry, async_invest_error_logging, \
+    async_invest_api_retry
 from invest_api.services.market_data_service import MarketDataService
-from invest_api.utils import moneyvalue_to_decimal, rub_currency_name
+from invest_api.utils import FixedPrice, moneyvalue_to_fixed, quotation_to_fixed, rub_currency_name
 
 __all__ = ("OperationService")
 
@@ -19,32 +20,59 @@ class OperationService:
     """
     The class encapsulate tinkoff operations service api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    def __init__(self, client_pool: InvestClientPool, market_data_service: MarketDataService) -> None:
+        self.__client_pool = client_pool
+        self.__market_data_service = market_data_service
 
-    def available_rub_on_account(self, account_id: str) -> Optional[Decimal]:
+    def available_rub_on_account(self, account_id: str) -> Optional[FixedPrice]:
         """
-        Return available amount of rub on account
+        Return available amount of rub on account (fixed-point nanos)
         """
-        total_money = 0
-        market_data_service = MarketDataService(self.__token, self.__app_name)
         position = self.__get_positions(account_id)
+        last_prices = self.__market_data_service.get_last_prices(OperationService.__short_figies(position))
+
+        return OperationService.__available_rub(position, last_prices)
+
+    async def available_rub_on_account_async(self, account_id: str) -> Optional[FixedPrice]:
+        """
+        The same as available_rub_on_account without blocking event loop
+        """
+        position = await self.__get_positions_async(account_id)
+        last_prices = await self.__market_data_service.get_last_prices_async(OperationService.__short_figies(position))
+
+        return OperationService.__available_rub(position, last_prices)
+
+    @staticmethod
+    def __short_figies(position: PositionsResponse) -> list[str]:
+        if not position:
+            return []
+
+        return [security.figi for security in position.securities if security.blocked == 0 and security.balance < 0]
+
+    @staticmethod
+    def __available_rub(position: PositionsResponse, last_prices: dict[str, Quotation]) -> FixedPrice:
+        total_money = 0
 
         if position:
             for money in position.money:
                 if money.currency == rub_currency_name():
-                    logger.debug(f"Amount of RUB on account: {money}")
-                    total_money = moneyvalue_to_decimal(money)
+                    logger.debug("Amount of RUB on account: %s", money)
+                    total_money = moneyvalue_to_fixed(money)
 
             for security in position.securities:
                 if security.blocked == 0 and security.balance < 0:
-                    last_price = market_data_service.get_last_price(security.figi)
+                    last_price = last_prices.get(security.figi, None)
                     if last_price:
-                        total_money += quotation_to_decimal(last_price) * security.balance * 2
+                        total_money += quotation_to_fixed(last_price) * security.balance * 2
 
         return total_money
 
+    async def positions_async(self, account_id: str) -> PositionsResponse:
+        """
+        :return: All money and securities positions for account
+        """
+        return await self.__get_positions_async(account_id)
+
     def positions_securities(self, account_id: str) -> list[PositionsSecurities]:
         """
         :return: All open positions for account
@@ -53,15 +81,35 @@ class OperationService:
 
         return positions.securities if positions else None
 
+    async def positions_securities_async(self, account_id: str) -> list[PositionsSecurities]:
+        """
+        The same as positions_securities without blocking event loop
+        """
+        positions = await self.__get_positions_async(account_id)
+
+        return positions.securities if positions else None
+
     @invest_api_retry()
     @invest_error_logging
     def __get_positions(self, account_id: str) -> PositionsResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.debug(f"Get Positions for: {account_id}:")
 
             positions = client.operations.get_positions(account_id=account_id)
 
-            logger.debug(f"{positions}")
+            logger.debug("%s", positions)
+
+            return positions
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def __get_positions_async(self, account_id: str) -> PositionsResponse:
+        async with self.__client_pool.async_client() as client:
+            logger.debug(f"Get Positions for: {account_id}:")
+
+            positions = await client.operations.get_positions(account_id=account_id)
+
+            logger.debug("%s", positions)
 
             return positions
 
@@ -75,7 +123,7 @@ class OperationService:
             state: OperationState,
             figi: str = ""
     ) -> list[Operation]:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.debug(f"Get operations for: {account_id}, from: {from_}, to: {to_}, state: {state}, figi: {figi}")
 
             operations = client.operations.get_operations(
@@ -86,18 +134,18 @@ class OperationService:
                 figi=figi
             ).operations
 
-            logger.debug(f"{operations}")
+            logger.debug("%s", operations)
 
             return operations
 
     @invest_api_retry()
     @invest_error_logging
     def __get_portfolio(self, account_id: str) -> PortfolioResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.debug(f"Get portfolio for: {account_id}")
 
             portfolio = client.operations.get_portfolio(account_id=account_id)
 
-            logger.debug(f"{portfolio}")
+            logger.debug("%s", portfolio)
 
             return portfolio
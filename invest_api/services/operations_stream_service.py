@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import AsyncGenerator
+
+from tinkoff.invest import AioRequestError, PositionsStreamResponse
+
+from invest_api.client_pool import InvestClientPool
+from invest_api.retry_policy import STREAM_RETRY_POLICY
+
+__all__ = ("OperationsStreamService")
+
+logger = logging.getLogger(__name__)
+
+
+class OperationsStreamService:
+    """
+    The class encapsulate tinkoff operations stream (gRPC) service api
+    """
+    def __init__(self, client_pool: InvestClientPool) -> None:
+        self.__client_pool = client_pool
+
+    async def start_async_positions_stream(self, account_id: str) -> AsyncGenerator[PositionsStreamResponse, None]:
+        """
+        The method starts async gRPC stream and return changes of account positions.
+        The stream reconnects by itself and works until a consumer stops it.
+        Every (re)connect is confirmed by a message with subscriptions result.
+        """
+        logger.debug(f"Starting async positions stream loop")
+        # failed reconnects in a row
+        attempt = 0
+
+        while True:
+            try:
+                async with self.__client_pool.async_client() as client:
+                    logger.info(f"Subscribe positions: {account_id}")
+
+                    async for positions in client.operations_stream.positions_stream(accounts=[account_id]):
+                        logger.debug("positions: %s", positions)
+                        attempt = 0
+
+                        yield positions
+
+            except AioRequestError as ex:
+                logger.error("AioRequestError code=%s repr=%s details=%s", str(ex.code), repr(ex), ex.details)
+
+                attempt += 1
+                delay = STREAM_RETRY_POLICY.delay(attempt, ex)
+                if delay is None:
+                    raise
+
+                logger.debug(f"Status code available for reconnect in {delay:.3f} s")
+                await asyncio.sleep(delay)
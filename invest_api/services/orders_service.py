@@ -1,9 +1,12 @@
+import asyncio
 import logging
 
-from tinkoff.invest import Client, OrderDirection, Quotation, OrderType, PostOrderResponse, OrderState
+from tinkoff.invest import OrderDirection, Quotation, OrderType, PostOrderResponse, OrderState
 
+from invest_api.client_pool import InvestClientPool
 from invest_api.utils import generate_order_id
-from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
+from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry, async_invest_error_logging, \
+    async_invest_api_retry
 
 __all__ = ("OrderService")
 
@@ -14,10 +17,10 @@ class OrderService:
     """
     The class encapsulate tinkoff order service api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    def __init__(self, client_pool: InvestClientPool) -> None:
+        self.__client_pool = client_pool
 
+    # Retries are safe: order_id is idempotency key of the order (generated once before the first attempt)
     @invest_api_retry()
     @invest_error_logging
     def __post_order(
@@ -30,7 +33,7 @@ class OrderService:
             order_type: OrderType,
             order_id: str
     ) -> PostOrderResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             return client.orders.post_order(
                 figi=figi,
                 quantity=count_lots,
@@ -66,24 +69,111 @@ class OrderService:
             order_id=generate_order_id()
         )
 
-        logger.debug(f"{order}")
+        logger.debug("%s", order)
+
+        return order
+
+    # Retries are safe: order_id is idempotency key of the order (generated once before the first attempt)
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def __post_order_async(
+            self,
+            account_id: str,
+            figi: str,
+            count_lots: int,
+            price: Quotation,
+            direction: OrderDirection,
+            order_type: OrderType,
+            order_id: str
+    ) -> PostOrderResponse:
+        async with self.__client_pool.async_client() as client:
+            return await client.orders.post_order(
+                figi=figi,
+                quantity=count_lots,
+                price=price,
+                direction=direction,
+                account_id=account_id,
+                order_type=order_type,
+                order_id=order_id
+            )
+
+    async def post_market_order_async(
+            self,
+            account_id: str,
+            figi: str,
+            count_lots: int,
+            is_buy: bool
+    ) -> PostOrderResponse:
+        """
+        Post market order without blocking event loop
+        """
+        logger.info(
+            f"Post async market order account_id: {account_id}, "
+            f"figi: {figi}, count_lots: {count_lots}, is_buy: {is_buy}"
+        )
+
+        order = await self.__post_order_async(
+            account_id=account_id,
+            figi=figi,
+            count_lots=count_lots,
+            price=None,
+            direction=OrderDirection.ORDER_DIRECTION_BUY if is_buy else OrderDirection.ORDER_DIRECTION_SELL,
+            order_type=OrderType.ORDER_TYPE_MARKET,
+            order_id=generate_order_id()
+        )
+
+        logger.debug("%s", order)
 
         return order
 
     @invest_api_retry()
     @invest_error_logging
     def cancel_order(self, account_id: str, order_id: str) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             client.orders.cancel_order(account_id=account_id, order_id=order_id)
 
     @invest_api_retry()
     @invest_error_logging
     def get_order_state(self, account_id: str, order_id: str) -> OrderState:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             return client.orders.get_order_state(account_id=account_id, order_id=order_id)
 
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def get_order_state_async(self, account_id: str, order_id: str) -> OrderState:
+        async with self.__client_pool.async_client() as client:
+            return await client.orders.get_order_state(account_id=account_id, order_id=order_id)
+
+    async def get_order_states_async(
+            self,
+            account_id: str,
+            order_ids: list[str],
+            max_concurrency: int = 10
+    ) -> dict[str, OrderState]:
+        """
+        States of many orders concurrently (at most max_concurrency requests at once).
+        Orders with errors are absent in the result.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def order_state(order_id: str) -> OrderState:
+            async with semaphore:
+                return await self.get_order_state_async(account_id, order_id)
+
+        unique_ids = list(dict.fromkeys(order_ids))
+        states = await asyncio.gather(*[order_state(x) for x in unique_ids], return_exceptions=True)
+
+        result = dict()
+        for order_id, state in zip(unique_ids, states):
+            if isinstance(state, BaseException):
+                logger.error(f"Get order state error: {order_id}, {repr(state)}")
+            else:
+                result[order_id] = state
+
+        return result
+
     @invest_api_retry()
     @invest_error_logging
     def get_orders(self, account_id: str) -> list[OrderState]:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             return client.orders.get_orders(account_id=account_id).orders
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from typing import AsyncGenerator
+
+from tinkoff.invest import AioRequestError, TradesStreamResponse
+
+from invest_api.client_pool import InvestClientPool
+from invest_api.retry_policy import STREAM_RETRY_POLICY
+
+__all__ = ("OrdersStreamService")
+
+logger = logging.getLogger(__name__)
+
+
+class OrdersStreamService:
+    """
+    The class encapsulate tinkoff orders stream (gRPC) service api
+    """
+    def __init__(self, client_pool: InvestClientPool) -> None:
+        self.__client_pool = client_pool
+
+    async def start_async_trades_stream(self, account_id: str) -> AsyncGenerator[TradesStreamResponse, None]:
+        """
+        The method starts async gRPC stream and return trades (fills) of account orders.
+        The stream reconnects by itself and works until a consumer stops it.
+        """
+        logger.debug(f"Starting async trades stream loop")
+        # failed reconnects in a row
+        attempt = 0
+
+        while True:
+            try:
+                async with self.__client_pool.async_client() as client:
+                    logger.info(f"Subscribe order trades: {account_id}")
+
+                    async for trades in client.orders_stream.trades_stream(accounts=[account_id]):
+                        logger.debug("trades: %s", trades)
+                        attempt = 0
+
+                        yield trades
+
+            except AioRequestError as ex:
+                logger.error("AioRequestError code=%s repr=%s details=%s", str(ex.code), repr(ex), ex.details)
+
+                attempt += 1
+                delay = STREAM_RETRY_POLICY.delay(attempt, ex)
+                if delay is None:
+                    raise
+
+                logger.debug(f"Status code available for reconnect in {delay:.3f} s")
+                await asyncio.sleep(delay)
@@ -1,9 +1,11 @@
 import datetime
 import logging
 
-from tinkoff.invest import Client, Quotation, StopOrderDirection, StopOrderExpirationType, StopOrderType, StopOrder
+from tinkoff.invest import Quotation, StopOrderDirection, StopOrderExpirationType, StopOrderType, StopOrder
 
-from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
+from invest_api.client_pool import InvestClientPool
+from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry, async_invest_error_logging, \
+    async_invest_api_retry
 
 __all__ = ("StopOrderService")
 
@@ -14,11 +16,11 @@ class StopOrderService:
     """
     The class encapsulate tinkoff stop order service api
     """
-    def __init__(self, token: str, app_name: str) -> None:
-        self.__token = token
-        self.__app_name = app_name
+    def __init__(self, client_pool: InvestClientPool) -> None:
+        self.__client_pool = client_pool
 
-    @invest_api_retry()
+    # Stop orders don't have idempotency key: retried only if the request has been rejected by rate limit
+    @invest_api_retry(idempotent=False)
     @invest_error_logging
     def __post_stop_order(
             self,
@@ -32,7 +34,7 @@ class StopOrderService:
             stop_order_type: StopOrderType,
             expire_date: datetime
     ) -> str:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             logger.debug(f"Post stop order for: {account_id}")
 
             return client.stop_orders.post_stop_order(
@@ -47,14 +49,65 @@ class StopOrderService:
                 expire_date=expire_date
             ).stop_order_id
 
+    # Stop orders don't have idempotency key: retried only if the request has been rejected by rate limit
+    @async_invest_api_retry(idempotent=False)
+    @async_invest_error_logging
+    async def post_stop_order_async(
+            self,
+            account_id: str,
+            figi: str,
+            count_lots: int,
+            stop_price: Quotation,
+            is_buy: bool,
+            stop_order_type: StopOrderType,
+            expire_date: datetime
+    ) -> str:
+        """
+        Post stop order (executed by market order) till expire_date without blocking event loop
+        :return: stop order id
+        """
+        logger.info(
+            f"Post async stop order account_id: {account_id}, figi: {figi}, count_lots: {count_lots}, "
+            f"stop_price: {stop_price}, is_buy: {is_buy}, type: {stop_order_type.name}"
+        )
+
+        async with self.__client_pool.async_client() as client:
+            return (await client.stop_orders.post_stop_order(
+                figi=figi,
+                quantity=count_lots,
+                price=stop_price,
+                stop_price=stop_price,
+                direction=StopOrderDirection.STOP_ORDER_DIRECTION_BUY if is_buy
+                else StopOrderDirection.STOP_ORDER_DIRECTION_SELL,
+                account_id=account_id,
+                expiration_type=StopOrderExpirationType.STOP_ORDER_EXPIRATION_TYPE_GOOD_TILL_DATE,
+                stop_order_type=stop_order_type,
+                expire_date=expire_date
+            )).stop_order_id
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def get_stop_orders_async(self, account_id: str) -> list[StopOrder]:
+        """
+        Active stop orders of the account without blocking event loop
+        """
+        async with self.__client_pool.async_client() as client:
+            return (await client.stop_orders.get_stop_orders(account_id=account_id)).stop_orders
+
+    @async_invest_api_retry()
+    @async_invest_error_logging
+    async def cancel_stop_order_async(self, account_id: str, stop_order_id: str) -> None:
+        async with self.__client_pool.async_client() as client:
+            await client.stop_orders.cancel_stop_order(account_id=account_id, stop_order_id=stop_order_id)
+
     @invest_api_retry()
     @invest_error_logging
     def get_stop_orders(self, account_id: str) -> list[StopOrder]:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             return client.stop_orders.get_stop_orders(account_id=account_id).stop_orders
 
     @invest_api_retry()
     @invest_error_logging
     def cancel_stop_order(self, account_id: str, stop_order_id: str) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__client_pool.client() as client:
             client.stop_orders.cancel_stop_order(account_id=account_id, stop_order_id=stop_order_id)
@@ -0,0 +1,71 @@
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from tinkoff.invest import GetTradingStatusResponse, SecurityTradingStatus, TradingStatus
+
+__all__ = ("FigiTradingStatus", "TradingStatusCache")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False, repr=True)
+class FigiTradingStatus:
+    trading_status: SecurityTradingStatus = SecurityTradingStatus.SECURITY_TRADING_STATUS_UNSPECIFIED
+    limit_order_available_flag: bool = False
+    market_order_available_flag: bool = False
+    # Stream messages don't have the flag. It is known only after unary request
+    api_trade_available_flag: Optional[bool] = None
+
+
+class TradingStatusCache:
+    """
+    Trading status of instruments by figi.
+    Market data stream keeps the statuses up to date, unary requests fill cold entries.
+    """
+    def __init__(self) -> None:
+        self.__statuses: dict[str, FigiTradingStatus] = dict()
+
+    def is_ready_for_trading(self, figi: str) -> Optional[bool]:
+        """
+        The same decision as MarketDataService.is_stock_ready_for_trading.
+        :return: None if the cache doesn't know enough about figi (cold cache)
+        """
+        status = self.__statuses.get(figi)
+
+        if not status or status.api_trade_available_flag is None:
+            return None
+
+        return status.limit_order_available_flag and \
+               status.market_order_available_flag and \
+               status.api_trade_available_flag and \
+               status.trading_status == SecurityTradingStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING
+
+    def update_from_response(self, response: GetTradingStatusResponse) -> None:
+        self.__statuses[response.figi] = FigiTradingStatus(
+            trading_status=response.trading_status,
+            limit_order_available_flag=response.limit_order_available_flag,
+            market_order_available_flag=response.market_order_available_flag,
+            api_trade_available_flag=response.api_trade_available_flag
+        )
+
+    def update_from_stream(self, trading_status: TradingStatus) -> None:
+        status = self.__statuses.setdefault(trading_status.figi, FigiTradingStatus())
+
+        status.trading_status = trading_status.trading_status
+        status.limit_order_available_flag = trading_status.limit_order_available_flag
+        status.market_order_available_flag = trading_status.market_order_available_flag
+
+        logger.debug("Trading status from stream %s: %s", trading_status.figi, status)
+
+    def clear(self, figies: Optional[Iterable[str]] = None) -> None:
+        """
+        Changes could be lost while the stream has been disconnected.
+        :param figies: Statuses to remove (all if it isn't specified)
+        """
+        if figies is None:
+            self.__statuses.clear()
+            return None
+
+        for figi in figies:
+            self.__statuses.pop(figi, None)
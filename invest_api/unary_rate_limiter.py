@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+import grpc
+
+from metrics.latency_metrics import observe, set_gauge_function
+
+__all__ = ("UnaryRateLimiter")
+
+logger = logging.getLogger(__name__)
+
+# Orders go first: informational requests don't take the last tokens of a group
+PRIORITY_METHODS = frozenset({
+    "OrdersService/PostOrder",
+    "OrdersService/CancelOrder",
+    "OrdersService/ReplaceOrder",
+    "StopOrdersService/PostStopOrder",
+    "StopOrdersService/CancelStopOrder",
+})
+
+
+class _TokenBucket:
+    """
+    Tokens of one group of methods with the common limit per minute.
+    Burst (capacity) and refill of a minute together don't exceed the limit.
+    """
+    def __init__(self, name: str, limit_per_minute: int, burst_fraction: float, reserve_fraction: float) -> None:
+        self.name = name
+        self.capacity = max(1.0, limit_per_minute * burst_fraction)
+        self.rate = max(1.0, limit_per_minute - self.capacity) / 60
+        # the tokens are taken only by priority methods
+        self.reserve = min(self.capacity - 1, self.capacity * reserve_fraction)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.priority_waiters = 0
+
+    def refill(self) -> float:
+        """
+        Add tokens for the time since the last update
+        :return: Tokens in the bucket
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        return self.tokens
+
+    def take(self, is_priority: bool) -> float:
+        """
+        :return: 0 if the token has been taken, otherwise seconds to wait for it
+        """
+        self.refill()
+
+        if not is_priority and self.priority_waiters:
+            return 1 / self.rate
+
+        floor = 0 if is_priority else self.reserve
+        if self.tokens - 1 >= floor:
+            self.tokens -= 1
+            return 0.0
+
+        return (floor + 1 - self.tokens) / self.rate
+
+
+class UnaryRateLimiter:
+    """
+    Client side limits of unary requests by groups of methods (tariff unary_limits, see get_user_tariff).
+    Every request waits for a token of its group: requests over the quota wait instead of being rejected.
+    Order posts and cancels are a priority lane: they wait less and can take reserved tokens.
+    Requests of methods out of the limits (or before update_limits) aren't limited.
+    Works for sync and asyncio channels (one quota for both) via gRPC interceptors.
+    """
+    def __init__(self, burst_fraction: float = 0.2, reserve_fraction: float = 0.2) -> None:
+        self.__burst_fraction = burst_fraction
+        self.__reserve_fraction = reserve_fraction
+        # full method name (package.Service/Method) -> bucket of its group
+        self.__buckets: dict[str, _TokenBucket] = dict()
+        self.__lock = threading.Lock()
+
+    def update_limits(self, unary_limits: Iterable[tuple[int, list[str]]]) -> None:
+        """
+        :param unary_limits: (limit per minute, full method names) of every group
+        """
+        buckets = dict()
+
+        for limit_per_minute, methods in unary_limits:
+            if limit_per_minute <= 0 or not methods:
+                continue
+
+            name = "+".join(sorted({x.split(".")[-1].split("/")[0] for x in methods}))
+            bucket = _TokenBucket(name, limit_per_minute, self.__burst_fraction, self.__reserve_fraction)
+            for method in methods:
+                buckets[method] = bucket
+
+            # tokens left in the group (refilled when metrics are rendered)
+            set_gauge_function("rate_limit_headroom", (("group", name), ), self.__headroom_function(bucket))
+
+            logger.info(f"Unary rate limit {name}: {limit_per_minute} per minute")
+
+        with self.__lock:
+            self.__buckets = buckets
+
+    def acquire(self, method: str) -> None:
+        """
+        Blocking wait for a token of the method (sync requests)
+        """
+        bucket, is_priority = self.__bucket(method)
+        if not bucket:
+            return None
+
+        started = time.perf_counter()
+        waiting = False
+
+        try:
+            while (delay := self.__take(bucket, is_priority, waiting)) > 0:
+                waiting = True
+                time.sleep(delay)
+        finally:
+            self.__stop_waiting(bucket, is_priority, waiting)
+
+        self.__observe(bucket, is_priority, time.perf_counter() - started)
+
+    async def acquire_async(self, method: str) -> None:
+        """
+        Wait for a token of the method without blocking event loop
+        """
+        bucket, is_priority = self.__bucket(method)
+        if not bucket:
+            return None
+
+        started = time.perf_counter()
+        waiting = False
+
+        try:
+            while (delay := self.__take(bucket, is_priority, waiting)) > 0:
+                waiting = True
+                await asyncio.sleep(delay)
+        finally:
+            self.__stop_waiting(bucket, is_priority, waiting)
+
+        self.__observe(bucket, is_priority, time.perf_counter() - started)
+
+    def interceptor(self) -> grpc.UnaryUnaryClientInterceptor:
+        return _RateLimitInterceptor(self)
+
+    def async_interceptor(self) -> grpc.aio.UnaryUnaryClientInterceptor:
+        return _AsyncRateLimitInterceptor(self)
+
+    def __bucket(self, method: str) -> (Optional[_TokenBucket], bool):
+        method = method.decode() if isinstance(method, bytes) else method
+        method = method.lstrip("/")
+
+        return self.__buckets.get(method), method.split(".")[-1] in PRIORITY_METHODS
+
+    def __take(self, bucket: _TokenBucket, is_priority: bool, waiting: bool) -> float:
+        with self.__lock:
+            delay = bucket.take(is_priority)
+
+            if delay > 0 and is_priority and not waiting:
+                bucket.priority_waiters += 1
+
+            return delay
+
+    def __stop_waiting(self, bucket: _TokenBucket, is_priority: bool, waiting: bool) -> None:
+        if waiting and is_priority:
+            with self.__lock:
+                bucket.priority_waiters -= 1
+
+    def __headroom_function(self, bucket: _TokenBucket):
+        def headroom() -> float:
+            with self.__lock:
+                return bucket.refill()
+
+        return headroom
+
+    @staticmethod
+    def __observe(bucket: _TokenBucket, is_priority: bool, seconds: float) -> None:
+        observe("rate_limit_wait_seconds", (("group", bucket.name), ("lane", "priority" if is_priority else "normal")),
+                seconds)
+
+
+class _RateLimitInterceptor(grpc.UnaryUnaryClientInterceptor):
+    def __init__(self, limiter: UnaryRateLimiter) -> None:
+        self.__limiter = limiter
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        self.__limiter.acquire(client_call_details.method)
+
+        return continuation(client_call_details, request)
+
+
+class _AsyncRateLimitInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    def __init__(self, limiter: UnaryRateLimiter) -> None:
+        self.__limiter = limiter
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        await self.__limiter.acquire_async(client_call_details.method)
+
+        return await continuation(client_call_details, request)
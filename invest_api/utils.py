@@ -7,6 +7,12 @@ from tinkoff.invest.utils import quotation_to_decimal, decimal_to_quotation
 
 __all__ = ()
 
+# Fixed-point price or money: int64 count of nanos (units * 10^9 + nano), the api representation.
+# Integer arithmetic is used in the hot path, Decimal only for reporting.
+FixedPrice = int
+
+NANOS_IN_UNIT = 1_000_000_000
+
 
 def rub_currency_name() -> str:
     return "rub"
@@ -25,6 +31,44 @@ def moneyvalue_to_decimal(money_value: MoneyValue) -> Decimal:
     )
 
 
+def quotation_to_fixed(quotation: Quotation) -> FixedPrice:
+    return quotation.units * NANOS_IN_UNIT + quotation.nano
+
+
+def moneyvalue_to_fixed(money_value: MoneyValue) -> FixedPrice:
+    return money_value.units * NANOS_IN_UNIT + money_value.nano
+
+
+def fixed_to_quotation(fixed: FixedPrice) -> Quotation:
+    units = abs(fixed) // NANOS_IN_UNIT * (1 if fixed >= 0 else -1)
+    return Quotation(units=units, nano=fixed - units * NANOS_IN_UNIT)
+
+
+def fixed_to_decimal(fixed: FixedPrice) -> Decimal:
+    return Decimal(fixed) / NANOS_IN_UNIT
+
+
+def decimal_to_fixed(decimal: Decimal) -> FixedPrice:
+    return int(decimal * NANOS_IN_UNIT)
+
+
+def fixed_multiply(fixed: FixedPrice, multiplier: FixedPrice) -> FixedPrice:
+    """
+    Product of two fixed-point values (for example, price and take profit multiplier)
+    """
+    return fixed * multiplier // NANOS_IN_UNIT
+
+
+def fixed_round_to_step(fixed: FixedPrice, step: FixedPrice) -> FixedPrice:
+    """
+    The nearest multiple of step (for example, price increment of an instrument)
+    """
+    if step <= 0:
+        return fixed
+
+    return (fixed + step // 2) // step * step
+
+
 def decimal_to_moneyvalue(decimal: Decimal, currency: str = rub_currency_name()) -> MoneyValue:
     quotation = decimal_to_quotation(decimal)
     return MoneyValue(
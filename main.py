@@ -1,21 +1,37 @@
 import asyncio
+import dataclasses
 import logging
 import os
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueListener
+from typing import Optional
 
 from blog.blog_worker import BlogWorker
 from blog.blogger import Blogger
+from blog.messages_queue import BlogMessagesQueue
 from configuration.configuration import ProgramConfiguration
+from configuration.logging_configuration import configure_logging
+from configuration.settings import LoggingSettings
+from invest_api.client_pool import InvestClientPool
 from invest_api.services.accounts_service import AccountService
 from invest_api.services.client_service import ClientService
 from invest_api.services.instruments_service import InstrumentService
 from invest_api.services.market_data_service import MarketDataService
 from invest_api.services.operations_service import OperationService
+from invest_api.services.operations_stream_service import OperationsStreamService
 from invest_api.services.orders_service import OrderService
+from invest_api.services.orders_stream_service import OrdersStreamService
+from invest_api.services.stop_orders_service import StopOrderService
 from invest_api.services.market_data_stream_service import MarketDataStreamService
+from invest_api.trading_status_cache import TradingStatusCache
+from invest_api.unary_rate_limiter import UnaryRateLimiter
+from metrics.latency_metrics import enable_metrics
+from metrics.metrics_exporter import MetricsFileDumper, MetricsHttpServer
+from storage.instrument_cache import InstrumentCache
+from storage.market_data_recorder import MarketDataRecorder
+from storage.trading_schedule_cache import TradingScheduleCache
 from trade_system.strategies.strategy_factory import StrategyFactory
-from trading.trade_service import TradeService
+from trading.trade_service import AccountStrategies, TradeService
 
 # the configuration file name
 CONFIG_FILE = "settings.ini"
@@ -23,7 +39,11 @@ CONFIG_FILE = "settings.ini"
 logger = logging.getLogger(__name__)
 
 
-async def start_asyncio_trading(blog_worker_loop: BlogWorker, trade_service_loop: TradeService) -> None:
+async def start_asyncio_trading(
+        blog_worker_loop: BlogWorker,
+        trade_service_loop: TradeService,
+        client_pool: InvestClientPool
+) -> None:
     # Some asyncio MAGIC for Windows OS
     if sys.version_info[0] == 3 and sys.version_info[1] >= 8 and sys.platform.startswith('win'):
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -33,49 +53,119 @@ async def start_asyncio_trading(blog_worker_loop: BlogWorker, trade_service_loop
     blog_task = asyncio.create_task(blog_worker_loop.worker())
     trade_task = asyncio.create_task(trade_service_loop.worker())
 
-    await blog_task
-    await trade_task
+    try:
+        await blog_task
+        await trade_task
+    finally:
+        # the asyncio channel is bound to this event loop
+        await client_pool.close_async()
 
 
-def prepare_logs() -> None:
+def prepare_logs(logging_settings: LoggingSettings) -> Optional[QueueListener]:
     if not os.path.exists("logs/"):
         os.makedirs("logs/")
 
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="%(asctime)s - %(module)s - %(levelname)s - %(funcName)s: %(lineno)d - %(message)s",
-        handlers=[RotatingFileHandler('logs/robot.log', maxBytes=100000000, backupCount=10, encoding='utf-8')],
-        encoding="utf-8"
+    return configure_logging(
+        "logs/robot.log",
+        level=logging.getLevelName(logging_settings.level),
+        use_queue=logging_settings.queue_status,
+        json_lines=logging_settings.json_lines,
+        # every stream message is logged at DEBUG
+        sampled_loggers=(
+            "invest_api.services.market_data_stream_service",
+            "invest_api.services.operations_stream_service",
+            "invest_api.trading_status_cache",
+        ),
+        sampled_records_per_second=logging_settings.stream_debug_records_per_second
     )
 
 
 if __name__ == "__main__":
-    prepare_logs()
-
-    logger.info("Program start")
-
+    config, config_error = None, None
     try:
         config = ProgramConfiguration(CONFIG_FILE)
-        logger.info("Configuration has been loaded")
     except Exception as ex:
-        logger.critical("Load configuration error: %s", repr(ex))
+        config_error = ex
+
+    # Default logging settings if the configuration can't be loaded
+    log_listener = prepare_logs(config.logging_settings if config else LoggingSettings())
+
+    logger.info("Program start")
+
+    if config_error:
+        logger.critical("Load configuration error: %s", repr(config_error))
     else:
-        account_service = AccountService(config.tinkoff_token, config.tinkoff_app_name)
-        client_service = ClientService(config.tinkoff_token, config.tinkoff_app_name)
-        instrument_service = InstrumentService(config.tinkoff_token, config.tinkoff_app_name)
-        operation_service = OperationService(config.tinkoff_token, config.tinkoff_app_name)
-        order_service = OrderService(config.tinkoff_token, config.tinkoff_app_name)
-        stream_service = MarketDataStreamService(config.tinkoff_token, config.tinkoff_app_name)
-        market_data_service = MarketDataService(config.tinkoff_token, config.tinkoff_app_name)
+        logger.info("Configuration has been loaded")
+
+        # Latency histograms and their export (background threads)
+        metrics_exporters = []
+        if config.metrics_settings.metrics_status:
+            metrics_registry = enable_metrics()
+
+            if config.metrics_settings.http_port:
+                metrics_exporters.append(MetricsHttpServer(metrics_registry, config.metrics_settings.http_port))
+            if config.metrics_settings.dump_file:
+                metrics_exporters.append(
+                    MetricsFileDumper(
+                        metrics_registry,
+                        config.metrics_settings.dump_file,
+                        config.metrics_settings.dump_interval_seconds
+                    )
+                )
+
+            for metrics_exporter in metrics_exporters:
+                metrics_exporter.start()
+
+        # One long-lived channel for all services
+        # Unary requests of all services wait for the tariff limits (known after verification)
+        rate_limiter = UnaryRateLimiter()
+        client_pool = InvestClientPool(config.tinkoff_token, config.tinkoff_app_name, rate_limiter=rate_limiter)
+
+        account_service = AccountService(client_pool)
+        client_service = ClientService(client_pool)
+        # Share settings are requested once per TTL
+        instrument_cache = InstrumentCache(config.instrument_cache_file, config.instrument_cache_ttl_seconds) \
+            if config.instrument_cache_file else None
+        instrument_service = InstrumentService(
+            client_pool,
+            instrument_cache,
+            TradingScheduleCache(config.schedule_cache_file)
+        )
+        # Filled by market data stream, read by market data service without requests
+        trading_status_cache = TradingStatusCache()
+        # Optional recording of raw market data stream (written by background thread)
+        recorder = MarketDataRecorder(config.market_data_record_path) if config.market_data_record_path else None
+        if recorder:
+            recorder.start()
+        stream_service = MarketDataStreamService(client_pool, trading_status_cache, recorder)
+        market_data_service = MarketDataService(client_pool, trading_status_cache, config.last_price_ttl_seconds)
+        operation_service = OperationService(client_pool, market_data_service)
+        operations_stream_service = OperationsStreamService(client_pool)
+        order_service = OrderService(client_pool)
+        stop_order_service = StopOrderService(client_pool)
+        orders_stream_service = OrdersStreamService(client_pool)
 
         if account_service.verify_token():
+            # candles stream is sharded within the tariff limit of connections
+            stream_service.update_stream_limit(account_service.market_data_stream_limit)
+            rate_limiter.update_limits(account_service.unary_limits)
             logger.info(f"Blog settings: {config.blog_settings}")
 
-            trade_strategies = \
-                [StrategyFactory.new_factory(x.name, x) for x in config.trade_strategy_settings]
+            # Every account has own instances of strategies (and settings: lot size is updated by trader)
+            accounts_strategies = [
+                AccountStrategies(
+                    settings=account_settings,
+                    strategies=[
+                        StrategyFactory.new_factory(x.name, dataclasses.replace(x))
+                        for x in config.trade_strategy_settings
+                        if not account_settings.tickers or x.ticker in account_settings.tickers
+                    ]
+                )
+                for account_settings in config.accounts_settings
+            ]
 
             # Queue to keep messages for TG. TradeService(via Blogger) produce, BlogWorker consume (send)
-            messages_queue = asyncio.Queue()
+            messages_queue = BlogMessagesQueue(config.blog_settings.queue_size)
 
             blog_worker = BlogWorker(config.blog_settings, messages_queue)
             trade_service = TradeService(
@@ -83,18 +173,29 @@ if __name__ == "__main__":
                 client_service=client_service,
                 instrument_service=instrument_service,
                 operation_service=operation_service,
+                operations_stream_service=operations_stream_service,
                 order_service=order_service,
                 stream_service=stream_service,
                 market_data_service=market_data_service,
                 blogger=Blogger(config.blog_settings, config.trade_strategy_settings, messages_queue),
-                account_settings=config.account_settings,
+                accounts_strategies=accounts_strategies,
                 trading_settings=config.trading_settings,
-                strategies=trade_strategies
+                stop_order_service=stop_order_service,
+                orders_stream_service=orders_stream_service
             )
 
-            asyncio.run(start_asyncio_trading(blog_worker, trade_service))
+            asyncio.run(start_asyncio_trading(blog_worker, trade_service, client_pool))
 
         else:
             logger.critical("Client verification has been failed")
 
+        if recorder:
+            recorder.close()
+        for metrics_exporter in metrics_exporters:
+            metrics_exporter.stop()
+        client_pool.close()
+
     logger.info("Program end")
+
+    if log_listener:
+        log_listener.stop()
@@ -0,0 +1,190 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+__all__ = ("LatencyHistograms", "enable_metrics", "disable_metrics", "metrics_registry", "observe", "set_gauge",
+           "set_gauge_function", "span")
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of histogram buckets in seconds (the last bucket is +Inf)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets_count: int) -> None:
+        # counts by bucket (not cumulative) + the last one for +Inf
+        self.counts = [0] * (buckets_count + 1)
+        self.sum = 0.0
+
+
+class LatencyHistograms:
+    """
+    Registry of latency histograms with fixed buckets.
+    Histogram is identified by metric name and label values, for example:
+    ("trading_stage_seconds", (("stage", "analyze"), ("figi", "BBG004730N88"))).
+    Gauges (the latest value) are identified the same way.
+    Gauge functions are called at render time: the value is current, not the one of the last event.
+    """
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = "invest_bot_") -> None:
+        self.__buckets = buckets
+        self.__prefix = prefix
+        self.__histograms: dict[tuple[str, tuple], _Histogram] = dict()
+        self.__gauges: dict[tuple[str, tuple], float] = dict()
+        self.__gauge_functions: dict[tuple[str, tuple], Callable[[], float]] = dict()
+        self.__lock = threading.Lock()
+
+    def observe(self, name: str, labels: tuple, seconds: float) -> None:
+        index = bisect.bisect_left(self.__buckets, seconds)
+
+        with self.__lock:
+            histogram = self.__histograms.get((name, labels))
+            if not histogram:
+                histogram = self.__histograms[(name, labels)] = _Histogram(len(self.__buckets))
+
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+
+    def set_gauge(self, name: str, labels: tuple, value: float) -> None:
+        with self.__lock:
+            self.__gauges[(name, labels)] = value
+
+    def set_gauge_function(self, name: str, labels: tuple, function: Callable[[], float]) -> None:
+        with self.__lock:
+            self.__gauge_functions[(name, labels)] = function
+
+    def render_prometheus(self) -> str:
+        """
+        Histograms and gauges in Prometheus text exposition format
+        """
+        with self.__lock:
+            snapshot = [(name, labels, list(x.counts), x.sum) for (name, labels), x in self.__histograms.items()]
+            gauges = list(self.__gauges.items())
+            gauge_functions = list(self.__gauge_functions.items())
+
+        for key, function in gauge_functions:
+            try:
+                gauges.append((key, float(function())))
+            except Exception as ex:
+                logger.error(f"Gauge {key[0]} error: {repr(ex)}")
+
+        lines = []
+        last_name = None
+
+        for name, labels, counts, sum_ in sorted(snapshot, key=lambda x: (x[0], x[1])):
+            metric = self.__prefix + name
+            if name != last_name:
+                lines.append(f"# TYPE {metric} histogram")
+                last_name = name
+
+            cumulative = 0
+            for bound, count in zip(self.__buckets + (float("inf"), ), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{metric}_bucket{self.__labels(labels + (('le', le), ))} {cumulative}")
+
+            lines.append(f"{metric}_sum{self.__labels(labels)} {sum_:.6f}")
+            lines.append(f"{metric}_count{self.__labels(labels)} {cumulative}")
+
+        last_name = None
+        for (name, labels), value in sorted(gauges, key=lambda x: x[0]):
+            metric = self.__prefix + name
+            if name != last_name:
+                lines.append(f"# TYPE {metric} gauge")
+                last_name = name
+
+            lines.append(f"{metric}{self.__labels(labels)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __labels(labels: tuple) -> str:
+        if not labels:
+            return ""
+
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class _Span:
+    __slots__ = ("__registry", "__name", "__labels", "__started")
+
+    def __init__(self, registry: LatencyHistograms, name: str, labels: tuple) -> None:
+        self.__registry = registry
+        self.__name = name
+        self.__labels = labels
+        self.__started = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.__started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.__registry.observe(self.__name, self.__labels, time.perf_counter() - self.__started)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+# Metrics are off by default: spans do nothing and don't read the clock
+_registry: Optional[LatencyHistograms] = None
+
+
+def enable_metrics(registry: Optional[LatencyHistograms] = None) -> LatencyHistograms:
+    global _registry
+    _registry = registry or LatencyHistograms()
+
+    logger.info("Latency metrics have been enabled")
+
+    return _registry
+
+
+def disable_metrics() -> None:
+    global _registry
+    _registry = None
+
+
+def metrics_registry() -> Optional[LatencyHistograms]:
+    return _registry
+
+
+def span(name: str, labels: tuple = ()):
+    """
+    Context manager measures time of the block into histogram name with labels ((key, value), ...)
+    """
+    if _registry is None:
+        return _NO_SPAN
+
+    return _Span(_registry, name, labels)
+
+
+def observe(name: str, labels: tuple, seconds: float) -> None:
+    if _registry is not None:
+        _registry.observe(name, labels, seconds)
+
+
+def set_gauge(name: str, labels: tuple, value: float) -> None:
+    if _registry is not None:
+        _registry.set_gauge(name, labels, value)
+
+
+def set_gauge_function(name: str, labels: tuple, function: Callable[[], float]) -> None:
+    """
+    Gauge value is given by the function when metrics are rendered
+    """
+    if _registry is not None:
+        _registry.set_gauge_function(name, labels, function)
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from metrics.latency_metrics import LatencyHistograms
+
+__all__ = ("MetricsHttpServer", "MetricsFileDumper")
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsHttpServer:
+    """
+    Local http endpoint with metrics in Prometheus text format: http://{host}:{port}/metrics
+    The server works in a background thread.
+    """
+    def __init__(self, registry: LatencyHistograms, port: int, host: str = "127.0.0.1") -> None:
+        self.__registry = registry
+        self.__port = port
+        self.__host = host
+        self.__server: Optional[ThreadingHTTPServer] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        registry = self.__registry
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return None
+
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:
+                logger.debug("Metrics request: " + format, *args)
+
+        self.__server = ThreadingHTTPServer((self.__host, self.__port), _MetricsHandler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="metrics-http", daemon=True)
+        self.__thread.start()
+
+        logger.info(f"Metrics endpoint: http://{self.__host}:{self.__port}/metrics")
+
+    def stop(self) -> None:
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__thread.join()
+            self.__server = None
+            self.__thread = None
+
+
+class MetricsFileDumper:
+    """
+    Periodic dump of metrics in Prometheus text format to a file (written atomically via rename)
+    """
+    def __init__(self, registry: LatencyHistograms, file_name: str, interval_seconds: float = 60) -> None:
+        self.__registry = registry
+        self.__file_name = file_name
+        self.__interval_seconds = interval_seconds
+        self.__stop_event = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__worker, name="metrics-dump", daemon=True)
+        self.__thread.start()
+
+        logger.info(f"Metrics are dumped to {self.__file_name} every {self.__interval_seconds} s")
+
+    def stop(self) -> None:
+        if self.__thread:
+            self.__stop_event.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def dump(self) -> None:
+        temp_file_name = self.__file_name + ".tmp"
+
+        with open(temp_file_name, "w", encoding="utf-8") as file:
+            file.write(self.__registry.render_prometheus())
+
+        os.replace(temp_file_name, self.__file_name)
+
+    def __worker(self) -> None:
+        while not self.__stop_event.wait(self.__interval_seconds):
+            self.__dump_safe()
+
+        # the last state at exit
+        self.__dump_safe()
+
+    def __dump_safe(self) -> None:
+        try:
+            self.dump()
+        except Exception as ex:
+            logger.error(f"Metrics dump error: {repr(ex)}")
@@ -0,0 +1,133 @@
+import argparse
+import logging
+import time
+
+from tinkoff.invest import CandleInterval
+
+from backtesting.candle_arrays import CandleArrays
+from backtesting.change_and_volume_backtest import ChangeAndVolumeParams
+from backtesting.parameter_sweep import ParameterSweep, SweepResult
+from configuration.configuration import ProgramConfiguration
+from configuration.settings import StrategySettings
+from invest_api.client_pool import InvestClientPool
+from invest_api.services.client_service import ClientService
+from storage.candle_store import CandleStore
+
+# the configuration file name
+CONFIG_FILE = "settings.ini"
+
+logger = logging.getLogger(__name__)
+
+
+def load_candles(
+        config: ProgramConfiguration,
+        strategies: list[StrategySettings],
+        days: int,
+        store_path: str
+) -> dict[str, CandleArrays]:
+    client_pool = InvestClientPool(config.tinkoff_token, config.tinkoff_app_name)
+    client_service = ClientService(client_pool)
+    candle_store = CandleStore(store_path) if store_path else None
+    result: dict[str, CandleArrays] = dict()
+
+    try:
+        for strategy_settings in strategies:
+            if candle_store:
+                candle_store.update(client_service, strategy_settings.figi, CandleInterval.CANDLE_INTERVAL_1_MIN, days)
+                result[strategy_settings.figi] = \
+                    candle_store.read(strategy_settings.figi, CandleInterval.CANDLE_INTERVAL_1_MIN).to_candle_arrays()
+            else:
+                result[strategy_settings.figi] = CandleArrays.from_historic_candles(
+                    client_service.download_historic_candle(
+                        strategy_settings.figi, days, CandleInterval.CANDLE_INTERVAL_1_MIN
+                    )
+                )
+    finally:
+        client_pool.close()
+
+    return result
+
+
+def settings_sections(strategy_settings: StrategySettings, result: SweepResult) -> str:
+    """
+    Ready-to-paste sections for settings.ini
+    """
+    section = f"STRATEGY_{strategy_settings.ticker}"
+    lines = [
+        f"# total return {result.total_return * 100:.2f} %, hit rate {result.hit_rate * 100:.2f} %, "
+        f"max drawdown {result.max_drawdown * 100:.2f} %, trades {result.trades_count}",
+        f"[{section}]",
+        f"STRATEGY_NAME={strategy_settings.name}",
+        f"TICKER={strategy_settings.ticker}",
+        f"FIGI={strategy_settings.figi}",
+        f"MAX_LOTS_PER_ORDER={strategy_settings.max_lots_per_order}",
+        f"[{section}_SETTINGS]",
+    ]
+    lines.extend(f"{key}={value}" for key, value in result.params.to_settings().items())
+
+    return "\n".join(lines) + "\n"
+
+
+def optimize(
+        config: ProgramConfiguration,
+        days: int,
+        store_path: str,
+        samples: int,
+        workers: int,
+        min_trades: int,
+        output: str
+) -> None:
+    strategies = [x for x in config.trade_strategy_settings if x.name == "ChangeAndVolumeStrategy"]
+    candles = load_candles(config, strategies, days, store_path)
+
+    candidates = dict()
+    for strategy_settings in strategies:
+        grid = ParameterSweep.grid(ChangeAndVolumeParams.from_settings(strategy_settings.settings))
+        candidates[strategy_settings.figi] = ParameterSweep.random_sample(grid, samples) if samples else grid
+
+    start = time.perf_counter()
+    results = ParameterSweep(workers=workers, min_trades=min_trades).run(
+        candles,
+        candidates,
+        {x.figi: x.short_enabled_flag for x in strategies},
+        config.trading_settings.stop_signals_before_close
+    )
+    print(f"{sum(len(x) for x in candidates.values())} backtests in {time.perf_counter() - start:.1f} s")
+
+    with open(output, "w", encoding="utf-8") as file:
+        for strategy_settings in strategies:
+            figi_results = results[strategy_settings.figi]
+
+            if not figi_results or figi_results[0].trades_count < min_trades:
+                print(f"{strategy_settings.ticker}: no parameters with enough trades")
+                continue
+
+            sections = settings_sections(strategy_settings, figi_results[0])
+            print(sections)
+            file.write(sections + "\n")
+
+    print(f"Best settings have been written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parameter sweep of strategies from settings.ini")
+    parser.add_argument("--days", type=int, default=30, help="count of days of 1-minute candles")
+    parser.add_argument("--store", default="", help="path to local candle store (candles are kept between runs)")
+    parser.add_argument("--samples", type=int, default=0, help="random search: count of samples per figi "
+                                                                "(0 - full grid)")
+    parser.add_argument("--workers", type=int, default=0, help="count of processes (0 - all CPU cores)")
+    parser.add_argument("--min-trades", type=int, default=10, help="minimal count of trades for a result")
+    parser.add_argument("--output", default="optimized_settings.ini", help="file for the best settings")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    optimize(
+        ProgramConfiguration(CONFIG_FILE),
+        args.days,
+        args.store,
+        args.samples,
+        args.workers or None,
+        args.min_trades,
+        args.output
+    )
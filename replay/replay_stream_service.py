@@ -0,0 +1,204 @@
+import asyncio
+import datetime
+import heapq
+import logging
+import time
+from typing import AsyncGenerator, Iterable, Optional
+
+import numpy as np
+from tinkoff.invest import Candle, CandleInterval, HistoricCandle, SubscriptionInterval
+
+from invest_api.utils import fixed_to_quotation
+from storage.candle_store import CandleStore
+from storage.market_data_recorder import MarketDataRecordReader
+from trading.clock import SimulatedClock
+
+__all__ = ("ReplayStreamService")
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayStreamService:
+    """
+    Replay of recorded or stored 1-minute candles with the same contract as MarketDataStreamService:
+    start_async_candles_stream(figies, trade_before_time).
+    Every candle is sent twice like the real stream does: the first update at the candle open time
+    (open price only) and the complete candle at the end of the minute.
+    Recorded stream messages (MarketDataRecorder) are replayed as is, by their receive time.
+    Simulated clock is moved to the time of every update, so the trading cut-offs (signals_before_time,
+    trade_before_time) work as in a live session.
+
+    speed: 1 - real time, N - N times faster, 0 - as fast as possible.
+    At any speed the stream gives control to the event loop after every minute of the replay:
+    per figi workers process candles of the minute before the clock is moved forward.
+    """
+    # the complete candle is sent a bit before the next minute
+    __COMPLETE_CANDLE_DELAY = datetime.timedelta(seconds=59)
+
+    def __init__(
+            self,
+            candles: dict[str, list[HistoricCandle]],
+            clock: SimulatedClock,
+            speed: float = 0,
+            recorded_candles: Optional[dict[str, list[tuple[datetime.datetime, Candle]]]] = None
+    ) -> None:
+        self.__candles = candles
+        self.__recorded_candles = recorded_candles or dict()
+        self.__clock = clock
+        self.__speed = speed
+
+    @property
+    def clock(self) -> SimulatedClock:
+        return self.__clock
+
+    @staticmethod
+    def from_candle_store(
+            candle_store: CandleStore,
+            figies: Iterable[str],
+            from_time: datetime.datetime,
+            to_time: datetime.datetime,
+            clock: SimulatedClock,
+            speed: float = 0
+    ) -> "ReplayStreamService":
+        """
+        Replay of 1-minute candles from the local candle store in [from_time, to_time)
+        """
+        from_seconds, to_seconds = int(from_time.timestamp()), int(to_time.timestamp())
+        candles = dict()
+
+        for figi in figies:
+            stored = candle_store.read(figi, CandleInterval.CANDLE_INTERVAL_1_MIN)
+            indexes = np.flatnonzero((stored.time >= from_seconds) & (stored.time < to_seconds))
+
+            candles[figi] = [
+                HistoricCandle(
+                    open=fixed_to_quotation(int(open_)),
+                    high=fixed_to_quotation(int(high)),
+                    low=fixed_to_quotation(int(low)),
+                    close=fixed_to_quotation(int(close)),
+                    volume=int(volume),
+                    time=datetime.datetime.fromtimestamp(int(time_), tz=datetime.timezone.utc),
+                    is_complete=True
+                )
+                for time_, open_, high, low, close, volume in zip(
+                    stored.time[indexes], stored.open[indexes], stored.high[indexes],
+                    stored.low[indexes], stored.close[indexes], stored.volume[indexes]
+                )
+            ]
+
+        return ReplayStreamService(candles, clock, speed)
+
+    @staticmethod
+    def from_records(
+            reader: MarketDataRecordReader,
+            clock: SimulatedClock,
+            speed: float = 0
+    ) -> "ReplayStreamService":
+        """
+        Replay of candle messages recorded from the live market data stream
+        """
+        recorded_candles: dict[str, list[tuple[datetime.datetime, Candle]]] = dict()
+
+        for received_time, market_data in reader.records():
+            if market_data.candle:
+                recorded_candles.setdefault(market_data.candle.figi, []).append((received_time, market_data.candle))
+
+        return ReplayStreamService(dict(), clock, speed, recorded_candles)
+
+    async def start_async_candles_stream(
+            self,
+            figies: list[str],
+            trade_before_time: datetime
+    ) -> AsyncGenerator[Candle, None]:
+        """
+        The method replays candles of figies until trade_before_time (by the simulated clock)
+        """
+        logger.info(f"Start replay candles: {figies}, speed: {self.__speed or 'max'}")
+
+        replay_started = time.perf_counter()
+        first_update_time: Optional[datetime.datetime] = None
+        current_minute: Optional[datetime.datetime] = None
+        updates_count = 0
+
+        for update_time, candle in self.__updates(figies):
+            if update_time >= trade_before_time:
+                logger.debug(f"Time to stop replay candle stream")
+                break
+
+            if first_update_time is None:
+                first_update_time = update_time
+
+            if self.__speed > 0:
+                await self.__wait_until(replay_started, first_update_time, update_time)
+
+            minute = update_time.replace(second=0, microsecond=0)
+            if minute != current_minute:
+                # already sent candles are processed by workers before the clock moves to the next minute
+                await asyncio.sleep(0)
+                current_minute = minute
+
+            self.__clock.advance_to(update_time)
+            updates_count += 1
+
+            yield candle
+
+        self.__clock.advance_to(max(self.__clock.now(), trade_before_time))
+
+        logger.info(f"Replay has been completed: {updates_count} candle updates "
+                    f"in {time.perf_counter() - replay_started:.2f} s")
+
+    def __updates(self, figies: list[str]) -> Iterable[tuple[datetime.datetime, Candle]]:
+        """
+        All candle updates of figies sorted by time
+        """
+        return heapq.merge(
+            *(
+                self.__recorded_candles[figi] if figi in self.__recorded_candles
+                else self.__figi_updates(figi, self.__candles.get(figi, []))
+                for figi in figies
+            ),
+            key=lambda x: x[0]
+        )
+
+    def __figi_updates(
+            self,
+            figi: str,
+            candles: list[HistoricCandle]
+    ) -> Iterable[tuple[datetime.datetime, Candle]]:
+        for historic_candle in sorted(candles, key=lambda x: x.time):
+            yield historic_candle.time, Candle(
+                figi=figi,
+                interval=SubscriptionInterval.SUBSCRIPTION_INTERVAL_ONE_MINUTE,
+                open=historic_candle.open,
+                high=historic_candle.open,
+                low=historic_candle.open,
+                close=historic_candle.open,
+                volume=0,
+                time=historic_candle.time,
+                last_trade_ts=historic_candle.time
+            )
+
+            complete_time = historic_candle.time + self.__COMPLETE_CANDLE_DELAY
+            yield complete_time, Candle(
+                figi=figi,
+                interval=SubscriptionInterval.SUBSCRIPTION_INTERVAL_ONE_MINUTE,
+                open=historic_candle.open,
+                high=historic_candle.high,
+                low=historic_candle.low,
+                close=historic_candle.close,
+                volume=historic_candle.volume,
+                time=historic_candle.time,
+                last_trade_ts=complete_time
+            )
+
+    async def __wait_until(
+            self,
+            replay_started: float,
+            first_update_time: datetime.datetime,
+            update_time: datetime.datetime
+    ) -> None:
+        replay_elapsed = (update_time - first_update_time).total_seconds() / self.__speed
+        delay = replay_elapsed - (time.perf_counter() - replay_started)
+
+        if delay > 0:
+            await asyncio.sleep(delay)
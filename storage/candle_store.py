@@ -0,0 +1,175 @@
+import datetime
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from tinkoff.invest import CandleInterval, HistoricCandle
+
+from backtesting.candle_arrays import CandleArrays
+from invest_api.services.client_service import ClientService
+from invest_api.utils import quotation_to_fixed
+
+__all__ = ("CandleStore", "StoredCandles")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class StoredCandles:
+    """
+    Read-only memory-mapped columns of stored candles.
+    time - unix time in seconds, prices - fixed-point int64 (units * 10^9 + nano), volume - int64.
+    """
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __repr__(self) -> str:
+        return f"StoredCandles(len={len(self)})"
+
+    def to_candle_arrays(self) -> CandleArrays:
+        """
+        Zero-copy view for backtesting. Prices stay in fixed-point (all of them have the same scale).
+        """
+        return CandleArrays(
+            time=self.time,
+            open=self.open,
+            high=self.high,
+            low=self.low,
+            close=self.close,
+            volume=self.volume
+        )
+
+
+class CandleStore:
+    """
+    Local columnar store of historic candles: one directory per figi and interval, one file per column.
+    Columns are raw int64 arrays: appending is writing to the end of files, reading is memory mapping.
+    """
+    __COLUMNS = ("time", "open", "high", "low", "close", "volume")
+    __PRICE_COLUMNS = ("open", "high", "low", "close")
+
+    def __init__(self, root_path: str) -> None:
+        self.__root_path = root_path
+
+    def read(self, figi: str, interval: CandleInterval) -> StoredCandles:
+        """
+        Memory-map all stored candles. Nothing is read from disk until the arrays are used.
+        """
+        path = self.__repair(figi, interval)
+
+        return StoredCandles(**{column: self.__map_column(path, column) for column in self.__COLUMNS})
+
+    def last_time(self, figi: str, interval: CandleInterval) -> Optional[datetime.datetime]:
+        """
+        :return: Time of the latest stored candle or None if the store is empty for figi and interval
+        """
+        time_column = self.__map_column(self.__repair(figi, interval), "time")
+
+        if not len(time_column):
+            return None
+
+        return datetime.datetime.fromtimestamp(int(time_column[-1]), tz=datetime.timezone.utc)
+
+    def append(self, figi: str, interval: CandleInterval, candles: list[HistoricCandle]) -> int:
+        """
+        Append complete candles newer than the latest stored one.
+        :return: Count of appended candles
+        """
+        last_time = self.last_time(figi, interval)
+        candles = sorted(
+            (x for x in candles if x.is_complete and (not last_time or x.time > last_time)),
+            key=lambda x: x.time
+        )
+
+        if not candles:
+            return 0
+
+        columns = {
+            "time": np.fromiter((int(x.time.timestamp()) for x in candles), dtype=np.int64, count=len(candles)),
+            "volume": np.fromiter((x.volume for x in candles), dtype=np.int64, count=len(candles)),
+        }
+        for column in self.__PRICE_COLUMNS:
+            columns[column] = np.fromiter(
+                (quotation_to_fixed(getattr(x, column)) for x in candles), dtype=np.int64, count=len(candles)
+            )
+
+        path = self.__path(figi, interval)
+        # time column is the last one: interrupted append is detected and repaired by the time column length
+        for column in self.__COLUMNS[1:] + self.__COLUMNS[:1]:
+            with open(os.path.join(path, f"{column}.i8"), "ab") as file:
+                file.write(columns[column].tobytes())
+
+        logger.debug(f"Appended {len(candles)} candles {figi} {interval.name}")
+
+        return len(candles)
+
+    def update(
+            self,
+            client_service: ClientService,
+            figi: str,
+            interval: CandleInterval,
+            from_days: int
+    ) -> int:
+        """
+        Download only missing tail of candles (or from_days days for empty store) and append it.
+        :return: Count of appended candles
+        """
+        last_time = self.last_time(figi, interval)
+        from_ = last_time + datetime.timedelta(seconds=1) if last_time \
+            else datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(days=from_days)
+
+        return self.append(figi, interval, client_service.download_historic_candle_from(figi, from_, interval))
+
+    def __path(self, figi: str, interval: CandleInterval) -> str:
+        path = os.path.join(self.__root_path, figi, interval.name)
+        os.makedirs(path, exist_ok=True)
+
+        return path
+
+    def __repair(self, figi: str, interval: CandleInterval) -> str:
+        """
+        Columns can have different length after interrupted append. Truncate all of them to the shortest.
+        """
+        path = self.__path(figi, interval)
+        sizes = {column: self.__column_size(path, column) for column in self.__COLUMNS}
+        min_size = min(sizes.values())
+        # only whole values
+        min_size -= min_size % np.dtype(np.int64).itemsize
+
+        for column, size in sizes.items():
+            if size != min_size:
+                logger.info(f"Repair candle store column {path} {column}: {size} -> {min_size} bytes")
+                with open(os.path.join(path, f"{column}.i8"), "r+b") as file:
+                    file.truncate(min_size)
+
+        return path
+
+    @staticmethod
+    def __column_size(path: str, column: str) -> int:
+        file_name = os.path.join(path, f"{column}.i8")
+
+        if not os.path.exists(file_name):
+            # empty column is created to keep all columns in the same state
+            open(file_name, "ab").close()
+            return 0
+
+        return os.path.getsize(file_name)
+
+    @staticmethod
+    def __map_column(path: str, column: str) -> np.ndarray:
+        file_name = os.path.join(path, f"{column}.i8")
+
+        # numpy can't map empty file
+        if not os.path.exists(file_name) or os.path.getsize(file_name) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        return np.memmap(file_name, dtype=np.int64, mode="r")
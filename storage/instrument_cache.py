@@ -0,0 +1,86 @@
+import dataclasses
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from configuration.settings import ShareSettings
+
+__all__ = ("InstrumentCache")
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentCache:
+    """
+    Persistent cache of share settings by figi (JSON file) with TTL and ticker -> figi index.
+    Lot size, ticker and flags rarely change: morning preparations don't need requests for every share.
+    The file is written atomically (via rename) by save method.
+    """
+    def __init__(self, file_name: str, ttl_seconds: float = 259200) -> None:
+        self.__file_name = file_name
+        self.__ttl_seconds = ttl_seconds
+        # figi -> (unix time of update, share settings)
+        self.__shares: dict[str, tuple[float, ShareSettings]] = dict()
+        self.__figies_by_ticker: dict[str, str] = dict()
+        self.__changed = False
+
+        self.__load()
+
+    def get(self, figi: str) -> Optional[ShareSettings]:
+        """
+        :return: Share settings if they are not expired
+        """
+        item = self.__shares.get(figi)
+
+        if not item or time.time() - item[0] > self.__ttl_seconds:
+            return None
+
+        return item[1]
+
+    def figi_by_ticker(self, ticker: str) -> Optional[str]:
+        return self.__figies_by_ticker.get(ticker)
+
+    def update(self, figi: str, share_settings: ShareSettings) -> None:
+        self.__shares[figi] = (time.time(), share_settings)
+        self.__figies_by_ticker[share_settings.ticker] = figi
+        self.__changed = True
+
+    def save(self) -> None:
+        if not self.__changed:
+            return None
+
+        data = {
+            figi: {"updated": updated, "share": dataclasses.asdict(share_settings)}
+            for figi, (updated, share_settings) in self.__shares.items()
+        }
+
+        temp_file_name = self.__file_name + ".tmp"
+        with open(temp_file_name, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+
+        os.replace(temp_file_name, self.__file_name)
+        self.__changed = False
+
+        logger.debug(f"Instrument cache has been saved: {len(data)} shares")
+
+    def __load(self) -> None:
+        if not os.path.exists(self.__file_name):
+            return None
+
+        try:
+            with open(self.__file_name, "r", encoding="utf-8") as file:
+                data = json.load(file)
+
+            for figi, item in data.items():
+                share_settings = ShareSettings(**item["share"])
+                self.__shares[figi] = (float(item["updated"]), share_settings)
+                self.__figies_by_ticker[share_settings.ticker] = figi
+        except Exception as ex:
+            # the cache is filled again by requests
+            logger.error(f"Instrument cache load error: {repr(ex)}")
+            self.__shares.clear()
+            self.__figies_by_ticker.clear()
+
+        logger.info(f"Instrument cache has been loaded: {len(self.__shares)} shares")
@@ -0,0 +1,214 @@
+import datetime
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Iterator, Optional
+
+from tinkoff.invest import MarketDataResponse
+from tinkoff.invest.grpc import marketdata_pb2
+
+__all__ = ("MarketDataRecorder", "MarketDataRecordReader")
+
+logger = logging.getLogger(__name__)
+
+# Record: receive time (unix nanoseconds, int64), length of message (uint32), serialized MarketDataResponse
+_RECORD_HEADER = struct.Struct("<qI")
+
+_FILE_EXTENSION = ".mdr"
+
+
+def _protobuf_converters():
+    """
+    SDK dataclass <-> protobuf message converters. They are private helpers of the SDK (tinkoff.invest._grpc_helpers)
+    and can be moved or renamed by any SDK release: recording fails fast with a clear error then.
+    :return: (dataclass_to_protobuff, protobuf_to_dataclass)
+    """
+    try:
+        from tinkoff.invest._grpc_helpers import dataclass_to_protobuff, protobuf_to_dataclass
+    except ImportError as ex:
+        raise ImportError(
+            "Market data records need tinkoff.invest._grpc_helpers.dataclass_to_protobuff and protobuf_to_dataclass, "
+            "they aren't available in the installed tinkoff-investments. "
+            "Use a SDK version with them or turn recording off (MARKET_DATA_RECORD_PATH)."
+        ) from ex
+
+    return dataclass_to_protobuff, protobuf_to_dataclass
+
+
+class MarketDataRecorder:
+    """
+    Append-only recorder of raw market data stream messages.
+    One file per session and day: {root_path}/market_data_{YYYYMMDD}_{session}.mdr, a new file after midnight (UTC).
+    record() only puts a message to a queue. Serialization and writes are done by a background thread,
+    the event loop is never blocked by disk.
+    """
+    def __init__(self, root_path: str, flush_interval_seconds: float = 1.0) -> None:
+        self.__root_path = root_path
+        self.__flush_interval_seconds = flush_interval_seconds
+        self.__dataclass_to_protobuff, _ = _protobuf_converters()
+        self.__session = datetime.datetime.now(tz=datetime.timezone.utc).strftime("%H%M%S")
+
+        self.__queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.__thread: Optional[threading.Thread] = None
+        self.__file = None
+        self.__file_date: Optional[datetime.date] = None
+
+    def start(self) -> None:
+        if self.__thread:
+            return None
+
+        os.makedirs(self.__root_path, exist_ok=True)
+
+        self.__thread = threading.Thread(target=self.__writer, name="market-data-recorder", daemon=True)
+        self.__thread.start()
+
+        logger.info(f"Market data recorder has been started: {self.__root_path}")
+
+    def record(self, market_data: MarketDataResponse) -> None:
+        """
+        Put message to the recorder queue with receive time. Safe to call from the event loop.
+        """
+        if self.__thread:
+            self.__queue.put_nowait((time.time_ns(), market_data))
+
+    def close(self) -> None:
+        """
+        Write all queued messages and stop the background thread
+        """
+        if not self.__thread:
+            return None
+
+        self.__queue.put_nowait(None)
+        self.__thread.join()
+        self.__thread = None
+
+        logger.info("Market data recorder has been stopped")
+
+    def __writer(self) -> None:
+        last_flush = time.monotonic()
+
+        try:
+            while True:
+                try:
+                    item = self.__queue.get(timeout=self.__flush_interval_seconds)
+                except queue.Empty:
+                    item = ()
+
+                if item is None:
+                    break
+
+                if item:
+                    self.__write(*item)
+
+                if time.monotonic() - last_flush >= self.__flush_interval_seconds:
+                    self.__flush()
+                    last_flush = time.monotonic()
+        except Exception as ex:
+            logger.error(f"Market data recorder error. Messages aren't recorded anymore: {repr(ex)}")
+        finally:
+            self.__close_file()
+
+    def __write(self, received_ns: int, market_data: MarketDataResponse) -> None:
+        file = self.__current_file(received_ns)
+
+        message = self.__dataclass_to_protobuff(market_data, marketdata_pb2.MarketDataResponse()).SerializeToString()
+        file.write(_RECORD_HEADER.pack(received_ns, len(message)))
+        file.write(message)
+
+    def __current_file(self, received_ns: int):
+        date = datetime.datetime.fromtimestamp(received_ns / 1e9, tz=datetime.timezone.utc).date()
+
+        if date != self.__file_date:
+            self.__close_file()
+
+            path = os.path.join(
+                self.__root_path,
+                f"market_data_{date.strftime('%Y%m%d')}_{self.__session}{_FILE_EXTENSION}"
+            )
+            logger.info(f"Market data recorder file: {path}")
+
+            self.__file = open(path, "ab", buffering=1024 * 1024)
+            self.__file_date = date
+
+        return self.__file
+
+    def __flush(self) -> None:
+        if self.__file:
+            self.__file.flush()
+
+    def __close_file(self) -> None:
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+            self.__file_date = None
+
+
+class MarketDataRecordReader:
+    """
+    Sequential reader of files written by MarketDataRecorder.
+    Incomplete record at the end of a file (interrupted write) is ignored.
+    """
+    def __init__(self, paths: list[str]) -> None:
+        self.__paths = paths
+        _, self.__protobuf_to_dataclass = _protobuf_converters()
+
+    @staticmethod
+    def from_directory(
+            root_path: str,
+            from_date: Optional[datetime.date] = None,
+            to_date: Optional[datetime.date] = None
+    ) -> "MarketDataRecordReader":
+        """
+        All record files in the directory (in order of dates and sessions) for dates [from_date, to_date]
+        """
+        paths = []
+
+        for name in sorted(os.listdir(root_path)):
+            if not (name.startswith("market_data_") and name.endswith(_FILE_EXTENSION)):
+                continue
+
+            date = datetime.datetime.strptime(name.split("_")[2], "%Y%m%d").date()
+            if (from_date and date < from_date) or (to_date and date > to_date):
+                continue
+
+            paths.append(os.path.join(root_path, name))
+
+        return MarketDataRecordReader(paths)
+
+    def raw_records(self) -> Iterator[tuple[int, bytes]]:
+        """
+        Fast iteration without parsing: (receive time in unix nanoseconds, serialized message)
+        """
+        for path in self.__paths:
+            if not os.path.getsize(path):
+                continue
+
+            with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset, size = 0, len(data)
+
+                while offset + _RECORD_HEADER.size <= size:
+                    received_ns, length = _RECORD_HEADER.unpack_from(data, offset)
+                    offset += _RECORD_HEADER.size
+
+                    if offset + length > size:
+                        logger.warning(f"Incomplete record at the end of {path}")
+                        break
+
+                    yield received_ns, data[offset:offset + length]
+                    offset += length
+
+    def records(self) -> Iterator[tuple[datetime.datetime, MarketDataResponse]]:
+        """
+        (receive time, message) for every recorded message
+        """
+        message = marketdata_pb2.MarketDataResponse()
+
+        for received_ns, raw in self.raw_records():
+            message.ParseFromString(raw)
+
+            yield datetime.datetime.fromtimestamp(received_ns / 1e9, tz=datetime.timezone.utc), \
+                self.__protobuf_to_dataclass(message, MarketDataResponse)
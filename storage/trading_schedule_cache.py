@@ -0,0 +1,108 @@
+import datetime
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+__all__ = ("TradingScheduleCache")
+
+logger = logging.getLogger(__name__)
+
+
+class TradingScheduleCache:
+    """
+    Trading schedule of an exchange by date: (is trading day, start time, end time).
+    Days of several weeks are kept after one request, lookups are dict reads.
+    Dates out of the cached range aren't found: the range is requested again when the days are over.
+    The cache is persisted to JSON file (optional) and expires after ttl_seconds (schedules can be changed).
+    The TTL is several days, shorter than the cached range: one request serves several mornings.
+    """
+    def __init__(self, file_name: str = "", ttl_seconds: float = 259200) -> None:
+        self.__file_name = file_name
+        self.__ttl_seconds = ttl_seconds
+        # date -> (is trading day, start time, end time)
+        self.__days: dict[datetime.date, tuple[bool, datetime.datetime, datetime.datetime]] = dict()
+        self.__updated = 0.0
+
+        self.__load()
+
+    def day(self, date: datetime.date) -> Optional[tuple[bool, datetime.datetime, datetime.datetime]]:
+        """
+        :return: Schedule of the date or None if the date isn't cached or the cache is expired
+        """
+        if self.is_expired():
+            return None
+
+        return self.__days.get(date)
+
+    def next_session_start(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        """
+        :return: Start of the first trading session after the time or None if it isn't cached
+        """
+        if self.is_expired():
+            return None
+
+        for date in sorted(self.__days.keys()):
+            is_trading_day, start_time, _ = self.__days[date]
+            if is_trading_day and start_time > after:
+                return start_time
+
+        return None
+
+    def is_expired(self) -> bool:
+        return time.time() - self.__updated > self.__ttl_seconds
+
+    def update(self, days: list[tuple[datetime.date, bool, datetime.datetime, datetime.datetime]]) -> None:
+        """
+        Replace the schedule by fresh days
+        """
+        self.__days = {date: (is_trading_day, start_time, end_time)
+                       for date, is_trading_day, start_time, end_time in days}
+        self.__updated = time.time()
+
+        logger.info(f"Trading schedule has been cached: {len(self.__days)} days")
+
+        if self.__file_name:
+            try:
+                self.__save()
+            except Exception as ex:
+                logger.error(f"Trading schedule cache save error: {repr(ex)}")
+
+    def __save(self) -> None:
+        data = {
+            "updated": self.__updated,
+            "days": [[date.isoformat(), is_trading_day, start_time.isoformat(), end_time.isoformat()]
+                     for date, (is_trading_day, start_time, end_time) in self.__days.items()]
+        }
+
+        temp_file_name = self.__file_name + ".tmp"
+        with open(temp_file_name, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+        os.replace(temp_file_name, self.__file_name)
+
+    def __load(self) -> None:
+        if not self.__file_name or not os.path.exists(self.__file_name):
+            return None
+
+        try:
+            with open(self.__file_name, "r", encoding="utf-8") as file:
+                data = json.load(file)
+
+            self.__days = {
+                datetime.date.fromisoformat(date): (
+                    bool(is_trading_day),
+                    datetime.datetime.fromisoformat(start_time),
+                    datetime.datetime.fromisoformat(end_time)
+                )
+                for date, is_trading_day, start_time, end_time in data["days"]
+            }
+            self.__updated = float(data["updated"])
+        except Exception as ex:
+            # the schedule is requested again
+            logger.error(f"Trading schedule cache load error: {repr(ex)}")
+            self.__days.clear()
+            self.__updated = 0.0
+
+        logger.info(f"Trading schedule cache has been loaded: {len(self.__days)} days")
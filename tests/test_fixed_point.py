@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("tinkoff.invest")
+
+from tinkoff.invest import Quotation
+
+from invest_api.utils import NANOS_IN_UNIT, fixed_round_to_step, fixed_to_quotation, quotation_to_fixed
+
+
+@pytest.mark.parametrize(
+    "fixed, units, nano",
+    [
+        (0, 0, 0),
+        (1_500_000_000, 1, 500_000_000),
+        (-1_500_000_000, -1, -500_000_000),
+        (-1, 0, -1),
+        (-NANOS_IN_UNIT, -1, 0),
+        (-123 * NANOS_IN_UNIT - 450_000_000, -123, -450_000_000),
+    ]
+)
+def test_fixed_to_quotation(fixed, units, nano):
+    quotation = fixed_to_quotation(fixed)
+
+    # units and nano have the same sign in the api
+    assert (quotation.units, quotation.nano) == (units, nano)
+    assert quotation_to_fixed(quotation) == fixed
+
+
+def test_quotation_to_fixed_negative():
+    assert quotation_to_fixed(Quotation(units=-2, nano=-10_000_000)) == -2_010_000_000
+
+
+@pytest.mark.parametrize(
+    "fixed, step, expected",
+    [
+        (1234, 10, 1230),
+        (1236, 10, 1240),
+        (1235, 10, 1240),
+        (-1234, 10, -1230),
+        (-1236, 10, -1240),
+        # ties are rounded up (towards the greater price) for both signs
+        (-1235, 10, -1230),
+        (1237, 5, 1235),
+        (1238, 5, 1240),
+        (-1238, 5, -1240),
+        (1234, 0, 1234),
+        (-1234, -10, -1234),
+    ]
+)
+def test_fixed_round_to_step(fixed, step, expected):
+    assert fixed_round_to_step(fixed, step) == expected
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("grpc")
+pytest.importorskip("tinkoff.invest")
+
+from grpc import StatusCode
+
+from invest_api import retry_policy
+from invest_api.retry_policy import RetryPolicy
+
+
+class FakeRequestError(Exception):
+    def __init__(self, code: StatusCode, ratelimit_reset=None) -> None:
+        super().__init__(code)
+        self.code = code
+        self.metadata = SimpleNamespace(ratelimit_reset=ratelimit_reset)
+
+
+@pytest.fixture(autouse=True)
+def max_jitter(monkeypatch):
+    # backoff is the upper bound of the jitter range
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda a, b: b)
+
+
+@pytest.mark.parametrize("code", [StatusCode.UNAVAILABLE, StatusCode.DEADLINE_EXCEEDED, StatusCode.INTERNAL])
+def test_retryable_codes_are_retried(code):
+    assert RetryPolicy().delay(1, FakeRequestError(code)) == pytest.approx(0.2)
+
+
+@pytest.mark.parametrize(
+    "code",
+    [StatusCode.INVALID_ARGUMENT, StatusCode.NOT_FOUND, StatusCode.PERMISSION_DENIED, StatusCode.UNAUTHENTICATED]
+)
+def test_not_retryable_codes_are_not_retried(code):
+    assert RetryPolicy().delay(1, FakeRequestError(code)) is None
+
+
+def test_exceptions_without_code_are_not_retried():
+    assert RetryPolicy().delay(1, ValueError()) is None
+
+
+def test_backoff_grows_exponentially_up_to_max_delay():
+    policy = RetryPolicy(retry_count=0, base_delay_seconds=0.5, max_delay_seconds=3.0)
+    error = FakeRequestError(StatusCode.UNAVAILABLE)
+
+    assert [policy.delay(x, error) for x in range(1, 6)] == pytest.approx([0.5, 1.0, 2.0, 3.0, 3.0])
+
+
+def test_retry_count_limits_attempts():
+    error = FakeRequestError(StatusCode.UNAVAILABLE)
+
+    assert RetryPolicy(retry_count=3).delay(2, error) is not None
+    assert RetryPolicy(retry_count=3).delay(3, error) is None
+    assert RetryPolicy(retry_count=0).delay(100, error) is not None
+
+
+def test_not_idempotent_calls_are_retried_only_for_resource_exhausted():
+    policy = RetryPolicy()
+
+    assert policy.delay(1, FakeRequestError(StatusCode.UNAVAILABLE), idempotent=False) is None
+    assert policy.delay(1, FakeRequestError(StatusCode.DEADLINE_EXCEEDED), idempotent=False) is None
+    assert policy.delay(1, FakeRequestError(StatusCode.RESOURCE_EXHAUSTED), idempotent=False) == pytest.approx(0.2)
+
+
+def test_resource_exhausted_waits_for_ratelimit_reset():
+    policy = RetryPolicy()
+
+    assert policy.delay(1, FakeRequestError(StatusCode.RESOURCE_EXHAUSTED, "3")) == pytest.approx(3.2)
+    assert policy.delay(1, FakeRequestError(StatusCode.RESOURCE_EXHAUSTED, "bad")) == pytest.approx(0.2)
+    assert policy.delay(1, FakeRequestError(StatusCode.RESOURCE_EXHAUSTED, None)) == pytest.approx(0.2)
@@ -0,0 +1,120 @@
+import pytest
+
+pytest.importorskip("grpc")
+
+from invest_api import unary_rate_limiter
+from invest_api.unary_rate_limiter import UnaryRateLimiter, _TokenBucket
+from metrics.latency_metrics import LatencyHistograms, disable_metrics, enable_metrics
+
+ORDER_METHOD = "tinkoff.public.invest.api.contract.v1.OrdersService/PostOrder"
+STATE_METHOD = "tinkoff.public.invest.api.contract.v1.OrdersService/GetOrderState"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(unary_rate_limiter.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+def test_bucket_sizes(clock):
+    # 120 per minute: 24 tokens of burst, 96 tokens of refill per minute, 4.8 tokens of reserve
+    bucket = _TokenBucket("orders", 120, 0.2, 0.2)
+
+    assert bucket.capacity == 24
+    assert bucket.rate == pytest.approx(1.6)
+    assert bucket.reserve == pytest.approx(4.8)
+    assert bucket.tokens == 24
+
+
+def test_bucket_refill_is_limited_by_capacity(clock):
+    bucket = _TokenBucket("orders", 120, 0.2, 0.2)
+    for _ in range(10):
+        assert bucket.take(is_priority=True) == 0
+
+    clock.now += 2.5
+    assert bucket.refill() == pytest.approx(18)
+
+    clock.now += 3600
+    assert bucket.refill() == 24
+
+
+def test_bucket_reserve_is_taken_only_by_priority(clock):
+    bucket = _TokenBucket("orders", 120, 0.2, 0.2)
+
+    normal_taken = 0
+    while bucket.take(is_priority=False) == 0:
+        normal_taken += 1
+
+    assert normal_taken == 19
+    assert bucket.tokens == pytest.approx(5)
+    # (reserve + 1 - tokens) / rate
+    assert bucket.take(is_priority=False) == pytest.approx(0.5)
+
+    for _ in range(5):
+        assert bucket.take(is_priority=True) == 0
+
+    assert bucket.take(is_priority=True) == pytest.approx(1 / 1.6)
+
+
+def test_bucket_priority_waiters_block_normal_requests(clock):
+    bucket = _TokenBucket("orders", 120, 0.2, 0.2)
+    bucket.priority_waiters = 1
+
+    assert bucket.take(is_priority=False) > 0
+    assert bucket.take(is_priority=True) == 0
+
+    bucket.priority_waiters = 0
+    assert bucket.take(is_priority=False) == 0
+
+
+def test_limiter_registers_priority_waiter_until_token_is_taken(clock, monkeypatch):
+    limiter = UnaryRateLimiter(burst_fraction=0.2, reserve_fraction=0.2)
+    limiter.update_limits([(60, [ORDER_METHOD, STATE_METHOD])])
+    bucket = limiter._UnaryRateLimiter__buckets[ORDER_METHOD]
+    bucket.tokens = 0
+
+    waiters = []
+
+    def sleep(seconds: float) -> None:
+        waiters.append(bucket.priority_waiters)
+        clock.now += seconds
+
+    monkeypatch.setattr(unary_rate_limiter.time, "sleep", sleep)
+    limiter.acquire(ORDER_METHOD)
+
+    assert waiters and all(x == 1 for x in waiters)
+    assert bucket.priority_waiters == 0
+
+
+def test_limiter_skips_methods_without_limits(clock, monkeypatch):
+    limiter = UnaryRateLimiter()
+    limiter.update_limits([(60, [STATE_METHOD])])
+    monkeypatch.setattr(unary_rate_limiter.time, "sleep", lambda _: pytest.fail("unlimited method has waited"))
+
+    for _ in range(1000):
+        limiter.acquire("/tinkoff.public.invest.api.contract.v1.UsersService/GetInfo")
+
+
+def test_headroom_gauge_is_refilled_when_rendered(clock):
+    registry = enable_metrics(LatencyHistograms())
+    try:
+        limiter = UnaryRateLimiter(burst_fraction=0.2, reserve_fraction=0.2)
+        limiter.update_limits([(120, [ORDER_METHOD])])
+
+        for _ in range(10):
+            limiter.acquire(ORDER_METHOD)
+        assert 'invest_bot_rate_limit_headroom{group="OrdersService"} 14\n' in registry.render_prometheus()
+
+        clock.now += 5
+        assert 'invest_bot_rate_limit_headroom{group="OrdersService"} 22\n' in registry.render_prometheus()
+    finally:
+        disable_metrics()
@@ -1,7 +1,8 @@
 import enum
 import logging
-from dataclasses import dataclass, field
-from decimal import Decimal
+from dataclasses import dataclass
+
+from invest_api.utils import FixedPrice
 
 __all__ = ("Signal", "SignalType")
 
@@ -19,5 +20,6 @@ class SignalType(enum.IntEnum):
 class Signal:
     figi: str = ""
     signal_type: SignalType = 0
-    take_profit_level: Decimal = field(default_factory=Decimal)
-    stop_loss_level: Decimal = field(default_factory=Decimal)
+    # levels are fixed-point nanos (see invest_api.utils.FixedPrice)
+    take_profit_level: FixedPrice = 0
+    stop_loss_level: FixedPrice = 0
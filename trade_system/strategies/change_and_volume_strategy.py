@@ -3,9 +3,10 @@ from decimal import Decimal
 from typing import Optional
 
 from tinkoff.invest import HistoricCandle
-from tinkoff.invest.utils import quotation_to_decimal
 
 from configuration.settings import StrategySettings
+from invest_api.utils import FixedPrice, NANOS_IN_UNIT, decimal_to_fixed, fixed_multiply, fixed_to_decimal, \
+    quotation_to_fixed
 from trade_system.signal import Signal, SignalType
 from trade_system.strategies.base_strategy import IStrategy
 
@@ -34,15 +35,24 @@ class ChangeAndVolumeStrategy(IStrategy):
 
         self.__signal_volume = int(settings.settings[self.__SIGNAL_VOLUME_NAME])
         self.__signal_min_candles = int(settings.settings[self.__SIGNAL_MIN_CANDLES_NAME])
-        self.__signal_min_tail = Decimal(settings.settings[self.__SIGNAL_MIN_TAIL_NAME])
+        # Settings are kept as fixed-point nanos: candle checks and levels use only integer arithmetic
+        self.__signal_min_tail = decimal_to_fixed(Decimal(settings.settings[self.__SIGNAL_MIN_TAIL_NAME]))
 
-        self.__long_take = Decimal(settings.settings[self.__LONG_TAKE_NAME])
-        self.__long_stop = Decimal(settings.settings[self.__LONG_STOP_NAME])
+        self.__long_take = decimal_to_fixed(Decimal(settings.settings[self.__LONG_TAKE_NAME]))
+        self.__long_stop = decimal_to_fixed(Decimal(settings.settings[self.__LONG_STOP_NAME]))
 
-        self.__short_take = Decimal(settings.settings[self.__SHORT_TAKE_NAME])
-        self.__short_stop = Decimal(settings.settings[self.__SHORT_STOP_NAME])
+        self.__short_take = decimal_to_fixed(Decimal(settings.settings[self.__SHORT_TAKE_NAME]))
+        self.__short_stop = decimal_to_fixed(Decimal(settings.settings[self.__SHORT_STOP_NAME]))
 
-        self.__recent_candles = []
+        # Ring buffer of recent candles. Candle values are converted and checked once on insert.
+        self.__window_capacity = max(1, self.__signal_min_candles)
+        self.__window_is_long = [False] * self.__window_capacity
+        self.__window_is_short = [False] * self.__window_capacity
+        self.__window_close = [0] * self.__window_capacity
+        self.__window_position = 0
+        self.__window_size = 0
+        self.__window_long_count = 0
+        self.__window_short_count = 0
 
     @property
     def settings(self) -> StrategySettings:
@@ -58,8 +68,8 @@ class ChangeAndVolumeStrategy(IStrategy):
         """
         The method analyzes candles and returns his decision.
         """
-        logger.debug(f"Start analyze candles for {self.settings.figi} strategy {__name__}. "
-                     f"Candles count: {len(candles)}")
+        logger.debug("Start analyze candles for %s strategy %s. Candles count: %s",
+                     self.settings.figi, __name__, len(candles))
 
         if not self.__update_recent_candles(candles):
             return None
@@ -75,84 +85,76 @@ class ChangeAndVolumeStrategy(IStrategy):
         return None
 
     def __update_recent_candles(self, candles: list[HistoricCandle]) -> bool:
-        self.__recent_candles.extend(candles)
+        for candle in candles:
+            self.__push_candle(candle)
 
-        if len(self.__recent_candles) < self.__signal_min_candles:
+        if self.__window_size < self.__signal_min_candles:
             logger.debug(f"Candles in cache are low than required")
             return False
 
-        sorted(self.__recent_candles, key=lambda x: x.time)
-
-        # keep only __signal_min_candles candles in cache
-        if len(self.__recent_candles) > self.__signal_min_candles:
-            self.__recent_candles = self.__recent_candles[len(self.__recent_candles) - self.__signal_min_candles:]
-
         return True
 
-    def __is_match_long(self) -> bool:
+    def __push_candle(self, candle: HistoricCandle) -> None:
         """
-        Check for LONG signal. All candles in cache:
-        Green candle, tail lower than __signal_min_tail, volume more that __signal_volume
+        Put candle to the ring buffer instead of the oldest one. Signal conditions are checked here once.
+        LONG: Green candle, tail lower than __signal_min_tail, volume more that __signal_volume
+        SHORT: Red candle, tail lower than __signal_min_tail, volume more that __signal_volume
         """
-        for candle in self.__recent_candles:
-            logger.debug(f"Recent Candle to analyze {self.settings.figi} LONG: {candle}")
-            open_, high, close, low = quotation_to_decimal(candle.open), quotation_to_decimal(candle.high), \
-                                      quotation_to_decimal(candle.close), quotation_to_decimal(candle.low)
-
-            if open_ < close \
-                    and ((high - close) / (high - low)) <= self.__signal_min_tail \
-                    and candle.volume >= self.__signal_volume:
-                logger.debug(f"Continue analyze {self.settings.figi}")
-                continue
-
-            logger.debug(f"Break analyze {self.settings.figi}")
-            break
+        open_, high, close, low = quotation_to_fixed(candle.open), quotation_to_fixed(candle.high), \
+                                  quotation_to_fixed(candle.close), quotation_to_fixed(candle.low)
+        is_volume = candle.volume >= self.__signal_volume
+
+        # (high - close) / (high - low) <= tail: green or red candle always has high > low
+        is_long = is_volume and open_ < close \
+            and (high - close) * NANOS_IN_UNIT <= self.__signal_min_tail * (high - low)
+        is_short = is_volume and open_ > close \
+            and (close - low) * NANOS_IN_UNIT <= self.__signal_min_tail * (high - low)
+
+        position = self.__window_position
+        if self.__window_size == self.__window_capacity:
+            self.__window_long_count -= self.__window_is_long[position]
+            self.__window_short_count -= self.__window_is_short[position]
         else:
-            logger.debug(f"Signal detected {self.settings.figi}")
-            return True
+            self.__window_size += 1
 
-        return False
+        self.__window_is_long[position] = is_long
+        self.__window_is_short[position] = is_short
+        self.__window_close[position] = close
+        self.__window_long_count += is_long
+        self.__window_short_count += is_short
 
-    def __is_match_short(self) -> bool:
+        self.__window_position = (position + 1) % self.__window_capacity
+
+    def __is_match_long(self) -> bool:
         """
-        Check for LONG signal. All candles in cache:
-        Red candle, tail lower than __signal_min_tail, volume more that __signal_volume
+        Check for LONG signal: all candles in cache are matched
         """
-        for candle in self.__recent_candles:
-            logger.debug(f"Recent Candle to analyze {self.settings.figi} SHORT: {candle}")
-            open_, high, close, low = quotation_to_decimal(candle.open), quotation_to_decimal(candle.high), \
-                                      quotation_to_decimal(candle.close), quotation_to_decimal(candle.low)
-
-            if open_ > close \
-                    and ((close - low) / (high - low)) <= self.__signal_min_tail \
-                    and candle.volume >= self.__signal_volume:
-                logger.debug(f"Continue analyze {self.settings.figi}")
-                continue
-
-            logger.debug(f"Break analyze {self.settings.figi}")
-            break
-        else:
-            logger.debug(f"Signal detected {self.settings.figi}")
-            return True
+        return self.__window_long_count == self.__window_size
 
-        return False
+    def __is_match_short(self) -> bool:
+        """
+        Check for SHORT signal: all candles in cache are matched
+        """
+        return self.__window_short_count == self.__window_size
 
     def __make_signal(
             self,
             signal_type: SignalType,
-            profit_multy: Decimal,
-            stop_multy: Decimal
+            profit_multy: FixedPrice,
+            stop_multy: FixedPrice
     ) -> Signal:
         # take and stop based on configuration by close price level (close for last price)
-        last_candle = self.__recent_candles[len(self.__recent_candles) - 1]
+        last_close = self.__window_close[self.__window_position - 1]
 
         signal = Signal(
             figi=self.settings.figi,
             signal_type=signal_type,
-            take_profit_level=quotation_to_decimal(last_candle.close) * profit_multy,
-            stop_loss_level=quotation_to_decimal(last_candle.close) * stop_multy
+            take_profit_level=fixed_multiply(last_close, profit_multy),
+            stop_loss_level=fixed_multiply(last_close, stop_multy)
         )
 
-        logger.info(f"Make Signal: {signal}")
+        logger.info(f"Make Signal: {signal.figi} {signal.signal_type.name}, "
+                    f"take profit {fixed_to_decimal(signal.take_profit_level)}, "
+                    f"stop loss {fixed_to_decimal(signal.stop_loss_level)}")
 
         return signal
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from tinkoff.invest import PositionsResponse, PositionData, PostOrderResponse, OrderDirection
+
+from invest_api.services.market_data_service import MarketDataService
+from invest_api.services.operations_service import OperationService
+from invest_api.services.operations_stream_service import OperationsStreamService
+from invest_api.utils import FixedPrice, fixed_to_decimal, moneyvalue_to_fixed, quotation_to_fixed, \
+    rub_currency_name
+
+__all__ = ("AccountLedger")
+
+logger = logging.getLogger(__name__)
+
+
+class AccountLedger:
+    """
+    In-memory state of an account: available RUB and securities balances.
+    The state is taken by one snapshot (get_positions) and then kept up to date by positions stream
+    and order fills. Reads don't make any api requests.
+    """
+    def __init__(
+            self,
+            account_id: str,
+            operation_service: OperationService,
+            operations_stream_service: OperationsStreamService,
+            market_data_service: MarketDataService
+    ) -> None:
+        self.__account_id = account_id
+        self.__operation_service = operation_service
+        self.__operations_stream_service = operations_stream_service
+        self.__market_data_service = market_data_service
+
+        # money and prices are fixed-point nanos
+        self.__rub: FixedPrice = 0
+        # figi: (balance, blocked)
+        self.__securities: dict[str, tuple[int, int]] = dict()
+        self.__last_prices: dict[str, FixedPrice] = dict()
+        # Short positions reduce available money. Sum is kept incrementally: figi -> short money
+        self.__short_money: dict[str, FixedPrice] = dict()
+        self.__short_money_total: FixedPrice = 0
+        # monotonic time of the latest snapshot and the latest updates from the stream (rub and every figi)
+        self.__snapshot_at = 0.0
+        self.__rub_updated_at = 0.0
+        self.__stream_updated_at: dict[str, float] = dict()
+
+        self.__stream_task: Optional[asyncio.Task] = None
+
+    @property
+    def available_rub(self) -> FixedPrice:
+        """
+        Available amount of rub on account (the same logic as OperationService.available_rub_on_account)
+        """
+        return self.__rub + self.__short_money_total
+
+    def position(self, figi: str) -> int:
+        """
+        :return: Balance (count of shares) of figi on account
+        """
+        return self.__securities.get(figi, (0, 0))[0]
+
+    async def start(self) -> None:
+        """
+        Take the snapshot and start listening positions stream
+        """
+        await self.__snapshot()
+
+        self.__stream_task = asyncio.create_task(self.__positions_stream_worker())
+
+    async def refresh(self) -> None:
+        """
+        Take a new snapshot (the stream can be late)
+        """
+        await self.__snapshot()
+
+    async def stop(self) -> None:
+        if self.__stream_task:
+            self.__stream_task.cancel()
+
+            try:
+                await self.__stream_task
+            except asyncio.CancelledError:
+                pass
+
+            self.__stream_task = None
+
+    def update_last_price(self, figi: str, price: FixedPrice) -> None:
+        self.__last_prices[figi] = price
+
+        if self.position(figi) < 0:
+            self.__update_short_money(figi)
+
+    def apply_order_fill(
+            self,
+            order: PostOrderResponse,
+            lot_size: int,
+            posted_at: float
+    ) -> None:
+        """
+        Apply executed order to the ledger without waiting for positions stream.
+        Money and securities parts are skipped separately if the stream has already delivered their newer state
+        (the stream sends money and securities in different messages, rub is an absolute value).
+        :param posted_at: monotonic time before the order has been posted
+        """
+        is_security_updated = max(self.__snapshot_at, self.__stream_updated_at.get(order.figi, 0)) >= posted_at
+        is_rub_updated = max(self.__snapshot_at, self.__rub_updated_at) >= posted_at
+
+        if is_security_updated and is_rub_updated:
+            logger.debug(f"Order fill is already in ledger: {order.order_id}")
+            return None
+
+        shares = order.lots_executed * lot_size
+        amount = moneyvalue_to_fixed(order.executed_order_price) * shares
+        is_buy = order.direction == OrderDirection.ORDER_DIRECTION_BUY
+
+        if not is_rub_updated:
+            self.__rub += -amount if is_buy else amount
+            self.__rub -= moneyvalue_to_fixed(order.executed_commission)
+
+        if not is_security_updated:
+            balance, blocked = self.__securities.get(order.figi, (0, 0))
+            self.__update_security(order.figi, balance + shares if is_buy else balance - shares, blocked)
+
+        logger.debug(f"Ledger after order fill {order.figi}: balance {self.position(order.figi)}, "
+                     f"rub {fixed_to_decimal(self.available_rub)}")
+
+    def apply_position_data(self, position_data: PositionData) -> None:
+        """
+        Apply changes from positions stream
+        """
+        updated_at = time.monotonic()
+
+        for money in position_data.money:
+            if money.available_value.currency == rub_currency_name():
+                self.__rub = moneyvalue_to_fixed(money.available_value)
+                self.__rub_updated_at = updated_at
+
+        for security in position_data.securities:
+            self.__stream_updated_at[security.figi] = updated_at
+            self.__update_security(security.figi, security.balance, security.blocked)
+
+        logger.debug(f"Ledger after positions stream: rub {fixed_to_decimal(self.available_rub)}, "
+                     f"securities {self.__securities}")
+
+    async def __snapshot(self) -> None:
+        snapshot_at = time.monotonic()
+        positions = await self.__operation_service.positions_async(self.__account_id)
+        self.__snapshot_at = snapshot_at
+        await self.__apply_positions(positions)
+
+        logger.info(f"Ledger snapshot: rub {fixed_to_decimal(self.available_rub)}, "
+                    f"securities {self.__securities}")
+
+    async def __apply_positions(self, positions: PositionsResponse) -> None:
+        if positions:
+            # prices are requested before the state is changed: readers never see half-applied snapshot
+            last_prices = await self.__market_data_service.get_last_prices_async(
+                [security.figi for security in positions.securities
+                 if security.balance < 0 and security.figi not in self.__last_prices]
+            )
+            for figi, last_price in last_prices.items():
+                self.__last_prices[figi] = quotation_to_fixed(last_price)
+
+        self.__rub = 0
+        self.__securities.clear()
+        self.__short_money.clear()
+        self.__short_money_total = 0
+
+        if not positions:
+            return None
+
+        for money in positions.money:
+            if money.currency == rub_currency_name():
+                self.__rub = moneyvalue_to_fixed(money)
+
+        for security in positions.securities:
+            self.__update_security(security.figi, security.balance, security.blocked)
+
+    def __update_security(self, figi: str, balance: int, blocked: int) -> None:
+        self.__securities[figi] = (balance, blocked)
+        self.__update_short_money(figi)
+
+    def __update_short_money(self, figi: str) -> None:
+        balance, blocked = self.__securities.get(figi, (0, 0))
+        last_price = self.__last_prices.get(figi)
+
+        short_money = last_price * balance * 2 if blocked == 0 and balance < 0 and last_price else 0
+
+        self.__short_money_total += short_money - self.__short_money.pop(figi, 0)
+        if short_money:
+            self.__short_money[figi] = short_money
+
+    async def __positions_stream_worker(self) -> None:
+        try:
+            async for positions in self.__operations_stream_service.start_async_positions_stream(self.__account_id):
+                if positions.subscriptions:
+                    # changes could be lost while the stream has been reconnecting
+                    await self.__snapshot()
+
+                if positions.position:
+                    self.apply_position_data(positions.position)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            logger.error(f"Positions stream error. Ledger isn't updated by stream anymore: {repr(ex)}")
@@ -0,0 +1,32 @@
+import datetime
+import logging
+
+__all__ = ("Clock", "SimulatedClock")
+
+logger = logging.getLogger(__name__)
+
+
+class Clock:
+    """
+    Source of current time for trading logic (UTC, timezone aware)
+    """
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+
+
+class SimulatedClock(Clock):
+    """
+    Clock for replay: time is moved forward by replay stream, not by wall clock
+    """
+    def __init__(self, start_time: datetime.datetime) -> None:
+        self.__now = start_time
+
+    def now(self) -> datetime.datetime:
+        return self.__now
+
+    def advance_to(self, time: datetime.datetime) -> None:
+        """
+        Move time forward. The clock never goes back.
+        """
+        if time > self.__now:
+            self.__now = time
@@ -0,0 +1,208 @@
+import datetime
+import logging
+from typing import Awaitable, Callable, Optional
+
+from tinkoff.invest import StopOrderType
+
+from invest_api.services.stop_orders_service import StopOrderService
+from invest_api.utils import FixedPrice, fixed_round_to_step, fixed_to_quotation
+
+__all__ = ("ExitOrders")
+
+logger = logging.getLogger(__name__)
+
+# Checks of a missing order while the position is still open before the order is considered gone without execution
+# (the positions stream can be a bit late after execution)
+MAX_UNCONFIRMED_CHECKS = 3
+
+
+class ExitOrders:
+    """
+    Take profit and stop loss of open positions as exchange stop orders (one pair per figi).
+    They are executed by the exchange without waiting for candles and even if the bot is disconnected.
+    Execution is found by absence of the order in active stop orders and the closed position,
+    the sibling order is cancelled then.
+    An order can be absent without execution (expired, rejected at activation or cancelled outside of the bot):
+    the orders are forgotten then and the position stays open (levels have to be checked by candles).
+    """
+    def __init__(
+            self,
+            account_id: str,
+            stop_order_service: StopOrderService,
+            position: Callable[[str], int],
+            refresh_positions: Callable[[], Awaitable[None]]
+    ) -> None:
+        """
+        :param position: Balance of figi on account (count of shares), for example AccountLedger.position
+        :param refresh_positions: Request actual positions from the exchange, for example AccountLedger.refresh
+        """
+        self.__account_id = account_id
+        self.__stop_order_service = stop_order_service
+        self.__position = position
+        self.__refresh_positions = refresh_positions
+        # figi -> (take profit stop order id, stop loss stop order id) or gone orders with unconfirmed execution
+        self.__orders: dict[str, tuple[str, ...]] = dict()
+        # figi -> checks with a missing order and the open position in a row
+        self.__unconfirmed_checks: dict[str, int] = dict()
+
+    def is_placed(self, figi: str) -> bool:
+        return figi in self.__orders
+
+    def clear(self) -> None:
+        """
+        Forget all orders (for example, they have been cancelled by cancel all orders)
+        """
+        self.__orders.clear()
+        self.__unconfirmed_checks.clear()
+
+    async def place(
+            self,
+            figi: str,
+            count_lots: int,
+            is_long: bool,
+            take_profit_level: FixedPrice,
+            stop_loss_level: FixedPrice,
+            price_increment: FixedPrice,
+            expire_date: datetime
+    ) -> bool:
+        """
+        Post take profit and stop loss for the open position.
+        :return: False if orders haven't been placed (levels have to be checked by candles)
+        """
+        take_profit_id = await self.__post(
+            figi, count_lots, is_long, fixed_round_to_step(take_profit_level, price_increment),
+            StopOrderType.STOP_ORDER_TYPE_TAKE_PROFIT, expire_date
+        )
+        if not take_profit_id:
+            return False
+
+        stop_loss_id = await self.__post(
+            figi, count_lots, is_long, fixed_round_to_step(stop_loss_level, price_increment),
+            StopOrderType.STOP_ORDER_TYPE_STOP_LOSS, expire_date
+        )
+        if not stop_loss_id:
+            await self.__cancel(take_profit_id)
+            return False
+
+        self.__orders[figi] = (take_profit_id, stop_loss_id)
+        logger.info(f"Exit orders have been placed for {figi}: {self.__orders[figi]}")
+
+        return True
+
+    async def cancel(self, figi: str) -> tuple[bool, Optional[str]]:
+        """
+        Cancel exit orders of figi before the bot closes the position itself.
+        If an order has gone while the position is open, positions are requested from the exchange
+        (the positions stream can be late after execution).
+        :return: (the bot can close the position, id of executed stop order if the exchange has closed the position).
+        The bot can't close the position if execution of a gone order isn't confirmed: the order is kept for
+        the next checks by executed().
+        """
+        order_ids = self.__orders.pop(figi, None)
+        self.__unconfirmed_checks.pop(figi, None)
+        if not order_ids:
+            return True, None
+
+        try:
+            active_ids = await self.__active_ids()
+        except Exception:
+            # orders are still on the exchange
+            self.__orders.setdefault(figi, order_ids)
+            raise
+
+        for order_id in order_ids:
+            if order_id in active_ids:
+                await self.__cancel(order_id)
+
+        gone_ids = tuple(x for x in order_ids if x not in active_ids)
+        if not gone_ids:
+            return True, None
+
+        if self.__position(figi) != 0:
+            try:
+                await self.__refresh_positions()
+            except Exception as ex:
+                logger.error(f"Refresh positions error: {repr(ex)}")
+
+        if self.__position(figi) == 0:
+            return True, gone_ids[0]
+
+        logger.warning(f"Exit order has gone but its execution isn't confirmed for {figi}: {gone_ids}")
+        self.__orders[figi] = gone_ids
+
+        return False, None
+
+    async def executed(self) -> dict[str, str]:
+        """
+        Exit orders executed by the exchange since the last call. Sibling orders are cancelled.
+        Orders gone without execution are forgotten (their siblings are cancelled too).
+        :return: figi -> executed stop order id
+        """
+        if not self.__orders:
+            return dict()
+
+        tracked_orders = dict(self.__orders)
+        active_ids = await self.__active_ids()
+        result: dict[str, str] = dict()
+
+        for figi, order_ids in tracked_orders.items():
+            # cancelled by the bot during the request
+            if self.__orders.get(figi) is not order_ids:
+                continue
+
+            missing_ids = [x for x in order_ids if x not in active_ids]
+            if not missing_ids:
+                continue
+
+            if self.__position(figi) == 0:
+                result[figi] = missing_ids[0]
+                logger.info(f"Exit order has been executed for {figi}: {missing_ids[0]}")
+            else:
+                unconfirmed_checks = self.__unconfirmed_checks.get(figi, 0) + 1
+                if unconfirmed_checks < MAX_UNCONFIRMED_CHECKS:
+                    self.__unconfirmed_checks[figi] = unconfirmed_checks
+                    continue
+
+                logger.warning(f"Exit order has gone without execution for {figi}: {missing_ids}. "
+                               f"The position is still open")
+
+            self.__orders.pop(figi)
+            self.__unconfirmed_checks.pop(figi, None)
+
+            for order_id in order_ids:
+                if order_id in active_ids:
+                    await self.__cancel(order_id)
+
+        return result
+
+    async def __post(
+            self,
+            figi: str,
+            count_lots: int,
+            is_long: bool,
+            stop_price: FixedPrice,
+            stop_order_type: StopOrderType,
+            expire_date: datetime
+    ) -> str:
+        try:
+            return await self.__stop_order_service.post_stop_order_async(
+                account_id=self.__account_id,
+                figi=figi,
+                count_lots=count_lots,
+                stop_price=fixed_to_quotation(stop_price),
+                is_buy=not is_long,
+                stop_order_type=stop_order_type,
+                expire_date=expire_date
+            )
+        except Exception as ex:
+            logger.error(f"Post exit order error {figi}: {repr(ex)}")
+            return ""
+
+    async def __cancel(self, stop_order_id: str) -> None:
+        try:
+            await self.__stop_order_service.cancel_stop_order_async(self.__account_id, stop_order_id)
+        except Exception as ex:
+            logger.error(f"Cancel exit order error {stop_order_id}: {repr(ex)}")
+
+    async def __active_ids(self) -> set[str]:
+        return {x.stop_order_id for x in await self.__stop_order_service.get_stop_orders_async(self.__account_id)}
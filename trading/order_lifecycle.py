@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Optional
+
+from tinkoff.invest import OrderDirection, OrderExecutionReportStatus, OrderTrades, PostOrderResponse
+
+from invest_api.services.orders_stream_service import OrdersStreamService
+from invest_api.utils import FixedPrice, moneyvalue_to_fixed, quotation_to_fixed
+
+__all__ = ("OrderStatus", "OrderRecord", "OrderLifecycle")
+
+logger = logging.getLogger(__name__)
+
+# Trades of unknown orders are kept for a while: the stream can be faster than the post order response
+MAX_EARLY_TRADES_ORDERS = 1000
+
+
+class OrderStatus(Enum):
+    NEW = 0
+    PARTIALLY_FILLED = 1
+    FILLED = 2
+    REJECTED = 3
+    CANCELLED = 4
+
+
+_STATUS_BY_REPORT = {
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_NEW: OrderStatus.NEW,
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL: OrderStatus.PARTIALLY_FILLED,
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL: OrderStatus.FILLED,
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_REJECTED: OrderStatus.REJECTED,
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_CANCELLED: OrderStatus.CANCELLED,
+}
+
+
+@dataclass(eq=False, repr=True)
+class OrderRecord:
+    """
+    State of an order. Quantities are in shares (lots * lot size), amounts are fixed-point nanos.
+    """
+    order_id: str
+    figi: str
+    direction: OrderDirection
+    requested_quantity: int
+    status: OrderStatus = OrderStatus.NEW
+    # executed quantity and amount by the post order response
+    reported_quantity: int = 0
+    reported_amount: FixedPrice = 0
+    # executed quantity and amount by trades from the stream
+    traded_quantity: int = 0
+    traded_amount: FixedPrice = 0
+
+    @property
+    def filled_quantity(self) -> int:
+        return max(self.reported_quantity, self.traded_quantity)
+
+    @property
+    def average_price(self) -> FixedPrice:
+        if self.traded_quantity >= self.reported_quantity:
+            return self.traded_amount // self.traded_quantity if self.traded_quantity else 0
+
+        return self.reported_amount // self.reported_quantity
+
+    @property
+    def is_final(self) -> bool:
+        return self.status in (OrderStatus.FILLED, OrderStatus.REJECTED, OrderStatus.CANCELLED)
+
+
+class OrderLifecycle:
+    """
+    Tracks orders of an account (indexed by order id) by post order responses and order trades stream.
+    Every change of an order is given to on_update callback as soon as it comes from the stream.
+    Order states: NEW -> PARTIALLY_FILLED -> FILLED, or REJECTED/CANCELLED (by the post order response).
+    """
+    def __init__(
+            self,
+            account_id: str,
+            orders_stream_service: OrdersStreamService,
+            on_update: Callable[[OrderRecord], None]
+    ) -> None:
+        self.__account_id = account_id
+        self.__orders_stream_service = orders_stream_service
+        self.__on_update = on_update
+        self.__orders: dict[str, OrderRecord] = dict()
+        # order id -> trades of the order which hasn't been registered yet
+        self.__early_trades: dict[str, list[OrderTrades]] = dict()
+        self.__stream_task: Optional[asyncio.Task] = None
+
+    def order(self, order_id: str) -> Optional[OrderRecord]:
+        return self.__orders.get(order_id)
+
+    async def start(self) -> None:
+        self.__stream_task = asyncio.create_task(self.__trades_stream_worker())
+
+    async def stop(self) -> None:
+        if self.__stream_task:
+            self.__stream_task.cancel()
+
+            try:
+                await self.__stream_task
+            except asyncio.CancelledError:
+                pass
+
+            self.__stream_task = None
+
+    def register(self, order: PostOrderResponse, lot_size: int) -> OrderRecord:
+        """
+        Start tracking of the posted order. Trades received before the response are applied.
+        """
+        record = OrderRecord(
+            order_id=order.order_id,
+            figi=order.figi,
+            direction=order.direction,
+            requested_quantity=order.lots_requested * lot_size,
+            status=_STATUS_BY_REPORT.get(order.execution_report_status, OrderStatus.NEW),
+            reported_quantity=order.lots_executed * lot_size
+        )
+        if record.reported_quantity:
+            record.reported_amount = moneyvalue_to_fixed(order.executed_order_price) * record.reported_quantity
+
+        self.__orders[record.order_id] = record
+
+        for order_trades in self.__early_trades.pop(record.order_id, []):
+            self.__apply_trades(record, order_trades)
+
+        logger.debug("Order has been registered: %s", record)
+
+        return record
+
+    def apply_order_trades(self, order_trades: OrderTrades) -> None:
+        record = self.__orders.get(order_trades.order_id)
+
+        if not record:
+            self.__early_trades.setdefault(order_trades.order_id, []).append(order_trades)
+
+            if len(self.__early_trades) > MAX_EARLY_TRADES_ORDERS:
+                # orders posted outside of the bot
+                del self.__early_trades[next(iter(self.__early_trades))]
+
+            return None
+
+        self.__apply_trades(record, order_trades)
+        logger.debug("Order has been updated by trades: %s", record)
+
+        try:
+            self.__on_update(record)
+        except Exception as ex:
+            logger.error(f"Order update error {record.order_id}: {repr(ex)}")
+
+    @staticmethod
+    def __apply_trades(record: OrderRecord, order_trades: OrderTrades) -> None:
+        for trade in order_trades.trades:
+            record.traded_quantity += trade.quantity
+            record.traded_amount += quotation_to_fixed(trade.price) * trade.quantity
+
+        if record.status in (OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED):
+            record.status = OrderStatus.FILLED if record.filled_quantity >= record.requested_quantity \
+                else OrderStatus.PARTIALLY_FILLED
+
+    async def __trades_stream_worker(self) -> None:
+        try:
+            async for trades in self.__orders_stream_service.start_async_trades_stream(self.__account_id):
+                if trades.order_trades:
+                    self.apply_order_trades(trades.order_trades)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            logger.error(f"Trades stream error. Orders aren't updated by stream anymore: {repr(ex)}")
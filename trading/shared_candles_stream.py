@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+import logging
+from typing import AsyncGenerator, Optional
+
+from tinkoff.invest import Candle
+
+from invest_api.services.market_data_stream_service import MarketDataStreamService
+
+__all__ = ("SharedCandlesStream")
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCandlesStream:
+    """
+    One candles stream of the stream service for several traders (accounts).
+    Has the same start_async_candles_stream method: every trader gets candles of own figies only.
+    The source stream subscribes all figies once, starts with the first trader and stops after the last one.
+    All traders have the same trade_before_time (the same trading day and settings).
+    """
+    def __init__(self, stream_service: MarketDataStreamService, figies: list[str]) -> None:
+        self.__stream_service = stream_service
+        self.__figies = list(dict.fromkeys(figies))
+        # figi -> queues of traders which trade it
+        self.__subscribers: dict[str, list[asyncio.Queue]] = dict()
+        self.__queues: list[asyncio.Queue] = []
+        self.__source_task: Optional[asyncio.Task] = None
+
+    async def start_async_candles_stream(
+            self,
+            figies: list[str],
+            trade_before_time: datetime
+    ) -> AsyncGenerator[Candle, None]:
+        # candle or None if the source stream is over
+        candles_queue: asyncio.Queue = asyncio.Queue()
+        self.__subscribe(figies, candles_queue)
+
+        try:
+            if not self.__source_task or self.__source_task.done():
+                self.__source_task = asyncio.create_task(self.__source_worker(trade_before_time))
+
+            while (candle := await candles_queue.get()) is not None:
+                yield candle
+        finally:
+            await self.__unsubscribe(figies, candles_queue)
+
+    def __subscribe(self, figies: list[str], candles_queue: asyncio.Queue) -> None:
+        for figi in figies:
+            if figi not in self.__figies:
+                logger.warning(f"Figi {figi} isn't in shared candles stream")
+                continue
+
+            self.__subscribers.setdefault(figi, []).append(candles_queue)
+
+        self.__queues.append(candles_queue)
+
+    async def __unsubscribe(self, figies: list[str], candles_queue: asyncio.Queue) -> None:
+        for figi in figies:
+            if candles_queue in self.__subscribers.get(figi, []):
+                self.__subscribers[figi].remove(candles_queue)
+
+        self.__queues.remove(candles_queue)
+
+        if not self.__queues and self.__source_task:
+            source_task, self.__source_task = self.__source_task, None
+            source_task.cancel()
+
+            try:
+                await source_task
+            except asyncio.CancelledError:
+                pass
+
+    async def __source_worker(self, trade_before_time: datetime) -> None:
+        logger.info(f"Start shared candles stream: {self.__figies}")
+
+        try:
+            async for candle in self.__stream_service.start_async_candles_stream(self.__figies, trade_before_time):
+                for candles_queue in self.__subscribers.get(candle.figi, []):
+                    candles_queue.put_nowait(candle)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            logger.error(f"Shared candles stream error: {repr(ex)}")
+        finally:
+            # traders finish trading as if own stream is over
+            for candles_queue in self.__queues:
+                candles_queue.put_nowait(None)
+
+            logger.info("Shared candles stream has been stopped")
@@ -10,6 +10,13 @@ class TradeOrder:
     open_order_id: str
     signal: Signal
     close_order_id: str = ""
+    # the position has been closed by exchange stop order (take profit or stop loss)
+    close_stop_order_id: str = ""
+    # actual fills by order lifecycle (shares and fixed-point average price)
+    open_filled_quantity: int = 0
+    open_average_price: int = 0
+    close_filled_quantity: int = 0
+    close_average_price: int = 0
 
 
 class TradeResults:
@@ -19,6 +26,8 @@ class TradeResults:
     def __init__(self) -> None:
         self.__current_trade_orders: dict[str, TradeOrder] = dict()
         self.__old_trade_orders: dict[str, list[TradeOrder]] = dict()
+        # open and close order ids -> trade order
+        self.__orders_index: dict[str, TradeOrder] = dict()
 
     def get_current_open_orders(self) -> dict[str, TradeOrder]:
         return self.__current_trade_orders
@@ -43,18 +52,52 @@ class TradeResults:
                 signal=signal
             )
             self.__current_trade_orders[figi] = current_trade_order
+            self.__orders_index[open_order_id] = current_trade_order
 
         return current_trade_order
 
     def close_position(
             self,
             figi: str,
-            close_order_id: str
+            close_order_id: str,
+            close_stop_order_id: str = ""
     ) -> TradeOrder:
         current_order = self.__current_trade_orders.pop(figi, None)
 
         if current_order:
             current_order.close_order_id = close_order_id
+            current_order.close_stop_order_id = close_stop_order_id
             (self.__old_trade_orders.setdefault(figi, [])).append(current_order)
+            if close_order_id:
+                self.__orders_index[close_order_id] = current_order
 
         return current_order
+
+    def cancel_position(self, figi: str, open_order_id: str) -> TradeOrder:
+        """
+        Forget the current position if its open order hasn't been executed at all
+        """
+        current_order = self.__current_trade_orders.get(figi, None)
+
+        if current_order and current_order.open_order_id == open_order_id:
+            self.__current_trade_orders.pop(figi)
+            self.__orders_index.pop(open_order_id, None)
+            return current_order
+
+        return None
+
+    def update_order_fill(self, order_id: str, filled_quantity: int, average_price: int) -> TradeOrder:
+        """
+        Apply actual fill of open or close order
+        """
+        trade_order = self.__orders_index.get(order_id, None)
+
+        if trade_order:
+            if trade_order.open_order_id == order_id:
+                trade_order.open_filled_quantity = filled_quantity
+                trade_order.open_average_price = average_price
+            else:
+                trade_order.close_filled_quantity = filled_quantity
+                trade_order.close_average_price = average_price
+
+        return trade_order
@@ -1,6 +1,7 @@
 import asyncio
 import datetime
 import logging
+from dataclasses import dataclass
 
 from blog.blogger import Blogger
 from configuration.settings import AccountSettings, TradingSettings, BlogSettings, StrategySettings
@@ -9,19 +10,33 @@ from invest_api.services.client_service import ClientService
 from invest_api.services.instruments_service import InstrumentService
 from invest_api.services.market_data_service import MarketDataService
 from invest_api.services.operations_service import OperationService
+from invest_api.services.operations_stream_service import OperationsStreamService
 from invest_api.services.orders_service import OrderService
+from invest_api.services.orders_stream_service import OrdersStreamService
 from invest_api.services.market_data_stream_service import MarketDataStreamService
+from invest_api.services.stop_orders_service import StopOrderService
 from trade_system.strategies.base_strategy import IStrategy
+from trading.shared_candles_stream import SharedCandlesStream
 from trading.trader import Trader
 
-__all__ = ("TradeService")
+__all__ = ("AccountStrategies", "TradeService")
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(eq=False, repr=True)
+class AccountStrategies:
+    """
+    Settings and own strategies (separate instances) of one trading account
+    """
+    settings: AccountSettings
+    strategies: list[IStrategy]
+
+
 class TradeService:
     """
-    Represent logic keep trading going
+    Represent logic keep trading going.
+    Several accounts trade concurrently: one Trader per account, one shared candles stream and channel pool.
     """
     def __init__(
             self,
@@ -29,44 +44,59 @@ class TradeService:
             client_service: ClientService,
             instrument_service: InstrumentService,
             operation_service: OperationService,
+            operations_stream_service: OperationsStreamService,
             order_service: OrderService,
             stream_service: MarketDataStreamService,
             market_data_service: MarketDataService,
             blogger: Blogger,
-            account_settings: AccountSettings,
+            accounts_strategies: list[AccountStrategies],
             trading_settings: TradingSettings,
-            strategies: list[IStrategy]
+            stop_order_service: StopOrderService = None,
+            orders_stream_service: OrdersStreamService = None
     ) -> None:
         self.__account_service = account_service
         self.__client_service = client_service
         self.__instrument_service = instrument_service
         self.__operation_service = operation_service
+        self.__operations_stream_service = operations_stream_service
         self.__order_service = order_service
         self.__stream_service = stream_service
         self.__market_data_service = market_data_service
         self.__blogger = blogger
-        self.__account_settings = account_settings
+        self.__accounts_strategies = accounts_strategies
         self.__trading_settings = trading_settings
-        self.__strategies = strategies
+        self.__stop_order_service = stop_order_service
+        self.__orders_stream_service = orders_stream_service
 
     async def worker(self) -> None:
-        try:
-            logger.info("Finding account for trading")
-            account_id = self.__account_service.trading_account_id(self.__account_settings)
+        # account id -> account settings and strategies
+        accounts: dict[str, AccountStrategies] = dict()
 
-            if not account_id:
-                logger.error("Account for trading hasn't been found")
-                return None
+        for account_strategies in self.__accounts_strategies:
+            try:
+                logger.info(f"Finding account for trading: {account_strategies.settings.name}")
+                # sync api calls wait for retries and rate limits in a thread: the event loop isn't blocked
+                account_id = account_strategies.settings.account_id or await asyncio.to_thread(
+                    self.__account_service.trading_account_id, account_strategies.settings, list(accounts.keys())
+                )
 
-            logger.info(f"Account id: {account_id}")
+                if not account_id:
+                    logger.error(f"Account for trading hasn't been found: {account_strategies.settings.name}")
+                    continue
 
-        except Exception as ex:
-            logger.error(f"Start trading error: {repr(ex)}")
+                logger.info(f"Account id: {account_id}")
+                accounts[account_id] = account_strategies
+
+            except Exception as ex:
+                logger.error(f"Start trading error: {repr(ex)}")
+
+        if not accounts:
+            logger.error("No accounts for trading")
             return None
 
-        await self.__working_loop(account_id)
+        await self.__working_loop(accounts)
 
-    async def __working_loop(self, account_id: str) -> None:
+    async def __working_loop(self, accounts: dict[str, AccountStrategies]) -> None:
         logger.info("Start every day trading")
 
         while True:
@@ -74,7 +104,7 @@ class TradeService:
 
             try:
                 is_trading_day, start_time, end_time = \
-                    self.__instrument_service.moex_today_trading_schedule()
+                    await asyncio.to_thread(self.__instrument_service.moex_today_trading_schedule)
                 # for tests purposes
                 #is_trading_day, start_time, end_time = \
                 #    True, \
@@ -90,21 +120,7 @@ class TradeService:
 
                     logger.info(f"Trading day has been started")
 
-                    await Trader(
-                        client_service=self.__client_service,
-                        instrument_service=self.__instrument_service,
-                        operation_service=self.__operation_service,
-                        order_service=self.__order_service,
-                        stream_service=self.__stream_service,
-                        market_data_service=self.__market_data_service,
-                        blogger=self.__blogger
-                    ).trade_day(
-                        account_id,
-                        self.__trading_settings,
-                        self.__strategies,
-                        end_time,
-                        self.__account_settings.min_rub_on_account
-                    )
+                    await self.__trade_day(accounts, end_time)
 
                     logger.info("Trading day has been completed")
                 else:
@@ -112,6 +128,64 @@ class TradeService:
             except Exception as ex:
                 logger.error(f"Start trading today error: {repr(ex)}")
 
+            await self.__sleep_to_next_session()
+
+    async def __trade_day(self, accounts: dict[str, AccountStrategies], end_time: datetime) -> None:
+        # One candles stream for figies of all accounts
+        shared_stream = SharedCandlesStream(
+            self.__stream_service,
+            [strategy.settings.figi for x in accounts.values() for strategy in x.strategies]
+        )
+        # messages of several accounts in the same chat are labeled by account name
+        bloggers = {
+            account_id: self.__blogger.for_account(account_strategies.settings.name or account_id)
+            if len(accounts) > 1 else self.__blogger
+            for account_id, account_strategies in accounts.items()
+        }
+
+        results = await asyncio.gather(
+            *(
+                Trader(
+                    client_service=self.__client_service,
+                    instrument_service=self.__instrument_service,
+                    operation_service=self.__operation_service,
+                    operations_stream_service=self.__operations_stream_service,
+                    order_service=self.__order_service,
+                    stream_service=shared_stream,
+                    market_data_service=self.__market_data_service,
+                    blogger=bloggers[account_id],
+                    stop_order_service=self.__stop_order_service,
+                    orders_stream_service=self.__orders_stream_service
+                ).trade_day(
+                    account_id,
+                    self.__trading_settings,
+                    account_strategies.strategies,
+                    end_time,
+                    account_strategies.settings.min_rub_on_account
+                )
+                for account_id, account_strategies in accounts.items()
+            ),
+            return_exceptions=True
+        )
+
+        for account_id, result in zip(accounts.keys(), results):
+            if isinstance(result, Exception):
+                logger.error(f"Trading day error for account {account_id}: {repr(result)}")
+
+    async def __sleep_to_next_session(self) -> None:
+        try:
+            next_start_time = await asyncio.to_thread(
+                self.__instrument_service.moex_next_trading_session_start,
+                datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+            )
+        except Exception as ex:
+            logger.error(f"Next trading session error: {repr(ex)}")
+            next_start_time = None
+
+        if next_start_time:
+            logger.info(f"Sleep to next trading session: {next_start_time}")
+            await TradeService.__sleep_to(next_start_time)
+        else:
             logger.info("Sleep to next morning")
             await TradeService.__sleep_to_next_morning()
 
@@ -1,20 +1,30 @@
+import asyncio
 import datetime
 import logging
-from decimal import Decimal
+import time
+from typing import Optional
 
-from tinkoff.invest import Candle, OrderExecutionReportStatus
-from tinkoff.invest.utils import quotation_to_decimal
+from tinkoff.invest import Candle, OrderExecutionReportStatus, PostOrderResponse
 
 from blog.blogger import Blogger
 from invest_api.services.client_service import ClientService
 from invest_api.services.instruments_service import InstrumentService
 from invest_api.services.market_data_service import MarketDataService
 from invest_api.services.operations_service import OperationService
+from invest_api.services.operations_stream_service import OperationsStreamService
 from invest_api.services.orders_service import OrderService
+from invest_api.services.orders_stream_service import OrdersStreamService
 from invest_api.services.market_data_stream_service import MarketDataStreamService
-from invest_api.utils import candle_to_historiccandle
-from trade_system.signal import SignalType
+from invest_api.services.stop_orders_service import StopOrderService
+from invest_api.utils import FixedPrice, NANOS_IN_UNIT, candle_to_historiccandle, fixed_to_decimal, \
+    quotation_to_fixed
+from metrics.latency_metrics import metrics_registry, observe, span
+from trade_system.signal import Signal, SignalType
 from trade_system.strategies.base_strategy import IStrategy
+from trading.account_ledger import AccountLedger
+from trading.clock import Clock
+from trading.exit_orders import ExitOrders
+from trading.order_lifecycle import OrderLifecycle, OrderRecord, OrderStatus
 from trading.trade_results import TradeResults
 from configuration.settings import TradingSettings
 
@@ -33,19 +43,39 @@ class Trader:
             client_service: ClientService,
             instrument_service: InstrumentService,
             operation_service: OperationService,
+            operations_stream_service: OperationsStreamService,
             order_service: OrderService,
             stream_service: MarketDataStreamService,
             market_data_service: MarketDataService,
-            blogger: Blogger
+            blogger: Blogger,
+            clock: Optional[Clock] = None,
+            stop_order_service: Optional[StopOrderService] = None,
+            orders_stream_service: Optional[OrdersStreamService] = None
     ) -> None:
         self.__today_trade_results: TradeResults = None
+        self.__open_position_lock: asyncio.Lock = None
+        self.__account_ledger: Optional[AccountLedger] = None
+        # Fills of orders by order trades stream (if orders_stream_service is given)
+        self.__order_lifecycle: Optional[OrderLifecycle] = None
+        # Exchange take profit and stop loss orders (TradingSettings.exchange_exit_orders)
+        self.__exit_orders: Optional[ExitOrders] = None
+        self.__exit_orders_expire_time: Optional[datetime] = None
+        # figi -> min price increment (fixed-point) for exit orders
+        self.__price_increments: dict[str, FixedPrice] = dict()
         self.__client_service = client_service
         self.__instrument_service = instrument_service
         self.__operation_service = operation_service
+        self.__operations_stream_service = operations_stream_service
         self.__order_service = order_service
         self.__stream_service = stream_service
         self.__market_data_service = market_data_service
+        self.__stop_order_service = stop_order_service
+        self.__orders_stream_service = orders_stream_service
         self.__blogger = blogger
+        # Simulated clock is used by replay (stream_service is ReplayStreamService)
+        self.__clock = clock or Clock()
+        # Per candle metrics (the clock reads and labels) are skipped when metrics are off
+        self.__metrics_on = False
 
     async def trade_day(
             self,
@@ -56,18 +86,42 @@ class Trader:
             min_rub: int
     ) -> None:
         logger.info("Start preparations for trading today")
-        today_trade_strategies = self.__get_today_strategies(strategies)
+        today_trade_strategies = await self.__get_today_strategies(strategies)
         if not today_trade_strategies:
             logger.info("No shares to trade today.")
             return None
 
-        self.__clear_all_positions(account_id, today_trade_strategies)
-
-        rub_before_trade_day = self.__operation_service.available_rub_on_account(account_id)
-        logger.info(f"Amount of RUB on account {rub_before_trade_day} and minimum for trading: {min_rub}")
-        if rub_before_trade_day < min_rub:
+        await self.__clear_all_positions(account_id, today_trade_strategies)
+
+        # From here, balance and positions are read from the ledger instead of api requests
+        self.__account_ledger = AccountLedger(
+            account_id,
+            self.__operation_service,
+            self.__operations_stream_service,
+            self.__market_data_service
+        )
+        await self.__account_ledger.start()
+
+        if self.__orders_stream_service:
+            self.__order_lifecycle = OrderLifecycle(account_id, self.__orders_stream_service, self.__on_order_update)
+            await self.__order_lifecycle.start()
+
+        rub_before_trade_day = self.__account_ledger.available_rub
+        logger.info(f"Amount of RUB on account {fixed_to_decimal(rub_before_trade_day)} "
+                    f"and minimum for trading: {min_rub}")
+        if rub_before_trade_day < min_rub * NANOS_IN_UNIT:
+            await self.__stop_account_ledger()
             return None
 
+        if trading_settings.exchange_exit_orders and self.__stop_order_service:
+            self.__exit_orders = ExitOrders(
+                account_id,
+                self.__stop_order_service,
+                self.__account_ledger.position,
+                self.__account_ledger.refresh
+            )
+            self.__exit_orders_expire_time = trade_day_end_time
+
         logger.info("Start trading today")
         self.__blogger.start_trading_message(today_trade_strategies, rub_before_trade_day)
 
@@ -87,19 +141,33 @@ class Trader:
         logger.info("Finishing trading today")
         self.__blogger.finish_trading_message()
 
+        try:
+            # positions closed by the exchange aren't closed again (other exit orders are cancelled with all orders)
+            await self.__check_exit_orders()
+        except Exception as ex:
+            logger.error(f"Check exit orders error: {repr(ex)}")
+
         try:
             if self.__today_trade_results:
-                for key_figi, value_order_id in self.__clear_all_positions(account_id, today_trade_strategies).items():
+                for key_figi, value_order_id in \
+                        (await self.__clear_all_positions(account_id, today_trade_strategies)).items():
                     trade_order = self.__today_trade_results.close_position(key_figi, value_order_id)
+                    self.__update_order_fill(value_order_id)
                     self.__blogger.close_position_message(trade_order)
+
+                await self.__forget_not_executed_positions(account_id)
             else:
-                self.__clear_all_positions(account_id, today_trade_strategies)
+                await self.__clear_all_positions(account_id, today_trade_strategies)
         except Exception as ex:
             logger.error(f"Finishing trading error: {repr(ex)}")
 
+        self.__exit_orders = None
+
+        await self.__stop_account_ledger()
+
         logger.info("Show trade results today")
         try:
-            self.__summary_today_trade_results(account_id, rub_before_trade_day)
+            await self.__summary_today_trade_results(account_id, rub_before_trade_day)
         except Exception as ex:
             logger.error(f"Summary trading day error: {repr(ex)}")
 
@@ -120,118 +188,256 @@ class Trader:
             trade_day_end_time - datetime.timedelta(minutes=trading_settings.stop_signals_before_close)
         logger.debug(f"Stop time: signals - {signals_before_time}, trading - {trade_before_time}")
 
-        current_candles: dict[str, Candle] = dict()
         self.__today_trade_results = TradeResults()
+        self.__open_position_lock = asyncio.Lock()
+        self.__metrics_on = metrics_registry() is not None
+
+        # Every figi has own queue and worker.
+        # A slow request for one figi doesn't stall candles consumption for others.
+        figi_queues: dict[str, asyncio.Queue] = {figi: asyncio.Queue() for figi in strategies.keys()}
+        figi_workers = [
+            asyncio.create_task(
+                self.__figi_trading_worker(account_id, figi_queue, strategies, signals_before_time)
+            )
+            for figi_queue in figi_queues.values()
+        ]
+        if self.__exit_orders:
+            figi_workers.append(
+                asyncio.create_task(self.__exit_orders_worker(trading_settings.exit_orders_check_seconds))
+            )
+
+        try:
+            async for candle in self.__stream_service.start_async_candles_stream(
+                    list(strategies.keys()),
+                    trade_before_time
+            ):
+                figi_queues[candle.figi].put_nowait((candle, time.perf_counter() if self.__metrics_on else 0.0))
+        finally:
+            # Workers complete already received candles and stop
+            for figi_queue in figi_queues.values():
+                figi_queue.put_nowait(None)
+            if self.__exit_orders:
+                figi_workers[-1].cancel()
+            await asyncio.gather(*figi_workers, return_exceptions=True)
+
+        logger.info("Today trading has been completed")
+
+    async def __figi_trading_worker(
+            self,
+            account_id: str,
+            candles_queue: asyncio.Queue,
+            strategies: dict[str, IStrategy],
+            signals_before_time: datetime
+    ) -> None:
+        current_figi_candle: Optional[Candle] = None
+
+        while (item := await candles_queue.get()) is not None:
+            candle, received_at = item
+            if self.__metrics_on:
+                observe("trading_stage_seconds", (("stage", "queue_wait"), ("figi", candle.figi)),
+                        time.perf_counter() - received_at)
+
+            if not current_figi_candle:
+                current_figi_candle = candle
 
-        async for candle in self.__stream_service.start_async_candles_stream(
-                list(strategies.keys()),
-                trade_before_time
-        ):
-            current_figi_candle = current_candles.setdefault(candle.figi, candle)
             if candle.time < current_figi_candle.time:
                 # it happens (based on API documentation)
                 logger.debug("Skip candle from past.")
                 continue
 
-            # check price from candle for take or stop price levels
-            current_trade_order = self.__today_trade_results.get_current_trade_order(candle.figi)
-            if current_trade_order:
-                high, low = quotation_to_decimal(candle.high), quotation_to_decimal(candle.low)
+            try:
+                with span("trading_stage_seconds", (("stage", "candle"), ("figi", candle.figi))):
+                    await self.__on_candle(account_id, candle, current_figi_candle, strategies, signals_before_time)
+            except Exception as ex:
+                logger.error(f"Error process candle {candle.figi}: {repr(ex)}")
 
-                # Logic is:
-                # if stop or take price level is between high and low, then stop or take will be executed
-                try:
-                    if low <= current_trade_order.signal.stop_loss_level <= high:
-                        logger.info(f"STOP LOSS: {current_trade_order}")
-                        self.__close_position_and_send_message(account_id, candle.figi, strategies)
+            current_figi_candle = candle
 
-                    elif low <= current_trade_order.signal.take_profit_level <= high:
-                        logger.info(f"TAKE PROFIT: {current_trade_order}")
-                        self.__close_position_and_send_message(account_id, candle.figi, strategies)
-                except Exception as ex:
-                    logger.error(f"Error check Stop loss and Take profit levels: {repr(ex)}")
+    async def __exit_orders_worker(self, check_seconds: int) -> None:
+        """
+        Finds positions closed by exchange take profit and stop loss orders
+        """
+        while True:
+            await asyncio.sleep(check_seconds)
+
+            try:
+                await self.__check_exit_orders()
+            except Exception as ex:
+                logger.error(f"Check exit orders error: {repr(ex)}")
+
+    async def __check_exit_orders(self) -> None:
+        if self.__exit_orders:
+            for figi, stop_order_id in (await self.__exit_orders.executed()).items():
+                self.__close_position_by_exit_order(figi, stop_order_id)
 
-            if candle.time > current_figi_candle.time and \
-                    datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) <= signals_before_time:
+    def __close_position_by_exit_order(self, figi: str, stop_order_id: str) -> None:
+        trade_order = self.__today_trade_results.close_position(figi, "", stop_order_id)
+        logger.info(f"Position has been closed by exit order: {trade_order}")
+        self.__blogger.close_position_message(trade_order)
+
+    async def __on_candle(
+            self,
+            account_id: str,
+            candle: Candle,
+            current_figi_candle: Candle,
+            strategies: dict[str, IStrategy],
+            signals_before_time: datetime
+    ) -> None:
+        # unset last trade time comes as 1970-01-01
+        if self.__metrics_on and candle.last_trade_ts and candle.last_trade_ts.year > 1970:
+            # delivery of the latest trade in the candle by the stream
+            observe("trading_stage_seconds", (("stage", "stream_delay"), ("figi", candle.figi)),
+                    (self.__clock.now() - candle.last_trade_ts).total_seconds())
+
+        self.__account_ledger.update_last_price(candle.figi, quotation_to_fixed(candle.close))
+
+        # check price from candle for take or stop price levels
+        current_trade_order = self.__today_trade_results.get_current_trade_order(candle.figi)
+        # exchange checks levels itself if exit orders are placed
+        if current_trade_order and not (self.__exit_orders and self.__exit_orders.is_placed(candle.figi)):
+            high, low = quotation_to_fixed(candle.high), quotation_to_fixed(candle.low)
+
+            # Logic is (integer comparison of fixed-point nanos):
+            # if stop or take price level is between high and low, then stop or take will be executed
+            try:
+                if low <= current_trade_order.signal.stop_loss_level <= high:
+                    logger.info(f"STOP LOSS: {current_trade_order}")
+                    await self.__close_position_and_send_message(account_id, candle.figi, strategies)
+
+                elif low <= current_trade_order.signal.take_profit_level <= high:
+                    logger.info(f"TAKE PROFIT: {current_trade_order}")
+                    await self.__close_position_and_send_message(account_id, candle.figi, strategies)
+            except Exception as ex:
+                logger.error(f"Error check Stop loss and Take profit levels: {repr(ex)}")
+
+        if candle.time > current_figi_candle.time and \
+                self.__clock.now() <= signals_before_time:
+            with span("trading_stage_seconds", (("stage", "analyze"), ("figi", candle.figi))):
                 signal_new = strategies[candle.figi].analyze_candles(
                     [candle_to_historiccandle(current_figi_candle)]
                 )
 
-                if signal_new:
-                    logger.info(f"New signal: {signal_new}")
-
-                    try:
-                        if signal_new.signal_type == SignalType.CLOSE:
-                            if current_trade_order:
-                                logger.info(f"Close position by close signal: {current_trade_order}")
-                                self.__close_position_and_send_message(account_id, candle.figi, strategies)
-                            else:
-                                logger.info(f"New signal has been skipped. No open position to close.")
+            if signal_new:
+                logger.info(f"New signal: {signal_new}")
 
-                        elif current_trade_order:
-                            logger.info(f"New signal has been skipped. Previous signal is still alive.")
+                try:
+                    if signal_new.signal_type == SignalType.CLOSE:
+                        if current_trade_order:
+                            logger.info(f"Close position by close signal: {current_trade_order}")
+                            await self.__close_position_and_send_message(account_id, candle.figi, strategies)
+                        else:
+                            logger.info(f"New signal has been skipped. No open position to close.")
+
+                    elif current_trade_order:
+                        logger.info(f"New signal has been skipped. Previous signal is still alive.")
+
+                    elif not await self.__is_stock_ready_for_trading(candle.figi):
+                        logger.info(f"New signal has been skipped. Stock isn't ready for trading")
+
+                    else:
+                        # Money decision and order have to be atomic across figies
+                        with span("trading_stage_seconds", (("stage", "open_lock_wait"), ("figi", candle.figi))):
+                            await self.__open_position_lock.acquire()
+                        try:
+                            await self.__open_position(account_id, candle, strategies, signal_new)
+                        finally:
+                            self.__open_position_lock.release()
+                except Exception as ex:
+                    logger.error(f"Error open new position by new signal: {repr(ex)}")
 
-                        elif not self.__market_data_service.is_stock_ready_for_trading(candle.figi):
-                            logger.info(f"New signal has been skipped. Stock isn't ready for trading")
+    async def __open_position(
+            self,
+            account_id: str,
+            candle: Candle,
+            strategies: dict[str, IStrategy],
+            signal_new: Signal
+    ) -> None:
+        with span("trading_stage_seconds", (("stage", "balance"), ("figi", candle.figi))):
+            available_lots = self.__open_position_lots_count(
+                account_id,
+                strategies[candle.figi].settings.max_lots_per_order,
+                quotation_to_fixed(candle.close),
+                strategies[candle.figi].settings.lot_size
+            )
 
-                        else:
-                            available_lots = self.__open_position_lots_count(
-                                account_id,
-                                strategies[candle.figi].settings.max_lots_per_order,
-                                quotation_to_decimal(candle.close),
-                                strategies[candle.figi].settings.lot_size
-                            )
-
-                            logger.debug(f"Available lots: {available_lots}")
-                            if available_lots > 0:
-                                open_order = self.__order_service.post_market_order(
-                                    account_id=account_id,
-                                    figi=candle.figi,
-                                    count_lots=available_lots,
-                                    is_buy=(signal_new.signal_type == SignalType.LONG)
-                                )
-                                if open_order.execution_report_status == OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL or \
-                                        open_order.execution_report_status == OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL:
-                                    open_position = self.__today_trade_results.open_position(
-                                        candle.figi,
-                                        open_order.order_id,
-                                        signal_new
-                                    )
-                                    self.__blogger.open_position_message(open_position)
-                                    logger.info(f"Open position: {open_position}")
-                                else:
-                                    logger.info(f"Open order status failed: {open_order}")
-                            else:
-                                logger.info(f"New signal has been skipped. No available money")
-                    except Exception as ex:
-                        logger.error(f"Error open new position by new signal: {repr(ex)}")
-
-            current_candles[candle.figi] = candle
+        logger.debug(f"Available lots: {available_lots}")
+        if available_lots > 0:
+            posted_at = time.monotonic()
+            with span("trading_stage_seconds", (("stage", "order_post"), ("figi", candle.figi))):
+                open_order = await self.__order_service.post_market_order_async(
+                    account_id=account_id,
+                    figi=candle.figi,
+                    count_lots=available_lots,
+                    is_buy=(signal_new.signal_type == SignalType.LONG)
+                )
+            if self.__register_order(open_order, strategies[candle.figi].settings.lot_size):
+                self.__account_ledger.apply_order_fill(open_order, strategies[candle.figi].settings.lot_size, posted_at)
 
-        logger.info("Today trading has been completed")
+                open_position = self.__today_trade_results.open_position(
+                    candle.figi,
+                    open_order.order_id,
+                    signal_new
+                )
+                self.__update_order_fill(open_order.order_id)
+                self.__blogger.open_position_message(open_position)
+                logger.info(f"Open position: {open_position}")
+
+                # exit orders need executed lots (not filled yet orders are checked by candles)
+                if self.__exit_orders and open_order.lots_executed > 0:
+                    await self.__exit_orders.place(
+                        candle.figi,
+                        open_order.lots_executed,
+                        signal_new.signal_type == SignalType.LONG,
+                        signal_new.take_profit_level,
+                        signal_new.stop_loss_level,
+                        self.__price_increments.get(candle.figi, 0),
+                        self.__exit_orders_expire_time
+                    )
+            else:
+                logger.info(f"Open order status failed: {open_order}")
+        else:
+            logger.info(f"New signal has been skipped. No available money")
 
-    def __summary_today_trade_results(
+    async def __summary_today_trade_results(
             self,
             account_id: str,
-            rub_before_trade_day: Decimal
+            rub_before_trade_day: FixedPrice
     ) -> None:
         logger.info("Today trading summary:")
         self.__blogger.summary_message()
 
-        current_rub_on_depo = self.__operation_service.available_rub_on_account(account_id)
-        logger.info(f"RUBs on account before:{rub_before_trade_day}, after:{current_rub_on_depo}")
+        current_rub_on_depo = await self.__operation_service.available_rub_on_account_async(account_id)
+        logger.info(f"RUBs on account before:{fixed_to_decimal(rub_before_trade_day)}, "
+                    f"after:{fixed_to_decimal(current_rub_on_depo)}")
 
-        today_profit = current_rub_on_depo - rub_before_trade_day
-        today_percent_profit = (today_profit / rub_before_trade_day) * 100
+        today_profit = fixed_to_decimal(current_rub_on_depo - rub_before_trade_day)
+        today_percent_profit = (today_profit / fixed_to_decimal(rub_before_trade_day)) * 100
         logger.info(f"Today Profit:{today_profit} rub ({today_percent_profit} %)")
         self.__blogger.trading_depo_summary_message(rub_before_trade_day, current_rub_on_depo)
 
         if self.__today_trade_results:
+            open_orders = self.__today_trade_results.get_current_open_orders()
+            closed_orders = self.__today_trade_results.get_closed_orders()
+
+            # all states are requested at once instead of one by one
+            order_states = await self.__order_service.get_order_states_async(
+                account_id,
+                [x.open_order_id for x in open_orders.values()] +
+                [order_id
+                 for trade_orders in closed_orders.values()
+                 for x in trade_orders
+                 for order_id in (x.open_order_id, x.close_order_id) if order_id]
+            )
+
             logger.info(f"Today Open Signals:")
-            for figi_key, trade_order_value in self.__today_trade_results.get_current_open_orders().items():
+            for figi_key, trade_order_value in open_orders.items():
                 logger.info(f"Stock: {figi_key}")
 
-                open_order_state = self.__order_service.get_order_state(account_id, trade_order_value.open_order_id)
+                open_order_state = order_states.get(trade_order_value.open_order_id)
+                if not open_order_state:
+                    logger.info(f"Open order state isn't available: {trade_order_value}")
+                    continue
+
                 logger.info(f"Signal {trade_order_value.signal}")
                 logger.info(f"Open: {open_order_state}")
                 self.__blogger.summary_open_signal_message(trade_order_value, open_order_state)
@@ -239,11 +445,27 @@ class Trader:
             logger.info(f"All open positions should be closed manually.")
 
             logger.info(f"Today Closed Signals:")
-            for figi_key, trade_orders_value in self.__today_trade_results.get_closed_orders().items():
+            for figi_key, trade_orders_value in closed_orders.items():
                 logger.info(f"Stock: {figi_key}")
                 for trade_order in trade_orders_value:
-                    open_order_state = self.__order_service.get_order_state(account_id, trade_order.open_order_id)
-                    close_order_state = self.__order_service.get_order_state(account_id, trade_order.close_order_id)
+                    if trade_order.close_stop_order_id:
+                        open_order_state = order_states.get(trade_order.open_order_id)
+                        if not open_order_state:
+                            logger.info(f"Open order state isn't available: {trade_order}")
+                            continue
+
+                        logger.info(f"Signal {trade_order.signal}")
+                        logger.info(f"Open: {open_order_state}")
+                        logger.info(f"Closed by exit order: {trade_order.close_stop_order_id}")
+                        self.__blogger.summary_closed_by_exit_order_message(trade_order, open_order_state)
+                        continue
+
+                    open_order_state = order_states.get(trade_order.open_order_id)
+                    close_order_state = order_states.get(trade_order.close_order_id)
+                    if not open_order_state or not close_order_state:
+                        logger.info(f"Order states aren't available: {trade_order}")
+                        continue
+
                     logger.info(f"Signal {trade_order.signal}")
                     logger.info(f"Open: {open_order_state}")
                     logger.info(f"Close: {close_order_state}")
@@ -259,19 +481,19 @@ class Trader:
             self,
             account_id: str,
             max_lots_per_order: int,
-            price: Decimal,
+            price: FixedPrice,
             share_lot_size: int
     ) -> int:
         """
         Calculate counts of lots for order
         """
-        current_rub_on_depo = self.__operation_service.available_rub_on_account(account_id)
+        current_rub_on_depo = self.__account_ledger.available_rub
 
-        available_lots = int(current_rub_on_depo / (share_lot_size * price))
+        available_lots = max(0, current_rub_on_depo // (share_lot_size * price))
 
         return available_lots if max_lots_per_order > available_lots else max_lots_per_order
 
-    def __clear_all_positions(
+    async def __clear_all_positions(
             self,
             account_id: str,
             strategies: dict[str, IStrategy]
@@ -279,59 +501,175 @@ class Trader:
         logger.info("Clear all orders and close all open positions")
 
         logger.debug("Cancel all order.")
-        self.__client_service.cancel_all_orders(account_id)
+        await self.__client_service.cancel_all_orders_async(account_id)
 
         logger.debug("Close all positions.")
-        return self.__close_position_by_figi(account_id, strategies.keys(), strategies)
+        return await self.__close_position_by_figi(account_id, strategies.keys(), strategies)
 
-    def __close_position_and_send_message(
+    async def __close_position_and_send_message(
             self,
             account_id: str,
             figi: str,
             strategies: dict[str, IStrategy]
     ) -> None:
-        close_order_id = self.__close_position_by_figi(account_id, [figi], strategies).get(figi, None)
+        if self.__exit_orders:
+            can_close, executed_stop_order_id = await self.__exit_orders.cancel(figi)
+            if executed_stop_order_id:
+                # the exchange has closed the position already
+                self.__close_position_by_exit_order(figi, executed_stop_order_id)
+                return None
+
+            if not can_close:
+                # a market order could open a reverse position: the exchange may have closed this one
+                logger.info(f"Position isn't closed: execution of exit order isn't confirmed yet {figi}")
+                return None
+
+        close_order_id = (await self.__close_position_by_figi(account_id, [figi], strategies)).get(figi, None)
         if close_order_id:
             trade_order = self.__today_trade_results.close_position(figi, close_order_id)
+            self.__update_order_fill(close_order_id)
             self.__blogger.close_position_message(trade_order)
 
-    def __close_position_by_figi(
+    async def __close_position_by_figi(
             self,
             account_id: str,
             figies: list[str],
             strategies: dict[str, IStrategy]
     ) -> dict[str, str]:
         result: dict[str, str] = dict()
-        current_positions = self.__operation_service.positions_securities(account_id)
+        current_positions = await self.__current_positions(account_id, figies)
 
         if current_positions:
             logger.info(f"Current positions: {current_positions}")
-            for position in current_positions:
-                if position.figi in figies:
-                    # Check a stock
-                    if self.__market_data_service.is_stock_ready_for_trading(position.figi):
-                        close_order = self.__order_service.post_market_order(
+            for figi, balance in current_positions.items():
+                # Check a stock
+                if await self.__is_stock_ready_for_trading(figi):
+                    lot_size = strategies[figi].settings.lot_size
+                    posted_at = time.monotonic()
+                    with span("trading_stage_seconds", (("stage", "order_post"), ("figi", figi))):
+                        close_order = await self.__order_service.post_market_order_async(
                             account_id=account_id,
-                            figi=position.figi,
-                            count_lots=abs(int(position.balance / strategies[position.figi].settings.lot_size)),
-                            is_buy=(position.balance < 0)
+                            figi=figi,
+                            count_lots=abs(int(balance / lot_size)),
+                            is_buy=(balance < 0)
                         )
-                        if close_order.execution_report_status == OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL or \
-                                close_order.execution_report_status == OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL:
-                            result[position.figi] = close_order.order_id
-                        else:
-                            logger.info(f"Close order status failed: {close_order}")
+                    if self.__register_order(close_order, lot_size):
+                        result[figi] = close_order.order_id
+
+                        if self.__account_ledger:
+                            self.__account_ledger.apply_order_fill(close_order, lot_size, posted_at)
+                    else:
+                        logger.info(f"Close order status failed: {close_order}")
         return result
 
-    def __get_today_strategies(self, strategies: list[IStrategy]) -> dict[str, IStrategy]:
+    def __register_order(self, order: PostOrderResponse, lot_size: int) -> bool:
+        """
+        :return: True if the order has been executed or (with order lifecycle) isn't rejected and will be executed
+        """
+        if self.__order_lifecycle:
+            return self.__order_lifecycle.register(order, lot_size).status not in \
+                (OrderStatus.REJECTED, OrderStatus.CANCELLED)
+
+        return order.execution_report_status in (
+            OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL,
+            OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL
+        )
+
+    def __on_order_update(self, order: OrderRecord) -> None:
+        """
+        Fills from order trades stream
+        """
+        if self.__today_trade_results:
+            trade_order = self.__today_trade_results.update_order_fill(
+                order.order_id, order.filled_quantity, order.average_price
+            )
+            if trade_order:
+                logger.info(f"Order {order.order_id} {order.status.name}: "
+                            f"filled {order.filled_quantity} of {order.requested_quantity}, "
+                            f"average price {fixed_to_decimal(order.average_price)}")
+
+    def __update_order_fill(self, order_id: str) -> None:
+        order = self.__order_lifecycle.order(order_id) if self.__order_lifecycle else None
+        if order:
+            self.__today_trade_results.update_order_fill(order_id, order.filled_quantity, order.average_price)
+
+    async def __forget_not_executed_positions(self, account_id: str) -> None:
+        """
+        Open orders without any fill have been cancelled with all orders: there are no positions.
+        No fill is confirmed by order states: trades during reconnects of the stream aren't received.
+        """
+        if not self.__order_lifecycle:
+            return None
+
+        not_filled_orders = {
+            figi: trade_order
+            for figi, trade_order in self.__today_trade_results.get_current_open_orders().items()
+            if (order := self.__order_lifecycle.order(trade_order.open_order_id)) and order.filled_quantity == 0
+        }
+        if not not_filled_orders:
+            return None
+
+        order_states = await self.__order_service.get_order_states_async(
+            account_id,
+            [x.open_order_id for x in not_filled_orders.values()]
+        )
+
+        for figi, trade_order in not_filled_orders.items():
+            order_state = order_states.get(trade_order.open_order_id)
+            if not order_state or order_state.lots_executed > 0:
+                logger.info(f"Open order has been executed or its state isn't available: {trade_order}")
+                continue
+
+            logger.info(f"Open order hasn't been executed: {trade_order}")
+            self.__today_trade_results.cancel_position(figi, trade_order.open_order_id)
+
+    async def __is_stock_ready_for_trading(self, figi: str) -> bool:
+        with span("trading_stage_seconds", (("stage", "readiness_check"), ("figi", figi))):
+            return await self.__market_data_service.is_stock_ready_for_trading_async(figi)
+
+    async def __current_positions(
+            self,
+            account_id: str,
+            figies: list[str]
+    ) -> dict[str, int]:
+        """
+        :return: Balances of open positions by figi. The ledger is used while it works.
+        """
+        if self.__account_ledger:
+            return {figi: self.__account_ledger.position(figi) for figi in figies
+                    if self.__account_ledger.position(figi) != 0}
+
+        current_positions = await self.__operation_service.positions_securities_async(account_id)
+
+        return {position.figi: position.balance for position in current_positions or []
+                if position.figi in figies and position.balance != 0}
+
+    async def __stop_account_ledger(self) -> None:
+        if self.__order_lifecycle:
+            await self.__order_lifecycle.stop()
+            self.__order_lifecycle = None
+
+        if self.__account_ledger:
+            await self.__account_ledger.stop()
+            self.__account_ledger = None
+
+    async def __get_today_strategies(self, strategies: list[IStrategy]) -> dict[str, IStrategy]:
         """
         Check and Select stocks for trading today.
         """
         logger.info("Check shares and strategy settings")
         today_trade_strategy: dict[str, IStrategy] = dict()
 
+        # cached or requested concurrently (one request for many figies)
+        shares_settings = await self.__instrument_service.shares_by_figies_async(
+            [strategy.settings.figi for strategy in strategies]
+        )
+
         for strategy in strategies:
-            share_settings = self.__instrument_service.share_by_figi(strategy.settings.figi)
+            share_settings = shares_settings.get(strategy.settings.figi)
+            if not share_settings:
+                continue
+
             logger.debug(f"Check share settings for figi {strategy.settings.figi}: {share_settings}")
 
             if (not share_settings.otc_flag) \
@@ -343,6 +681,7 @@ class Trader:
                 # refresh information by latest info
                 strategy.update_lot_count(share_settings.lot)
                 strategy.update_short_status(share_settings.short_enabled_flag)
+                self.__price_increments[strategy.settings.figi] = share_settings.min_price_increment
 
                 today_trade_strategy[strategy.settings.figi] = strategy
 